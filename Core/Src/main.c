@@ -198,6 +198,8 @@ void CDC_OnRxData(uint8_t *buf, uint32_t len){
   }
 }
 uint8_t App_IsBinaryMode(void){ return g_bin_mode; }
+/* Espaço livre no anel: o usbd_cdc_if.c deixa de re-armar o EP OUT (NAK) abaixo de 1 pacote */
+uint32_t App_BinaryRoom(void){ return RX_BIN_BUF_SZ-1u-bin_ring_avail(); }
 
 static void process_fpga_upload(void){
   if (!g_bin_mode) return;
@@ -207,6 +209,7 @@ static void process_fpga_upload(void){
   if (bin_ring_avail()<need) return; // aguarda mais bytes
 
   uint32_t got = bin_ring_read(chunk, need); if (!got) return;
+  CDC_ResumeRx(); // anel liberado: o host volta a transmitir durante o SPI abaixo
 
   // CRC periférico (palavras de 32b; faz padding do resto)
   uint32_t w=got/4, rem=got%4;
@@ -240,6 +243,7 @@ static void cli_kalman_set(int argc, char**argv);
 static void cli_dac(int argc, char**argv);
 static void cli_wave(int argc, char**argv);
 static void cli_wavewin(int argc, char**argv);
+static void cli_awg(int argc, char**argv);
 static void cli_sys(int argc, char**argv);
 /* ADCs desabilitados */
 static void cli_adc_start(int argc, char**argv);
@@ -266,6 +270,7 @@ static const Cmd cmds[] = {
   {"DAC",       cli_dac,       "DAC <freq|0> (seno compat.)"},
   {"WAVE",      cli_wave,      "WAVE <SINE|SQUARE|TRI|SAWUP|SAWDN> <freq>"},
   {"WAVEWIN",   cli_wavewin,   "WAVEWIN <NONE|HANN|BLACKMAN|NUTTALL> <taper%>"},
+  {"AWG",       cli_awg,       "AWG <onda> <freq> <janela> <taper%> (atomico)"},
 
   {"SYS",       cli_sys,       "SYS INFO | SYS HB <0|1> | SYS RESET"},
 
@@ -359,6 +364,31 @@ static void cli_wavewin(int argc, char**argv){
   printf("OK\r\n");
 }
 
+/* Reconfiguração atômica: valida tudo antes de parar o DAC (equivale a
+   DAC 0 + WAVEWIN + WAVE numa única linha, sem depender do slot único do CDC) */
+static void cli_awg(int argc, char**argv){
+  if (argc<5){ printf("ERROR: AWG <SINE|SQUARE|TRI|SAWUP|SAWDN> <freq> <NONE|HANN|BLACKMAN|NUTTALL> <taper%%>\r\n"); return; }
+  WaveType wt; WinType wn;
+  if      (!strcmp(argv[1],"SINE"))   wt=WT_SINE;
+  else if (!strcmp(argv[1],"SQUARE")) wt=WT_SQUARE;
+  else if (!strcmp(argv[1],"TRI"))    wt=WT_TRI;
+  else if (!strcmp(argv[1],"SAWUP"))  wt=WT_SAWUP;
+  else if (!strcmp(argv[1],"SAWDN"))  wt=WT_SAWDN;
+  else { printf("ERROR: tipo invalido\r\n"); return; }
+  float f=strtof(argv[2],NULL); if (f<=0){ printf("ERROR: freq invalida\r\n"); return; }
+  if      (!strcmp(argv[3],"NONE"))     wn=WIN_NONE;
+  else if (!strcmp(argv[3],"HANN"))     wn=WIN_HANN;
+  else if (!strcmp(argv[3],"BLACKMAN")) wn=WIN_BLACKMAN;
+  else if (!strcmp(argv[3],"NUTTALL"))  wn=WIN_NUTTALL;
+  else { printf("ERROR: janela invalida\r\n"); return; }
+  float t=strtof(argv[4],NULL); if(t<0) t=0; if(t>100) t=100;
+
+  dac_stop();
+  g_wave=wt; g_win=wn; g_taper_percent=t;
+  float fmax=fmax_from_fs(DAC_FS_MAX_HZ, LUT_N); if (f>fmax) f=fmax;
+  if (dac_start(f)) printf("OK\r\n"); else printf("ERROR: DAC start\r\n");
+}
+
 static void cli_sys(int argc, char**argv){
   if (argc>=2){
     if (!strcmp(argv[1],"RESET")){ printf("RESETTING...\r\n"); HAL_Delay(20); NVIC_SystemReset(); return; }
@@ -623,5 +653,6 @@ int main(void){
 
     /* 4) Upload binário p/ FPGA */
     if (g_bin_mode) process_fpga_upload();
+    CDC_ResumeRx(); // fim/abort do upload com o EP OUT ainda em NAK
   }
 }
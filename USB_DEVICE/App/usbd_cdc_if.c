@@ -8,7 +8,9 @@
   * Correções principais:
   *   - CDC_Receive_FS: caminho "modo texto" monta linhas em cdc_cmd_buffer,
   *     seta cdc_cmd_ready e re-arma o EP (SetRxBuffer + ReceivePacket).
-  *   - CDC_Receive_FS: caminho "modo binário" repassa ao hook CDC_OnRxData().
+  *   - CDC_Receive_FS: caminho "modo binário" repassa ao hook CDC_OnRxData()
+  *     e segura o EP OUT em NAK quando o anel não comporta outro pacote
+  *     (controle de fluxo do FPGA_UPLOAD); CDC_ResumeRx() re-arma.
   *   - _write(): envia por VCP com timeout, sem travar em contexto de IRQ.
   *   - Evita qualquer printf dentro de IRQ (isso é tratado no seu código da app).
   ******************************************************************************
@@ -37,6 +39,7 @@
 /* USER CODE BEGIN Extern hooks */
 extern uint8_t App_IsBinaryMode(void);      /* em main.c */
 extern void    CDC_OnRxData(uint8_t *buf, uint32_t len); /* em main.c */
+extern uint32_t App_BinaryRoom(void);       /* em main.c */
 /* Variáveis exportadas (consumidas no superloop em main.c) */
 volatile uint8_t  cdc_cmd_buffer[RX_LINE_BUF_SZ];
 volatile uint32_t cdc_cmd_length = 0;
@@ -54,6 +57,7 @@ __ALIGN_BEGIN uint8_t UserTxBufferFS[APP_TX_DATA_SIZE] __ALIGN_END;
 static USBD_CDC_HandleTypeDef *pCDC = NULL;      /* acesso rápido a TxState */
 static uint8_t s_linebuf[RX_LINE_BUF_SZ];        /* montagem de linha */
 static uint32_t s_linepos = 0;
+static volatile uint8_t s_rx_paused = 0;         /* EP OUT não re-armado: anel binário cheio */
 /* USER CODE END PV */
 
 /* Private function prototypes -----------------------------------------------*/
@@ -118,6 +122,13 @@ static int8_t CDC_Receive_FS(uint8_t* Buf, uint32_t *Len)
   if (App_IsBinaryMode())
   {
     CDC_OnRxData(Buf, *Len);
+    /* Sem espaço para mais um pacote: não re-arma. O host recebe NAK e espera
+       (nada é descartado); o superloop re-arma via CDC_ResumeRx(). */
+    if (App_BinaryRoom() < CDC_DATA_FS_MAX_PACKET_SIZE)
+    {
+      s_rx_paused = 1;
+      return (USBD_OK);
+    }
   }
   else
   {
@@ -150,6 +161,20 @@ rearm:
   return (USBD_OK);
 }
 
+/**
+  * @brief  Re-arma o EP OUT pausado por CDC_Receive_FS quando o anel binário
+  *         voltar a ter espaço (ou o modo binário terminar). Chamado do
+  *         superloop; com o EP em NAK não há IRQ de RX concorrente.
+  */
+void CDC_ResumeRx(void)
+{
+  if (!s_rx_paused) return;
+  if (App_IsBinaryMode() && App_BinaryRoom() < CDC_DATA_FS_MAX_PACKET_SIZE) return;
+  s_rx_paused = 0;
+  USBD_CDC_SetRxBuffer(&hUsbDeviceFS, UserRxBufferFS);
+  USBD_CDC_ReceivePacket(&hUsbDeviceFS);
+}
+
 /**
   * @brief  Tx complete callback
   */
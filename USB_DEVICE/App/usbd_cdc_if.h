@@ -103,6 +103,7 @@ extern volatile uint8_t  cdc_cmd_ready;        /* 1 => comando pronto para proce
 uint8_t CDC_Transmit_FS(uint8_t* Buf, uint16_t Len);
 
 /* USER CODE BEGIN EXPORTED_FUNCTIONS */
+void CDC_ResumeRx(void);   /* re-arma o EP OUT após pausa por anel binário cheio */
 /* USER CODE END EXPORTED_FUNCTIONS */
 
 /**
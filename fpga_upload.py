@@ -0,0 +1,320 @@
+"""
+Envia um bitstream para a FPGA pelo FPGA_UPLOAD do firmware Pyboard v1.1.
+
+Protocolo (Core/Src/main.c):
+    FPGA_UPLOAD <bytes> <crc32>   ->  FPGA_UPLOAD_READY, e daí em diante todo
+    byte recebido é dado: anel de 2048 bytes, consumido em blocos de 1024 que
+    passam pelo periférico CRC e saem pelo SPI1 com CS baixo. Ao completar
+    <bytes>: FPGA_UPLOAD_OK ou FPGA_UPLOAD_BADCRC exp:<n> got:<n>.
+
+  - CRC: o mesmo do periférico CRC do STM32 (poly 0x04C11DB7, init 0xFFFFFFFF,
+    palavras de 32 bits little-endian, resto completado com zeros), calculado
+    incrementalmente enquanto o arquivo é lido.
+  - Controle de fluxo: o firmware segura o EP OUT em NAK com o anel cheio
+    (CDC_ResumeRx), então o write() simplesmente bloqueia. Para firmware
+    antigo, que descarta no overflow, o envio também é limitado à vazão do
+    SPI (PCLK2 / divisor) com o anel como folga; --no-pace desliga.
+  - Abortar: no modo binário o firmware não lê texto (FPGA_ABORT viraria
+    dado). Ctrl+C ou abort() completa a contagem com bytes de enchimento, o
+    CRC não bate, o CS sobe e a placa volta ao modo texto. A FPGA recebeu um
+    bitstream inválido e fica desconfigurada até o próximo upload.
+  - Retomar: a FPGA precisa do bitstream inteiro numa só janela de CS e o
+    CRC do F405 não aceita valor inicial, então "retomar" é reenviar desde o
+    início (--retries), reaproveitando o CRC já calculado. Uma placa que
+    ficou presa no modo binário (upload interrompido) é recuperada antes.
+
+Uso:
+    python fpga_upload.py /dev/ttyACM0 top.bin [--spi-div 8] [--retries 2]
+    python pyboard_emulator.py --link /tmp/pyboard &
+    python fpga_upload.py /tmp/pyboard top.bin
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+import serial
+
+BAUDRATE = 921600              # CDC ignora baudrate
+CMD_EOL = "\r\n"
+PROMPT = "> "
+RX_BIN_BUF_SZ = 2048           # anel do modo binário (main.c)
+BIN_CHUNK = 1024               # bloco de process_fpga_upload()
+USB_FS_PACKET = 64
+FPGA_MAX_BYTES = 32 * 1024 * 1024
+PCLK2_HZ = 84_000_000          # SPI1 fica no APB2
+SPI_DIVS = (2, 4, 8, 16, 32, 64, 128, 256)
+SPI_DEFAULT_DIV = 8
+
+PACE_MARGIN = 0.85             # fração da vazão do SPI usada pelo pacing
+PACE_ROOM = RX_BIN_BUF_SZ - 1 - USB_FS_PACKET   # bytes que podem estar "no anel"
+FILL_BYTE = b"\xFF"
+REPLY_TIMEOUT_S = 1.0
+WRITE_TIMEOUT_S = 2.0
+
+
+class UploadError(Exception):
+    pass
+
+
+class UploadAborted(UploadError):
+    pass
+
+
+# ========= CRC32 do periférico STM32 =========
+# Equivale ao CRC-32 refletido do zlib sobre os bytes de cada palavra em ordem
+# big-endian com os bits de cada byte invertidos; o estado do zlib é encadeável.
+_BITREV8 = np.array([int(f"{i:08b}"[::-1], 2) for i in range(256)], dtype=np.uint8)
+
+
+def _reverse32(v):
+    return int(f"{v:032b}"[::-1], 2)
+
+
+class Stm32Crc32:
+    """CRC32 do STM32 acumulado por partes; o resto < 4 bytes espera a próxima parte."""
+    def __init__(self):
+        self.state = 0          # estado do zlib; 0 equivale ao DR resetado em 0xFFFFFFFF
+        self.tail = b""
+        self.nbytes = 0
+
+    def update(self, data):
+        self.nbytes += len(data)
+        if self.tail:
+            data = self.tail + data
+        cut = len(data) & ~3
+        self.tail = bytes(data[cut:])
+        if cut:
+            words = np.frombuffer(data, dtype=np.uint8, count=cut).reshape(-1, 4)[:, ::-1]
+            self.state = zlib.crc32(_BITREV8[words].tobytes(), self.state)
+        return self
+
+    def value(self):
+        state = self.state
+        if self.tail:
+            pad = np.frombuffer(self.tail.ljust(4, b"\0"), dtype=np.uint8)[::-1]
+            state = zlib.crc32(_BITREV8[pad].tobytes(), state)
+        return _reverse32(state ^ 0xFFFFFFFF)
+
+
+def file_crc(path, block=1 << 16):
+    crc = Stm32Crc32()
+    with open(path, "rb") as f:
+        while True:
+            buf = f.read(block)
+            if not buf:
+                break
+            crc.update(buf)
+    return crc.nbytes, crc.value()
+
+
+# ========= Upload =========
+class FpgaUploader:
+    """Conversa com a CLI e faz o streaming binário do FPGA_UPLOAD numa porta já aberta.
+
+    A porta deve ter timeout de leitura curto (ex.: 0,05 s) e write_timeout.
+    """
+    def __init__(self, ser, spi_div=None, pace=True, chunk=BIN_CHUNK, progress=None):
+        self.ser = ser
+        self.spi_div = spi_div
+        self.pace = pace
+        self.chunk = chunk
+        self.progress = progress or (lambda sent, total, elapsed: None)
+        self.rxbuf = b""
+        self.abort_event = threading.Event()
+
+    def abort(self):
+        """Pede o cancelamento (thread-safe); upload() termina com UploadAborted."""
+        self.abort_event.set()
+
+    # ---------- texto ----------
+    def _readline(self, deadline):
+        """Próxima linha não vazia até `deadline` (None se não vier); só lê o que já chegou se já passou."""
+        while True:
+            # o prompt não tem '\r\n': é descartado no começo de cada linha
+            while self.rxbuf.startswith(PROMPT.encode()):
+                self.rxbuf = self.rxbuf[len(PROMPT):]
+            i = self.rxbuf.find(b"\n")
+            if i >= 0:
+                line, self.rxbuf = self.rxbuf[:i], self.rxbuf[i + 1:]
+                line = line.decode("utf-8", "replace").strip()
+                if line:
+                    return line
+                continue
+            n = self.ser.in_waiting
+            if n:
+                self.rxbuf += self.ser.read(n)
+                continue
+            if time.monotonic() >= deadline:
+                return None
+            self.rxbuf += self.ser.read(1)     # espera no máximo o timeout da porta
+
+    def command(self, cmd, accept, timeout=REPLY_TIMEOUT_S):
+        """Envia `cmd` e devolve a primeira linha aceita por `accept`; ERROR vira UploadError."""
+        self.ser.write((cmd + CMD_EOL).encode())
+        deadline = time.monotonic() + timeout
+        while True:
+            line = self._readline(deadline)
+            if line is None:
+                return None
+            if accept(line):
+                return line
+            if line.startswith("ERROR"):
+                raise UploadError(f"{cmd}: {line}")
+
+    def ping(self):
+        return self.command("PING", lambda l: l == "PONG", timeout=0.3) is not None
+
+    def recover(self, limit=FPGA_MAX_BYTES):
+        """Garante o modo texto. Sem PONG, supõe um upload pendente e o completa com enchimento."""
+        self.rxbuf = b""
+        self.ser.reset_input_buffer()
+        if self.ping():
+            return False
+        t0 = time.monotonic()
+        sent = 0
+        while sent < limit:
+            self._write_paced(FILL_BYTE * self.chunk, t0, sent, pace=True)
+            sent += self.chunk
+            if any(l.startswith("FPGA_UPLOAD_") for l in self._drain_lines()):
+                break
+        # O que passou do fim virou texto: fecha a linha de lixo e confirma
+        self.ser.write(CMD_EOL.encode())
+        time.sleep(0.05)
+        self._drain_lines()
+        if not self.ping():
+            raise UploadError("placa não responde após recuperar o modo texto")
+        return True
+
+    def _drain_lines(self):
+        lines = []
+        while True:
+            line = self._readline(time.monotonic())
+            if line is None:
+                return lines
+            lines.append(line)
+
+    # ---------- binário ----------
+    def _spi_rate(self):
+        return PCLK2_HZ / (8 * (self.spi_div or SPI_DEFAULT_DIV))
+
+    def _write_paced(self, data, t0, sent, pace=None):
+        # Firmware sem NAK descarta o que não couber no anel: não deixa o envio
+        # passar da vazão do SPI mais o espaço livre do anel.
+        if self.pace if pace is None else pace:
+            ahead = sent + len(data) - (time.monotonic() - t0) * self._spi_rate() * PACE_MARGIN
+            if ahead > PACE_ROOM:
+                time.sleep((ahead - PACE_ROOM) / (self._spi_rate() * PACE_MARGIN))
+        try:
+            self.ser.write(data)
+        except serial.SerialTimeoutException:
+            raise UploadError("escrita parada: a placa não está consumindo o upload")
+
+    def _stream(self, path, total):
+        t0 = time.monotonic()
+        sent = 0
+        with open(path, "rb") as f:
+            try:
+                while sent < total:
+                    if self.abort_event.is_set():
+                        raise KeyboardInterrupt
+                    buf = f.read(min(self.chunk, total - sent))
+                    if not buf:
+                        raise UploadError("arquivo encolheu durante o upload")
+                    self._write_paced(buf, t0, sent)
+                    sent += len(buf)
+                    self.progress(sent, total, time.monotonic() - t0)
+            except KeyboardInterrupt:
+                # Completa a contagem para o firmware sair do modo binário (CRC errado de propósito)
+                while sent < total:
+                    n = min(self.chunk, total - sent)
+                    self._write_paced(FILL_BYTE * n, t0, sent)
+                    sent += n
+                self._wait_result(total)
+                raise UploadAborted("upload cancelado; a FPGA ficou sem configuração")
+        return t0
+
+    def _wait_result(self, total):
+        # Depois do último byte ainda falta esvaziar o anel pelo SPI
+        deadline = time.monotonic() + REPLY_TIMEOUT_S + RX_BIN_BUF_SZ / self._spi_rate()
+        while True:
+            line = self._readline(deadline)
+            if line is None or line.startswith("FPGA_UPLOAD_") or line.startswith("ERROR"):
+                return line
+
+    def upload_once(self, path, total, crc):
+        self.abort_event.clear()
+        if self.spi_div and self.command(f"SPI_SPEED {self.spi_div}", lambda l: l == "OK") is None:
+            raise UploadError("SPI_SPEED sem resposta")
+        line = self.command(f"FPGA_UPLOAD {total} {crc}", lambda l: l == "FPGA_UPLOAD_READY")
+        if line is None:
+            raise UploadError("FPGA_UPLOAD_READY não chegou")
+        t0 = self._stream(path, total)
+        line = self._wait_result(total)
+        elapsed = time.monotonic() - t0
+        if line is None:
+            raise UploadError("sem resposta ao fim do upload")
+        if line != "FPGA_UPLOAD_OK":
+            raise UploadError(line)
+        return {"bytes": total, "crc32": crc, "segundos": elapsed, "MB_s": total / elapsed / 1e6}
+
+    def upload(self, path, retries=2):
+        """Envia `path`; em falha recupera o modo texto e reenvia do início até `retries` vezes."""
+        total, crc = file_crc(path)
+        if not total or total > FPGA_MAX_BYTES:
+            raise UploadError(f"tamanho inválido: {total} bytes")
+        self.recover()
+        for attempt in range(retries + 1):
+            try:
+                res = self.upload_once(path, total, crc)
+                res["tentativas"] = attempt + 1
+                return res
+            except UploadAborted:
+                raise
+            except UploadError as e:
+                # Mesmo desistindo, não deixa a placa presa no modo binário
+                self.recover()
+                if attempt == retries:
+                    raise
+                print(f"\n[upload] {e}; recomeçando ({attempt + 1}/{retries})", file=sys.stderr)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Envia um bitstream para a FPGA via FPGA_UPLOAD do Pyboard.")
+    ap.add_argument("port", help="porta serial (ex.: /dev/ttyACM0, COM5, /tmp/pyboard)")
+    ap.add_argument("path", help="bitstream (.bin)")
+    ap.add_argument("--spi-div", type=int, choices=SPI_DIVS, default=None,
+                    help="envia SPI_SPEED antes do upload (padrão: não mexe, firmware inicia em 8)")
+    ap.add_argument("--retries", type=int, default=2, help="reenvios após BADCRC/timeout")
+    ap.add_argument("--no-pace", action="store_true",
+                    help="não limita à vazão do SPI (só com firmware que segura o EP OUT em NAK)")
+    args = ap.parse_args(argv)
+
+    def progress(sent, total, elapsed):
+        rate = sent / elapsed / 1e6 if elapsed > 0 else 0.0
+        sys.stdout.write(f"\r  {sent / 1024:9.1f}/{total / 1024:.1f} KiB  {rate:6.3f} MB/s")
+        sys.stdout.flush()
+
+    ser = serial.Serial(args.port, BAUDRATE, timeout=0.05, write_timeout=WRITE_TIMEOUT_S)
+    try:
+        up = FpgaUploader(ser, spi_div=args.spi_div, pace=not args.no_pace, progress=progress)
+        print(f"{os.path.basename(args.path)}: {os.path.getsize(args.path)} bytes")
+        res = up.upload(args.path, retries=args.retries)
+    except UploadAborted as e:
+        print(f"\n{e}")
+        return 130
+    except UploadError as e:
+        print(f"\nFalhou: {e}")
+        return 1
+    finally:
+        ser.close()
+    print(f"\nFPGA_UPLOAD_OK  crc32=0x{res['crc32']:08X}  {res['segundos']:.2f} s  "
+          f"{res['MB_s']:.3f} MB/s  ({res['tentativas']} tentativa(s))")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,14 @@ import serial.tools.list_ports
 import threading
 import time
 import queue
+import os
+import asyncio
+import struct
+from collections import deque, namedtuple
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
 # ========= Aparência =========
 ctk.set_appearance_mode("Dark")
@@ -13,7 +21,11 @@ ctk.set_default_color_theme("blue")
 
 # ========= Constantes =========
 BAUDRATE = 921600         # CDC ignora baudrate, ok
-READ_SLEEP_S = 0.01
+READ_TIMEOUT_S = 0.2
+RX_COMPACT_BYTES = 4096   # compacta o buffer do scanner só depois disso
+RX_MAX_LINE = 4096        # linha sem '\n' maior que isso é entregue assim mesmo
+PROMPT = b"> "
+PROMPT_MARK = "> "       # evento de prompt no lote de linhas (linhas reais vêm sem espaço final)
 CMD_EOL = "\r\n"
 
 MAX_FREQ_HZ = 3900
@@ -24,41 +36,539 @@ WAVE_TYPES = ["SINE", "SQUARE", "TRI", "SAWUP", "SAWDN"]
 WIN_TYPES = ["NONE", "HANN", "BLACKMAN", "NUTTALL"]
 
 CONNECT_STARTUP_DELAY = 0.30
-WRITE_GAP_MS = 10
-FREQ_DEBOUNCE_MS = 160
-WIN_DEBOUNCE_MS = 160
+# Pacing do TX por créditos: comandos escritos que ainda não tiveram o prompt de volta
+# Janela 1: o slot de linha do usbd_cdc_if.c é liberado antes de executar o comando,
+# mas duas linhas escritas em sequência podem cair no mesmo pacote USB e a segunda
+# é descartada pela IRQ. No emulador, janela 2 rendeu ~5% e algumas linhas perdidas.
+TX_WINDOW_MAX = 1
+TX_RTO_INIT_S = 0.20
+TX_RTO_MIN_S = 0.05
+TX_RTO_MAX_S = 1.0
+# Sonda após RTO: linha só com espaço, que o firmware responde com um "> " sem texto
+# (todo comando imprime ao menos uma linha antes do prompt)
+TX_PROBE = b" " + CMD_EOL.encode()
+
+# Telemetria binária (ACCEL 2 <hz>): quadros de 14 bytes, ver TelemetryDemux
+FRAME_SYNC = b"\xA5\x5A"
+FRAME_DTYPE = np.dtype([("sync", "u1", (2,)), ("seq", "<u2"), ("ts", "<u4"),
+                        ("xyz", "i1", (3,)), ("flags", "u1"), ("crc", "<u2")])
+FRAME_SIZE = FRAME_DTYPE.itemsize
+# Amostras entregues à GUI, venham de quadros ou de linhas "A:x,y,z"
+TELEM_DTYPE = np.dtype([("t", "f8"), ("xyz", "i1", (3,))])
+# Gravação de sessão (.pbrec): REC_MAGIC + início em time.time_ns() (u64) e
+# registros <t u64 ns monotônico desde o início><direção u8><len u32><bytes>.
+# Reproduzida por serial_replay.py.
+REC_MAGIC = b"PBREC\x00\x01\x00"
+REC_HEADER = struct.Struct("<Q")
+REC_RECORD = struct.Struct("<QBI")
+REC_TX, REC_RX = 0, 1
+
+# Entrega à GUI: um quadro a cada UI_POLL_MS; console limitado em linhas,
+# aparado em blocos de CONSOLE_TRIM_LINES para não apagar a cada inserção
+UI_POLL_MS = 80
+CONSOLE_MAX_LINES = 2000
+CONSOLE_TRIM_LINES = 200
+
+# Gráfico do acelerômetro: janela visível, pontos por traço e FFT da janela recente
+ACCEL_PLOT_SECONDS = 5.0
+ACCEL_RING_CAPACITY = 40000      # 5 s a 8 kHz (limite do ACCEL 2)
+ACCEL_PLOT_POINTS = 1500
+ACCEL_FFT_N = 1024
+ACCEL_PLOT_MS = 33               # ~30 quadros/s, independente da taxa de amostragem
+ACCEL_MODES = {"Texto ~10 Hz": "ACCEL 1", "Binário 100 Hz": "ACCEL 2 100",
+               "Binário 1 kHz": "ACCEL 2 1000"}
+
+# Cliente de comandos: cada comando termina no prompt "> " do firmware
+CMD_TIMEOUT_S = 1.0
+CMD_MAX_INFLIGHT = 8        # pedidos aceitos pelo cliente; quem dita o ritmo é o TxPacer
+CMD_GHOST_TTL_S = 4.0       # quanto tempo um comando expirado ainda pode "consumir" resposta atrasada
 
-# Sequência de rearm do AWG: tempos entre comandos
-AWG_REARM_STEP_MS = 60      # gap entre "DAC 0" -> "WAVEWIN" -> "WAVE ..."
 AWG_RETRY_BACKOFF_MS = 200  # se firmware responder "ERROR: DAC start", tenta mais 1x depois disso
+ERR_UNKNOWN_CMD = "ERROR: comando desconhecido. Use HELP"
 
 
 def clamp(v, lo, hi):
     return max(lo, min(hi, v))
 
 
+def parse_accel(line):
+    """'A:x,y,z' -> (x, y, z) ou None."""
+    try:
+        x, y, z = map(int, line[2:].split(","))
+    except ValueError:
+        return None
+    return x, y, z
+
+
+def _crc16_table():
+    tab = np.zeros(256, dtype=np.uint16)
+    for i in range(256):
+        c = i << 8
+        for _ in range(8):
+            c = ((c << 1) ^ 0x1021) if c & 0x8000 else (c << 1)
+        tab[i] = c & 0xFFFF
+    return tab
+
+
+_CRC16_TABLE = _crc16_table()
+
+
+def crc16_ccitt_rows(rows):
+    """CRC-16/CCITT-FALSE de cada linha de uma matriz uint8 (n, k), vetorizado em n."""
+    crc = np.full(rows.shape[0], 0xFFFF, dtype=np.uint16)
+    for i in range(rows.shape[1]):
+        crc = (crc << 8) ^ _CRC16_TABLE[(crc >> 8) ^ rows[:, i]]
+    return crc
+
+
+def reply_fits(cmd, lines):
+    """Confere se as linhas antes de um prompt têm o formato da resposta de `cmd`."""
+    parts = cmd.split()
+    if not parts:
+        return not lines
+    if len(lines) == 1 and lines[0].startswith("ERROR"):
+        return True
+    head = parts[0]
+    if head == "PING":
+        return lines == ["PONG"]
+    if head == "HELP":
+        return bool(lines) and lines[0] == "Comandos:"
+    if head == "SYS" and len(parts) > 1 and parts[1] == "RESET":
+        return lines == ["RESETTING..."]
+    if head == "SYS" and not (len(parts) > 2 and parts[1] == "HB"):
+        return len(lines) == 2 and lines[0].startswith("SYS:") and lines[1] == "OK"
+    if head == "FPGA_PEEK":
+        return len(lines) == 2 and lines[1] == "OK"
+    if head == "FPGA_UPLOAD":
+        return lines == ["FPGA_UPLOAD_READY"]
+    if head.startswith("ADC_"):
+        return lines == ["DISABLED"]
+    return lines == ["OK"]
+
+
+class SessionRecorder:
+    """Grava cada bloco TX/RX do comunicador, na ordem e com o instante em que ocorreu."""
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()    # leitor e escritor gravam de threads diferentes
+        self.f = open(path, "wb", buffering=1 << 16)
+        self.f.write(REC_MAGIC + REC_HEADER.pack(time.time_ns()))
+        self.t0 = time.monotonic_ns()
+        self.records = 0
+        self.nbytes = 0
+
+    def record(self, direction, data):
+        t = time.monotonic_ns() - self.t0
+        with self.lock:
+            if self.f is None:
+                return
+            self.f.write(REC_RECORD.pack(t, direction, len(data)) + data)
+            self.records += 1
+            self.nbytes += len(data)
+
+    def close(self):
+        with self.lock:
+            if self.f is not None:
+                self.f.close()
+                self.f = None
+
+
+def read_session(path):
+    """Lê um .pbrec e devolve (início em ns de relógio de parede, [(t_s, direção, bytes), ...]).
+
+    Um registro final incompleto (programa encerrado no meio da gravação) é ignorado.
+    """
+    with open(path, "rb") as f:
+        blob = f.read()
+    if not blob.startswith(REC_MAGIC):
+        raise ValueError(f"{path}: não é uma gravação .pbrec")
+    pos = len(REC_MAGIC)
+    (wall_ns,) = REC_HEADER.unpack_from(blob, pos)
+    pos += REC_HEADER.size
+    records = []
+    while pos + REC_RECORD.size <= len(blob):
+        t, direction, n = REC_RECORD.unpack_from(blob, pos)
+        pos += REC_RECORD.size
+        if pos + n > len(blob):
+            break
+        records.append((t * 1e-9, direction, blob[pos:pos + n]))
+        pos += n
+    return wall_ns, records
+
+
+class TelemetryDemux:
+    """Separa quadros binários de telemetria do texto da CLI no mesmo fluxo.
+
+    Quadro (little-endian, 14 bytes): A5 5A | seq u16 | ts u32 (us) | x y z int8 |
+    flags u8 | CRC-16/CCITT dos bytes 2..11. O texto do firmware é ASCII (nunca
+    contém 0xA5), então um leitor sem quadros paga só um bytes.find(). Com quadros,
+    candidatos a sync, CRC e extração são vetorizados sobre todo o bloco lido.
+    Quadros perdidos são contados pelos saltos de `seq`; o `ts` de 32 bits é
+    desdobrado para segundos contínuos.
+    """
+    def __init__(self):
+        self.pending = b""
+        self.last_seq = None
+        self.last_ts = None
+        self.ts_wraps = 0
+        self.frames = 0
+        self.lost = 0
+        self.bad_crc = 0
+
+    def feed(self, data):
+        """Devolve (amostras TELEM_DTYPE ou None, bytes de texto)."""
+        if self.pending:
+            data = self.pending + data
+            self.pending = b""
+        if data.find(FRAME_SYNC) < 0:
+            if data.endswith(FRAME_SYNC[:1]):
+                self.pending, data = data[-1:], data[:-1]
+            return None, data
+
+        arr = np.frombuffer(data, dtype=np.uint8)
+        n = arr.size
+        cand = np.flatnonzero((arr[:-1] == 0xA5) & (arr[1:] == 0x5A))
+        full = cand[cand + FRAME_SIZE <= n]
+        rows = arr[full[:, None] + np.arange(FRAME_SIZE)]
+        crc = rows[:, 12].astype(np.uint16) | (rows[:, 13].astype(np.uint16) << 8)
+        ok = crc16_ccitt_rows(rows[:, 2:12]) == crc
+        starts = full[ok]
+        if starts.size > 1 and np.any(np.diff(starts) < FRAME_SIZE):
+            keep, end = [], -1          # sync falso dentro de um quadro válido (raro)
+            for i, st in enumerate(starts):
+                if st >= end:
+                    keep.append(i)
+                    end = st + FRAME_SIZE
+            starts = starts[keep]
+            rows = rows[ok][keep]
+        else:
+            rows = rows[ok]
+
+        # Candidatos que não caem dentro de um quadro válido: corrompidos (descartados)
+        # ou incompletos no fim do bloco (guardados para a próxima leitura)
+        prev = np.searchsorted(starts, cand, side="right") - 1
+        inside = (prev >= 0) & (cand < starts[np.maximum(prev, 0)] + FRAME_SIZE) if starts.size else \
+            np.zeros(cand.size, dtype=bool)
+        orphans = cand[~inside]
+        cut = n
+        tail = orphans[orphans + FRAME_SIZE > n]
+        if tail.size:
+            cut = int(tail[0])
+        bad = orphans[orphans < cut]
+        self.bad_crc += int(bad.size)
+
+        drop = np.zeros(n, dtype=bool)
+        if starts.size:
+            drop[(starts[:, None] + np.arange(FRAME_SIZE)).ravel()] = True
+        if bad.size:
+            idx = (bad[:, None] + np.arange(FRAME_SIZE)).ravel()
+            drop[idx[idx < cut]] = True
+        # 0xA5 no fim pode ser meio sync; não se for o último byte (CRC) de um quadro
+        if cut == n and arr[-1] == 0xA5 and not drop[-1]:
+            cut = n - 1
+        self.pending = data[cut:]
+        text = arr[:cut][~drop[:cut]].tobytes()
+        if not starts.size:
+            return None, text
+        return self._samples(rows.copy().view(FRAME_DTYPE).ravel()), text
+
+    def _samples(self, fr):
+        seq = fr["seq"].astype(np.int64)
+        prev = seq[0] - 1 if self.last_seq is None else self.last_seq
+        gaps = np.diff(np.concatenate(([prev], seq))) & 0xFFFF
+        # salto > metade do espaço é reordenação/duplicata, não perda
+        self.lost += int(np.sum(np.where((gaps > 1) & (gaps < 0x8000), gaps - 1, 0)))
+        self.last_seq = int(seq[-1])
+        self.frames += fr.size
+
+        ts = fr["ts"].astype(np.int64)
+        prev_ts = ts[0] if self.last_ts is None else self.last_ts
+        wraps = self.ts_wraps + np.cumsum(np.diff(np.concatenate(([prev_ts], ts))) < -(1 << 31))
+        self.ts_wraps = int(wraps[-1])
+        self.last_ts = int(ts[-1])
+
+        out = np.empty(fr.size, dtype=TELEM_DTYPE)
+        out["t"] = (ts + (wraps << 32)) * 1e-6
+        out["xyz"] = fr["xyz"]
+        return out
+
+
+class AccelRing:
+    """Buffer circular pré-alocado das últimas amostras do acelerômetro.
+
+    `extend` copia um lote inteiro com no máximo duas fatias (sem alocação por
+    amostra); `view` devolve os dados em ordem cronológica. Um salto de tempo
+    para trás ou maior que a janela (troca texto/binário, reconexão) limpa o
+    buffer, já que as bases de tempo não se misturam.
+    """
+    def __init__(self, capacity=ACCEL_RING_CAPACITY):
+        self.cap = capacity
+        self.t = np.zeros(capacity)
+        self.xyz = np.zeros((capacity, 3), dtype=np.float32)
+        self.head = 0
+        self.count = 0
+        self.version = 0
+
+    def clear(self):
+        self.head = self.count = 0
+        self.version += 1
+
+    def extend(self, samples):
+        n = samples.size
+        if not n:
+            return
+        if self.count:
+            dt = samples["t"][0] - self.t[self.head - 1]
+            if dt < 0 or dt > ACCEL_PLOT_SECONDS:
+                self.clear()
+        if n > self.cap:
+            samples = samples[-self.cap:]
+            n = self.cap
+        first = min(n, self.cap - self.head)
+        self.t[self.head:self.head + first] = samples["t"][:first]
+        self.xyz[self.head:self.head + first] = samples["xyz"][:first]
+        self.t[:n - first] = samples["t"][first:]
+        self.xyz[:n - first] = samples["xyz"][first:]
+        self.head = (self.head + n) % self.cap
+        self.count = min(self.count + n, self.cap)
+        self.version += 1
+
+    def view(self, n=None):
+        """Últimas `n` amostras (todas se None) como (t, xyz) em ordem cronológica."""
+        n = self.count if n is None else min(n, self.count)
+        start = (self.head - n) % self.cap
+        if start + n <= self.cap:
+            return self.t[start:start + n], self.xyz[start:start + n]
+        return (np.concatenate((self.t[start:], self.t[:self.head])),
+                np.concatenate((self.xyz[start:], self.xyz[:self.head])))
+
+
+def accel_spectrum(t, xyz):
+    """Espectro (dB) das últimas amostras com janela de Hann; None se houver poucas."""
+    n = 1 << (min(t.size, ACCEL_FFT_N).bit_length() - 1) if t.size else 0
+    if n < 16 or t[-1] <= t[-n]:
+        return None
+    t, xyz = t[-n:], xyz[-n:]
+    fs = (n - 1) / (t[-1] - t[0])
+    w = np.hanning(n).astype(np.float32)
+    spec = np.fft.rfft((xyz - xyz.mean(axis=0)) * w[:, None], axis=0)
+    mag = 20 * np.log10(np.abs(spec) * (2 / w.sum()) + 1e-6)
+    return np.fft.rfftfreq(n, 1 / fs), mag, fs
+
+
+class LineScanner:
+    """Separa linhas sem deslocar o buffer a cada linha.
+
+    Os bytes novos são anexados ao fim; as linhas são recortadas por memoryview a
+    partir de `start`, e a busca por '\n' recomeça de onde parou. O prefixo já
+    consumido só é descartado quando passa de RX_COMPACT_BYTES. O prompt "> " que
+    o firmware imprime sem quebra de linha vira o evento PROMPT_MARK no lote, na
+    posição em que chegou (inclusive no fim do buffer, sem esperar a próxima linha).
+    """
+    def __init__(self):
+        self.buf = bytearray()
+        self.start = 0
+        self.scan = 0
+
+    def _emit(self, view, out):
+        n = len(view)
+        while n and view[n - 1] == 0x0D:
+            n -= 1
+        i = 0
+        while view[i:i + 2] == PROMPT:
+            i += 2
+            out.append(PROMPT_MARK)
+        if i < n:
+            text = str(view[i:n], "utf-8", "ignore").strip()
+            if text:
+                out.append(text)
+
+    def feed(self, data):
+        buf = self.buf
+        buf += data
+        out = []
+        view = memoryview(buf)
+        try:
+            while True:
+                nl = buf.find(b"\n", self.scan)
+                if nl < 0:
+                    if len(buf) - self.start > RX_MAX_LINE:
+                        nl = len(buf)
+                    else:
+                        self.scan = len(buf)
+                        break
+                self._emit(view[self.start:nl], out)
+                self.start = self.scan = nl + 1
+            while buf[self.start:self.start + 2] == PROMPT:
+                self.start += 2
+                self.scan = max(self.scan, self.start)
+                out.append(PROMPT_MARK)
+        finally:
+            view.release()
+        if self.start >= len(buf):
+            buf.clear()
+            self.start = self.scan = 0
+        elif self.start > RX_COMPACT_BYTES:
+            del buf[:self.start]
+            self.scan -= self.start
+            self.start = 0
+        return out
+
+
+class TxPacer:
+    """Janela de créditos para o TX, adaptada ao tempo de resposta do firmware.
+
+    Cada escrita consome um crédito e cada prompt "> " devolve um. A janela cresce
+    1/janela por resposta até `max_window`. O RTO segue SRTT + 4*RTTVAR.
+
+    Passar do RTO não prova que a linha se perdeu (o comando pode só estar lento):
+    o comando é marcado como expirado, mas o crédito fica retido e o writer manda
+    uma sonda (TX_PROBE); até ela responder nada mais é escrito. Como o firmware
+    responde em ordem, um prompt com texto aposenta o comando mais antigo,
+    expirado ou não; pela regra de Karn, um expirado não gera amostra de RTT. O
+    prompt vazio da sonda prova que tudo que foi escrito antes dela já foi
+    processado: o que ainda estiver na fila se perdeu.
+    """
+    def __init__(self, max_window=TX_WINDOW_MAX):
+        self.cv = threading.Condition()
+        self.max_window = max_window
+        self.reset()
+
+    def reset(self):
+        with self.cv:
+            self.window = 1.0
+            self.fifo = deque()         # [instante, expirado] por comando; TX_PROBE nas sondas
+            self.cmds = 0               # comandos na fila (créditos em uso)
+            self.probe_t = None         # instante da última sonda sem resposta
+            self.srtt = None
+            self.rttvar = 0.0
+            self.rto = TX_RTO_INIT_S
+            self.timeouts = 0
+            self.lost = 0
+            self.cv.notify_all()
+
+    def acquire(self, running):
+        """Bloqueia até haver crédito; devolve True, False (`running()` ficou falso)
+        ou TX_PROBE, quando o writer deve escrever a sonda antes de tentar de novo."""
+        with self.cv:
+            while running():
+                now = time.monotonic()
+                if self._expire(now):
+                    self.fifo.append(TX_PROBE)
+                    self.probe_t = now
+                    return TX_PROBE
+                # Com sonda pendente nada mais é escrito: ela pode estar no slot
+                if self.probe_t is None and self.cmds < int(self.window):
+                    self.fifo.append([now, False])
+                    self.cmds += 1
+                    return True
+                self.cv.wait(max(0.001, self._next_deadline() - now))
+            return False
+
+    def cancel(self):
+        """Devolve o crédito de uma escrita que falhou."""
+        with self.cv:
+            for i in range(len(self.fifo) - 1, -1, -1):
+                if self.fifo[i] is not TX_PROBE:
+                    del self.fifo[i]
+                    self.cmds -= 1
+                    break
+            self.cv.notify()
+
+    def on_reply(self, bare=False):
+        """Prompt recebido; `bare` = sem nenhuma linha de texto antes (resposta da sonda)."""
+        with self.cv:
+            fifo = self.fifo
+            if bare:
+                if TX_PROBE not in fifo:
+                    return  # prompt não solicitado
+                while True:
+                    if fifo.popleft() is TX_PROBE:
+                        break
+                    self.cmds -= 1
+                    self.lost += 1
+                # Uma sonda reenviada ainda pode estar no slot: espera por ela também
+                self.probe_t = time.monotonic() if TX_PROBE in fifo else None
+                self.cv.notify()
+                return
+            while fifo and fifo[0] is TX_PROBE:
+                fifo.popleft()  # sonda descartada pelo slot ocupado
+            if not fifo:
+                return  # banner, fim de FPGA_UPLOAD
+            t, expired = fifo.popleft()
+            self.cmds -= 1
+            if TX_PROBE not in fifo:
+                self.probe_t = None
+            if not expired:
+                rtt = time.monotonic() - t
+                if self.srtt is None:
+                    self.srtt, self.rttvar = rtt, rtt / 2
+                else:
+                    self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+                    self.srtt = 0.875 * self.srtt + 0.125 * rtt
+                self.rto = clamp(self.srtt + 4 * self.rttvar, TX_RTO_MIN_S, TX_RTO_MAX_S)
+                self.window = min(self.max_window, self.window + 1.0 / self.window)
+            self.cv.notify()
+
+    def _expire(self, now):
+        """Marca comandos vencidos; True se é hora de (re)enviar a sonda."""
+        pending = False
+        for e in self.fifo:
+            if e is TX_PROBE:
+                continue
+            if not e[1] and now - e[0] > self.rto:
+                e[1] = True
+                self.timeouts += 1
+                self.window = max(1.0, self.window / 2)
+                self.rto = min(TX_RTO_MAX_S, self.rto * 2)
+            pending = pending or e[1]
+        if self.probe_t is None:
+            return pending
+        if now - self.probe_t <= self.rto:
+            return False
+        if not pending:
+            # Só sondas na fila e nenhuma respondeu: foram descartadas com o slot ocupado
+            self.fifo = deque(e for e in self.fifo if e is not TX_PROBE)
+            self.probe_t = None
+            return False
+        return True  # comando expirado e sonda sem resposta: manda outra
+
+    def _next_deadline(self):
+        live = [e[0] for e in self.fifo if e is not TX_PROBE and not e[1]]
+        t = min(live) + self.rto if live else time.monotonic() + self.rto
+        if self.probe_t is not None:
+            t = min(t, self.probe_t + self.rto)
+        return t
+
+
 class HardwareCommunicator:
-    """Serial CDC com RX/TX em threads + fila de TX com pacing."""
-    def __init__(self, data_queue, status_cb=None):
+    """Serial CDC com RX/TX em threads + fila de TX com pacing por créditos."""
+    def __init__(self, data_queue, status_cb=None, telemetry_queue=None):
         self.ser = None
         self.port = None
         self.running = False
         self.rx_thread = None
         self.tx_thread = None
         self.data_queue = data_queue
-        self.status_cb = status_cb or (lambda *_: None)
+        self.telemetry_queue = telemetry_queue
+        self.reply_cb = None            # PyboardClient recebe o texto (com prompts) para correlacionar
+        self.status_cb = status_cb or (lambda *_, **__: None)
         self.tx_count = 0
         self.rx_count = 0
         self.tx_queue = queue.Queue()
-        self._last_write_ts = 0.0
+        self.pacer = TxPacer()
+        self._text_since_prompt = False  # distingue o prompt vazio da sonda do TxPacer
+        self.demux = TelemetryDemux()
+        self.recorder = None
 
-    def connect(self, port):
+    def connect(self, port, ser=None):
+        """Abre `port`; `ser` substitui a porta real por outro objeto tipo Serial (ex.: ReplaySerial)."""
         try:
             self.port = port
-            self.ser = serial.Serial(
+            self.ser = ser or serial.Serial(
                 self.port,
                 BAUDRATE,
-                timeout=0.2,
+                timeout=READ_TIMEOUT_S,
                 write_timeout=1.0,
                 exclusive=True
             )
@@ -76,14 +586,14 @@ class HardwareCommunicator:
             except Exception:
                 pass
 
+            self.pacer.reset()
+            self._text_since_prompt = False
             self.running = True
             self.rx_thread = threading.Thread(target=self._reader_loop, daemon=True)
             self.rx_thread.start()
             self.tx_thread = threading.Thread(target=self._writer_loop, daemon=True)
             self.tx_thread.start()
 
-            # Sondagem
-            self.send_command("PING", enqueue=True)
             self.status_cb(connected=True, port=self.port)
             return True, f"Conectado a {self.port} (CDC)"
         except serial.SerialException as e:
@@ -92,6 +602,7 @@ class HardwareCommunicator:
 
     def disconnect(self):
         self.running = False
+        self.pacer.reset()   # acorda o writer se estiver esperando crédito
         try:
             while not self.tx_queue.empty():
                 self.tx_queue.get_nowait()
@@ -111,35 +622,78 @@ class HardwareCommunicator:
         self.status_cb(connected=False, port=None)
         return True, "Desconectado."
 
+    def start_recording(self, path):
+        self.stop_recording()
+        self.recorder = SessionRecorder(path)
+        return self.recorder
+
+    def stop_recording(self):
+        rec, self.recorder = self.recorder, None
+        if rec is not None:
+            rec.close()
+        return rec
+
     def _reader_loop(self):
-        buff = bytearray()
+        ser = self.ser
+        scanner = LineScanner()
+        self.demux = demux = TelemetryDemux()
         while self.running:
             try:
-                if self.ser:
-                    chunk = self.ser.read(256)
-                    if chunk:
-                        buff.extend(chunk)
-                        while True:
-                            nl = buff.find(b'\n')
-                            if nl < 0:
-                                break
-                            line = buff[:nl+1]
-                            del buff[:nl+1]
-                            try:
-                                text = line.decode("utf-8", errors="ignore").strip()
-                            except Exception:
-                                text = ""
-                            if text:
-                                self.rx_count += len(line)
-                                self.data_queue.put(text)
-                                self.status_cb(rx=self.rx_count)
-                time.sleep(READ_SLEEP_S)
-            except (serial.SerialException, OSError):
+                # read(1) dorme no select() até chegar o primeiro byte (ou timeout);
+                # o resto já disponível vem no mesmo despertar, sem sleep.
+                first = ser.read(1)
+                if not first:
+                    continue
+                n = ser.in_waiting
+                data = first + ser.read(n) if n else first
+            except (serial.SerialException, OSError, TypeError):
                 self.data_queue.put("DISCONNECTED")
                 self.running = False
                 break
+            self.rx_count += len(data)
+            rec = self.recorder
+            if rec is not None:
+                rec.record(REC_RX, data)
+            frames, data = demux.feed(data)
+            if frames is not None and self.telemetry_queue is not None:
+                self.telemetry_queue.put(frames)
+            lines = scanner.feed(data) if data else None
+            if lines:
+                self._dispatch(lines)
+                self.status_cb(rx=self.rx_count)
+
+    def _dispatch(self, lines):
+        """Separa telemetria A:x,y,z do texto de resposta; um put por fila por lote."""
+        text, telem = [], []
+        for ln in lines:
+            if ln == PROMPT_MARK:
+                self.pacer.on_reply(bare=not self._text_since_prompt)
+                self._text_since_prompt = False
+            elif ln == "RESETTING...":
+                self.pacer.on_reply()
+            elif ln.startswith("A:"):
+                # Telemetria não conta como resposta (a sonda continua "sem texto")
+                xyz = parse_accel(ln) if self.telemetry_queue is not None else None
+                if xyz is not None:
+                    telem.append(xyz)
+                    continue
+            else:
+                self._text_since_prompt = True
+            text.append(ln)
+        if telem:
+            samples = np.empty(len(telem), dtype=TELEM_DTYPE)
+            samples["t"] = time.monotonic()
+            samples["xyz"] = telem
+            self.telemetry_queue.put(samples)
+        if text:
+            if self.reply_cb:
+                self.reply_cb(text)
+            shown = [ln for ln in text if ln != PROMPT_MARK]
+            if shown:
+                self.data_queue.put(shown)
 
     def _writer_loop(self):
+        running = lambda: self.running
         while self.running:
             try:
                 cmd = self.tx_queue.get(timeout=0.1)
@@ -147,28 +701,46 @@ class HardwareCommunicator:
                 continue
             if not self.running or not self.ser or not self.ser.is_open:
                 continue
-            now = time.time()
-            dt = (WRITE_GAP_MS/1000.0) - (now - self._last_write_ts)
-            if dt > 0:
-                time.sleep(dt)
+            # Em vez de um gap fixo, espera crédito: no máximo `window` comandos sem prompt
+            got = self.pacer.acquire(running)
+            while got is TX_PROBE:
+                self._write_probe()
+                got = self.pacer.acquire(running)
+            if not got:
+                break
+            payload = (cmd + CMD_EOL).encode("utf-8")
             try:
-                payload = (cmd + CMD_EOL).encode("utf-8")
                 self.ser.write(payload)
-                self._last_write_ts = time.time()
-                self.tx_count += len(payload)
-                self.status_cb(tx=self.tx_count, last_tx=cmd)
             except serial.SerialTimeoutException:
                 try:
                     self.ser.write(payload)
-                    self._last_write_ts = time.time()
-                    self.tx_count += len(payload)
-                    self.status_cb(tx=self.tx_count, last_tx=cmd)
                 except Exception:
+                    self.pacer.cancel()
                     self.data_queue.put("DISCONNECTED")
                     self.running = False
+                    continue
             except serial.SerialException:
+                self.pacer.cancel()
                 self.data_queue.put("DISCONNECTED")
                 self.running = False
+                continue
+            self.tx_count += len(payload)
+            rec = self.recorder
+            if rec is not None:
+                rec.record(REC_TX, payload)
+            self.status_cb(tx=self.tx_count, last_tx=cmd, rtt=self.pacer.srtt)
+
+    def _write_probe(self):
+        # Sonda do TxPacer: fora da janela de propósito; se o slot estiver ocupado
+        # e ela cair, só a sonda se perde e o pacer manda outra depois de um RTO
+        try:
+            self.ser.write(TX_PROBE)
+        except serial.SerialException:
+            return
+        self.tx_count += len(TX_PROBE)
+        rec = self.recorder
+        if rec is not None:
+            rec.record(REC_TX, TX_PROBE)
 
     def send_command(self, command: str, enqueue=False) -> bool:
         if not (self.ser and self.ser.is_open):
@@ -183,6 +755,9 @@ class HardwareCommunicator:
             payload = (command + CMD_EOL).encode("utf-8")
             self.ser.write(payload)
             self.tx_count += len(payload)
+            rec = self.recorder
+            if rec is not None:
+                rec.record(REC_TX, payload)
             self.status_cb(tx=self.tx_count, last_tx=command)
             return True
         except serial.SerialException:
@@ -191,6 +766,159 @@ class HardwareCommunicator:
             return False
 
 
+Reply = namedtuple("Reply", "cmd lines ok rtt")
+
+
+class _Pending:
+    __slots__ = ("cmd", "fut", "t0", "expired")
+
+    def __init__(self, cmd, fut):
+        self.cmd = cmd
+        self.fut = fut
+        self.t0 = time.monotonic()
+        self.expired = False
+
+
+class PyboardClient:
+    """Comandos como awaitables, resolvidos pela resposta correspondente.
+
+    Roda um event loop asyncio em thread própria. Cada comando fica numa fila FIFO
+    na ordem em que foi escrito; o texto recebido até o próximo prompt "> " é a
+    resposta do mais antigo, mesmo que ele já tenha expirado (a resposta atrasada
+    é dele e é descartada). Se ela não couber nele mas couber num seguinte, o
+    firmware descartou a linha (slot ocupado) e os anteriores falham.
+    O número de comandos em voo é limitado por `max_inflight`.
+
+    Da thread da GUI use submit()/run(), que devolvem concurrent.futures.Future.
+    """
+    def __init__(self, communicator, max_inflight=CMD_MAX_INFLIGHT):
+        self.comm = communicator
+        self.loop = asyncio.new_event_loop()
+        self._pending = deque()
+        self._acc = []
+        self._slots = asyncio.Semaphore(max_inflight)
+        self._latest = {}           # chave -> (corotina, args) mais recente ainda não aplicada
+        self._latest_tasks = {}
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        communicator.reply_cb = self._feed_threadsafe
+
+    # ---------- API (thread da GUI) ----------
+    def submit(self, cmd, timeout=CMD_TIMEOUT_S):
+        return asyncio.run_coroutine_threadsafe(self.request(cmd, timeout), self.loop)
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def submit_latest(self, key, coro_fn, *args):
+        """Transação "a mais recente vence" para `key`.
+
+        Se já houver uma em andamento, o pedido fica guardado no lugar de qualquer
+        outro ainda não aplicado e roda quando ela terminar; os intermediários são
+        descartados. Assim um slider arrastado gera no máximo uma transação em voo.
+        """
+        self.loop.call_soon_threadsafe(self._submit_latest, key, coro_fn, args)
+
+    def has_latest(self, key):
+        """Há pedido mais novo esperando para `key` (chamar dentro do loop)."""
+        return key in self._latest
+
+    def reset(self):
+        """Descarta respostas parciais e falha o que estiver pendente (conectar/desconectar)."""
+        self.loop.call_soon_threadsafe(self._fail_all, ConnectionError("conexão reiniciada"))
+
+    def close(self):
+        self.reset()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    # ---------- API (dentro do loop) ----------
+    async def request(self, cmd, timeout=CMD_TIMEOUT_S):
+        await self._slots.acquire()
+        try:
+            entry = _Pending(cmd, self.loop.create_future())
+            self._pending.append(entry)
+            if not self.comm.send_command(cmd, enqueue=True):
+                self._pending.remove(entry)
+                raise ConnectionError("não conectado")
+            try:
+                return await asyncio.wait_for(entry.fut, timeout)
+            except asyncio.TimeoutError:
+                entry.expired = True
+                raise TimeoutError(f"sem resposta para '{cmd}'") from None
+        finally:
+            self._slots.release()
+
+    async def sequence(self, cmds, timeout=CMD_TIMEOUT_S):
+        """Envia um comando após o OK do anterior; para no primeiro ERROR."""
+        replies = []
+        for cmd in cmds:
+            r = await self.request(cmd, timeout)
+            replies.append(r)
+            if not r.ok:
+                break
+        return replies
+
+    def _submit_latest(self, key, coro_fn, args):
+        self._latest[key] = (coro_fn, args)
+        if key not in self._latest_tasks:
+            self._latest_tasks[key] = self.loop.create_task(self._drain_latest(key))
+
+    async def _drain_latest(self, key):
+        try:
+            while key in self._latest:
+                coro_fn, args = self._latest.pop(key)
+                try:
+                    await coro_fn(*args)
+                except Exception as exc:
+                    # Uma transação que falha não pode parar a fila da chave
+                    self.loop.call_exception_handler({
+                        "message": f"submit_latest({key!r}) falhou", "exception": exc})
+        finally:
+            del self._latest_tasks[key]
+
+    # ---------- Recepção ----------
+    def _feed_threadsafe(self, lines):
+        self.loop.call_soon_threadsafe(self._on_lines, lines)
+
+    def _on_lines(self, lines):
+        for ln in lines:
+            if ln == PROMPT_MARK:
+                self._on_prompt()
+            else:
+                self._acc.append(ln)
+                if ln == "RESETTING...":
+                    self._on_prompt()  # o MCU reinicia sem imprimir prompt
+
+    def _on_prompt(self):
+        reply, self._acc = self._acc, []
+        now = time.monotonic()
+        pend = self._pending
+        while pend and pend[0].expired and now - pend[0].t0 > CMD_GHOST_TTL_S:
+            pend.popleft()
+        # O firmware responde em ordem: a resposta é do primeiro comando em espera com
+        # esse formato, mesmo expirado (senão um comando vivo ficaria com a resposta
+        # atrasada do anterior). Quem está antes dele teve a linha descartada pelo slot único.
+        idx = next((i for i, p in enumerate(pend) if reply_fits(p.cmd, reply)), None)
+        if idx is None:
+            return  # banner, fim de FPGA_UPLOAD, etc.
+        for _ in range(idx):
+            p = pend.popleft()
+            if not p.fut.done():
+                p.fut.set_exception(ConnectionError(f"linha '{p.cmd}' descartada pelo firmware"))
+        head = pend.popleft()
+        if head.fut.done():
+            return  # resposta atrasada de um comando que já expirou
+        ok = not any(ln.startswith("ERROR") for ln in reply)
+        head.fut.set_result(Reply(head.cmd, reply, ok, now - head.t0))
+
+    def _fail_all(self, exc):
+        self._acc = []
+        while self._pending:
+            p = self._pending.popleft()
+            if not p.fut.done():
+                p.fut.set_exception(exc)
+
+
 class App(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -200,17 +928,25 @@ class App(ctk.CTk):
 
         # Estado
         self.data_queue = queue.Queue()
-        self.communicator = HardwareCommunicator(self.data_queue, status_cb=self._update_status)
+        self.telemetry_queue = queue.Queue()
+        self.ui_calls = queue.Queue()      # callbacks vindos do loop asyncio, executados na thread Tk
+        self.communicator = HardwareCommunicator(self.data_queue, status_cb=self._update_status,
+                                                 telemetry_queue=self.telemetry_queue)
+        self.client = PyboardClient(self.communicator)
         self.is_wave_running = False
         self.is_accel_on = False
         self.hb_on = True
-
-        self._freq_send_after_id = None
-        self._win_send_after_id = None
-
-        # Sequenciador AWG
-        self._awg_apply_token = 0
-        self._awg_retry_armed = False
+        self.accel_ring = AccelRing()
+        self._plot_version = -1
+        self._plot_bg = None
+        self._fft_fs = None
+        # Texto do console e status acumulados entre quadros (ver _flush_ui)
+        self._console_pending = deque(maxlen=CONSOLE_MAX_LINES)
+        self._console_lines = 0
+        self._status_dirty = False
+
+        # Transações do AWG (coalescidas no PyboardClient, chave "awg")
+        self._awg_atomic = None          # firmware aceita "AWG ..."? None = ainda não sabemos
         self._last_wave_cmd_text = None  # só pra log/evitar flood se parar
 
         # Layout
@@ -228,6 +964,7 @@ class App(ctk.CTk):
         # Tarefas
         self._refresh_ports()
         self._process_serial_queue()
+        self._refresh_accel_plot()
 
         # Fechamento limpo
         self.protocol("WM_DELETE_WINDOW", self._on_close)
@@ -252,6 +989,8 @@ class App(ctk.CTk):
         self.ping_btn.grid(row=0, column=4, padx=(12, 6), pady=6)
         self.help_btn = ctk.CTkButton(frame, text="HELP", width=70, command=lambda: self._send("HELP"))
         self.help_btn.grid(row=0, column=5, padx=6, pady=6)
+        self.rec_switch = ctk.CTkSwitch(frame, text="Gravar sessão", command=self._toggle_recording)
+        self.rec_switch.grid(row=0, column=6, padx=(12, 6), pady=6)
 
     def _build_sys_panel(self, row):
         frame = ctk.CTkFrame(self)
@@ -343,11 +1082,46 @@ class App(ctk.CTk):
             row=0, column=0, columnspan=3, pady=(8, 6)
         )
         self.accel_switch = ctk.CTkSwitch(frame, text="Ativar leitura contínua", command=self._toggle_accel)
-        self.accel_switch.grid(row=1, column=0, columnspan=3, pady=8)
+        self.accel_switch.grid(row=1, column=0, columnspan=2, pady=8)
+        self.accel_mode_menu = ctk.CTkOptionMenu(frame, values=list(ACCEL_MODES), width=150,
+                                                 command=lambda *_: self._toggle_accel())
+        self.accel_mode_menu.set("Texto ~10 Hz")
+        self.accel_mode_menu.grid(row=1, column=2, padx=10, pady=8)
 
         self.pb_x, self.lbl_x = self._axis_row(frame, "Eixo X:", 2)
         self.pb_y, self.lbl_y = self._axis_row(frame, "Eixo Y:", 3)
         self.pb_z, self.lbl_z = self._axis_row(frame, "Eixo Z:", 4)
+        self.frames_lbl = ctk.CTkLabel(frame, text="", anchor="w")
+        self.frames_lbl.grid(row=5, column=0, columnspan=3, padx=10, pady=(0, 6), sticky="w")
+        self._build_accel_plot(frame)
+
+    def _build_accel_plot(self, frame):
+        # Histórico (strip chart) + FFT da janela recente, desenhados com blitting
+        frame.grid_columnconfigure(3, weight=2)
+        self.accel_fig, (self.ax_strip, self.ax_fft) = plt.subplots(
+            1, 2, figsize=(6.4, 2.2), facecolor="#2B2B2B", gridspec_kw={"width_ratios": [3, 2]})
+        for ax in (self.ax_strip, self.ax_fft):
+            ax.set_facecolor("#3C3C3C")
+            ax.tick_params(colors="white", labelsize=7)
+            ax.grid(True, color="#555555", linewidth=0.5)
+        self.ax_strip.set_xlim(-ACCEL_PLOT_SECONDS, 0)
+        self.ax_strip.set_ylim(-33, 33)
+        self.ax_strip.set_title("Aceleração (contagens)", color="white", fontsize=8)
+        self.ax_fft.set_xlim(0, 5)
+        self.ax_fft.set_ylim(-40, 40)
+        self.ax_fft.set_title("FFT (dB)", color="white", fontsize=8)
+        colors = ("#FF6B6B", "#6BCB77", "#4D96FF")
+        self.strip_lines = [self.ax_strip.plot([], [], color=c, lw=0.8, animated=True)[0] for c in colors]
+        self.fft_lines = [self.ax_fft.plot([], [], color=c, lw=0.8, animated=True)[0] for c in colors]
+        self.accel_fig.tight_layout(pad=0.6)
+        self.accel_canvas = FigureCanvasTkAgg(self.accel_fig, master=frame)
+        self.accel_canvas.get_tk_widget().grid(row=0, column=3, rowspan=6, padx=(0, 6), pady=6, sticky="nsew")
+        # Todo redesenho completo (inclusive redimensionar) renova o fundo usado no blit
+        self.accel_canvas.mpl_connect("draw_event", self._cache_plot_bg)
+
+    def _cache_plot_bg(self, _event=None):
+        self._plot_bg = self.accel_canvas.copy_from_bbox(self.accel_fig.bbox)
+        self._plot_version = -1
 
     def _axis_row(self, parent, text, row):
         ctk.CTkLabel(parent, text=text).grid(row=row, column=0, padx=10, pady=5, sticky="w")
@@ -383,6 +1157,10 @@ class App(ctk.CTk):
     # ---------- Conexão ----------
     def _refresh_ports(self):
         ports = [p.device for p in serial.tools.list_ports.comports()]
+        # Porta extra (ex.: pty do pyboard_emulator.py), que o comports() não lista
+        extra = os.environ.get("PYBOARD_PORT")
+        if extra and extra not in ports:
+            ports.insert(0, extra)
         self.port_menu.configure(values=ports if ports else ["(nenhuma)"])
         if ports:
             cur = self.port_menu.get()
@@ -393,9 +1171,9 @@ class App(ctk.CTk):
 
     def _toggle_connection(self):
         if self.communicator.running:
-            self._send("ACCEL 0")
-            self._send("DAC 0")
+            self._shutdown_link()
             _, msg = self.communicator.disconnect()
+            self.client.reset()
             self._log(f"[pc] {msg}")
             self.connect_button.configure(text="Conectar")
         else:
@@ -403,14 +1181,41 @@ class App(ctk.CTk):
             if not port or port.startswith("("):
                 messagebox.showerror("Erro", "Nenhuma porta serial selecionada.")
                 return
+            self.client.reset()
+            self._awg_atomic = None     # a placa pode ter outro firmware desde a última conexão
             ok, msg = self.communicator.connect(port)
             self._log(f"[pc] {msg}")
             if ok:
                 self.connect_button.configure(text="Desconectar")
-                self.after(350, lambda: self._send("HELP"))
-                self.after(500, lambda: self._send(f"SYS HB {1 if self.hb_on else 0}"))
-                # aplica janela/taper default no firmware (sem ligar AWG)
-                self.after(650, lambda: self._send(f"WAVEWIN {self.win_menu.get()} {int(self.taper_slider.get())}"))
+                # Sondagem e estado inicial, cada comando após o OK do anterior
+                # (aplica janela/taper default no firmware sem ligar o AWG)
+                cmds = ["PING", "HELP", f"SYS HB {1 if self.hb_on else 0}",
+                        f"WAVEWIN {self.win_menu.get()} {int(self.taper_slider.get())}"]
+                self._watch(self.client.run(self.client.sequence(cmds)), "inicialização")
+
+    def _toggle_recording(self):
+        # Grava TX/RX em .pbrec para reproduzir offline com serial_replay.py
+        if self.rec_switch.get():
+            path = time.strftime("sessao_%Y%m%d_%H%M%S.pbrec")
+            try:
+                self.communicator.start_recording(path)
+            except OSError as e:
+                self.rec_switch.deselect()
+                self._log(f"[pc] Gravação: falha ({e}).")
+                return
+            self._log(f"[pc] Gravando sessão em {os.path.abspath(path)}")
+        else:
+            rec = self.communicator.stop_recording()
+            if rec is not None:
+                self._log(f"[pc] Gravação encerrada: {rec.records} blocos, {rec.nbytes} bytes.")
+
+    def _shutdown_link(self):
+        """Desliga ACCEL e DAC esperando as confirmações (no máximo ~0,5 s)."""
+        fut = self.client.run(self.client.sequence(["ACCEL 0", "DAC 0"], timeout=0.25))
+        try:
+            fut.result(timeout=0.6)
+        except Exception:
+            pass
 
     # ---------- Sistema ----------
     def _toggle_hb(self):
@@ -435,30 +1240,25 @@ class App(ctk.CTk):
 
     def _window_changed(self, *_):
         # Mesmo sem AWG rodando, configuramos a janela no firmware
-        if self._win_send_after_id:
-            self.after_cancel(self._win_send_after_id)
-        self._win_send_after_id = self.after(WIN_DEBOUNCE_MS, self._apply_window_and_maybe_rearm)
+        self._apply_window_and_maybe_rearm()
 
     def _apply_window_and_maybe_rearm(self):
-        self._send(f"WAVEWIN {self.win_menu.get()} {int(self.taper_slider.get())}")
         if self.is_wave_running:
             self._queue_awg_rearm()
+        elif self.communicator.running:
+            self.client.submit_latest("awg", self._awg_transaction,
+                                      ("win", self.win_menu.get(), int(self.taper_slider.get())))
 
     def _on_taper_slider(self, value):
         self.taper_val.configure(text=f"{int(value)}%")
-        if self._win_send_after_id:
-            self.after_cancel(self._win_send_after_id)
-        self._win_send_after_id = self.after(WIN_DEBOUNCE_MS, self._apply_window_and_maybe_rearm)
+        self._apply_window_and_maybe_rearm()
 
     def _on_freq_slider(self, value):
         self.freq_entry.delete(0, tk.END)
         self.freq_entry.insert(0, f"{int(value)}")
-        if self._freq_send_after_id:
-            self.after_cancel(self._freq_send_after_id)
-        self._freq_send_after_id = self.after(FREQ_DEBOUNCE_MS, self._freq_maybe_send)
+        self._freq_maybe_send()
 
     def _freq_maybe_send(self):
-        self._freq_send_after_id = None
         if self.is_wave_running:
             self._queue_awg_rearm()
 
@@ -482,10 +1282,12 @@ class App(ctk.CTk):
             self.is_wave_running = False
             self.start_btn.configure(text="Iniciar")
             self._last_wave_cmd_text = None
-            self._send("DAC 0")
+            if self.communicator.running:
+                # pela mesma fila de transações: descarta um rearm pendente e para depois do em voo
+                self.client.submit_latest("awg", self._awg_transaction, ("stop",))
 
     def _queue_awg_rearm(self):
-        """Coalescer mudanças e rearmar AWG: DAC 0 -> (WAVEWIN) -> WAVE ... com cancel de sequências antigas."""
+        """Pede ao AWG o estado atual da GUI; mudanças rápidas são coalescidas no cliente."""
         if not self.communicator.running:
             return
 
@@ -494,85 +1296,179 @@ class App(ctk.CTk):
         except ValueError:
             f = DEFAULT_FREQ
         f = clamp(f, MIN_FREQ_HZ, MAX_FREQ_HZ)
-        w = self.wave_menu.get()
-        win = self.win_menu.get()
-        taper = int(self.taper_slider.get())
-
-        # Incrementa token para invalidar sequências anteriores
-        self._awg_apply_token += 1
-        my_token = self._awg_apply_token
-        self._awg_retry_armed = False  # limpa retry
-
-        # Monta comandos
-        cmd_stop = "DAC 0"
-        cmd_win  = f"WAVEWIN {win} {taper}"
-        cmd_wave = f"WAVE {w} {f}"
-        self._last_wave_cmd_text = cmd_wave
-
-        # Dispara com pequenos gaps, respeitando token
-        self._send(cmd_stop)  # stop imediato
-        self.after(AWG_REARM_STEP_MS, lambda: self._send_if_token(cmd_win, my_token))
-        self.after(2*AWG_REARM_STEP_MS, lambda: self._send_if_token(cmd_wave, my_token))
-
-    def _send_if_token(self, cmd, token):
-        if token != self._awg_apply_token:
-            return  # sequência antiga, ignorar
-        self._send(cmd)
+        target = ("run", self.wave_menu.get(), f, self.win_menu.get(), int(self.taper_slider.get()))
+        self._last_wave_cmd_text = f"WAVE {target[1]} {f}"
+        self.client.submit_latest("awg", self._awg_transaction, target)
+
+    async def _awg_transaction(self, target):
+        """Aplica um alvo do AWG (roda no loop do PyboardClient).
+
+        ("run", onda, freq, janela, taper) vira uma única linha "AWG ..." e uma única
+        resposta; firmware sem esse comando cai na sequência DAC 0 -> WAVEWIN -> WAVE,
+        cada passo após o OK do anterior. ("win", janela, taper) e ("stop",) são um
+        comando só.
+        """
+        kind = target[0]
+        try:
+            for attempt in range(2):
+                if kind == "stop":
+                    replies = [await self.client.request("DAC 0")]
+                elif kind == "win":
+                    replies = [await self.client.request(f"WAVEWIN {target[1]} {target[2]}")]
+                else:
+                    _, wave, freq, win, taper = target
+                    replies = []
+                    if self._awg_atomic is not False:
+                        r = await self.client.request(f"AWG {wave} {freq} {win} {taper}")
+                        if r.lines == [ERR_UNKNOWN_CMD]:
+                            self._awg_atomic = False
+                        else:
+                            self._awg_atomic = True
+                            replies = [r]
+                    if not replies:
+                        replies = await self.client.sequence(
+                            ["DAC 0", f"WAVEWIN {win} {taper}", f"WAVE {wave} {freq}"])
+                r = replies[-1]
+                # Se o firmware acusar falha no start, tenta um único rearm com backoff
+                # curto, a menos que já exista um alvo mais novo esperando
+                if r.ok or attempt or "ERROR: DAC start" not in r.lines:
+                    return
+                await asyncio.sleep(AWG_RETRY_BACKOFF_MS / 1000.0)
+                if self.client.has_latest("awg") or not self.is_wave_running:
+                    return
+        except (TimeoutError, ConnectionError) as exc:
+            text = f"[pc] AWG: {exc}."
+        except Exception as exc:
+            text = f"[pc] AWG: falha ({exc})."
+        else:
+            return
+        self.ui_calls.put(lambda: self._log(text))
 
     # ---------- ACCEL ----------
     def _toggle_accel(self):
         self.is_accel_on = bool(self.accel_switch.get())
-        self._send(f"ACCEL {1 if self.is_accel_on else 0}")
+        # "ACCEL 2 <hz>" pede quadros binários; firmware só-texto lê como ACCEL 1
+        self._send(ACCEL_MODES[self.accel_mode_menu.get()] if self.is_accel_on else "ACCEL 0")
 
     # ---------- Serial processing ----------
+    @staticmethod
+    def _drain(q):
+        items = []
+        try:
+            while True:
+                items.append(q.get_nowait())
+        except queue.Empty:
+            return items
+
     def _process_serial_queue(self):
+        # Um quadro: esvazia as filas de uma vez e aplica o resultado num só passo
         try:
-            while not self.data_queue.empty():
-                msg = self.data_queue.get_nowait()
-                if msg == "DISCONNECTED":
+            for call in self._drain(self.ui_calls):
+                call()
+            for item in self._drain(self.data_queue):
+                if item == "DISCONNECTED":
                     self._log("[pc] Conexão perdida.")
+                    self.client.reset()
                     self.connect_button.configure(text="Conectar")
                     self._update_status(connected=False, port=None)
                     continue
+                # O leitor entrega um lote de linhas por despertar
+                self._console_pending.extend(f"Pyboard: {msg}" for msg in item)
+                self._status_data["last"] = self._console_pending[-1]
+                self._status_dirty = True
+            # Telemetria vem em fila própria: tudo vai para o buffer do gráfico,
+            # só a amostra mais recente vai para as barras
+            batch = self._drain(self.telemetry_queue)
+            if batch:
+                self.accel_ring.extend(np.concatenate(batch) if len(batch) > 1 else batch[0])
+                self._show_accel(*map(int, batch[-1]["xyz"][-1]))
+                d = self.communicator.demux
+                if d.frames:
+                    self.frames_lbl.configure(
+                        text=f"Quadros: {d.frames}  perdidos: {d.lost}  CRC inválido: {d.bad_crc}")
+            self._flush_ui()
+        finally:
+            self.after(UI_POLL_MS, self._process_serial_queue)
+
+    def _flush_ui(self):
+        """Aplica o texto e o status acumulados: uma inserção e um configure por quadro."""
+        if self._console_pending:
+            text = "\n".join(self._console_pending) + "\n"
+            self._console_pending.clear()
+            self.console.configure(state="normal")
+            self.console.insert("end", text)
+            self._console_lines += text.count("\n")
+            if self._console_lines > CONSOLE_MAX_LINES + CONSOLE_TRIM_LINES:
+                excess = self._console_lines - CONSOLE_MAX_LINES
+                self.console.delete("1.0", f"{excess + 1}.0")
+                self._console_lines = CONSOLE_MAX_LINES
+            self.console.see("end")
+            self.console.configure(state="disabled")
+        if self._status_dirty:
+            self._status_dirty = False
+            self._render_status()
+
+    def _refresh_accel_plot(self):
+        # Redesenha à taxa de tela, e só se chegou amostra nova desde o último quadro
+        try:
+            ring = self.accel_ring
+            if self._plot_bg is None or ring.version == self._plot_version or not ring.count:
+                return
+            self._plot_version = ring.version
+            t, xyz = ring.view()
+            spec = accel_spectrum(t, xyz)
+            if spec is not None and (self._fft_fs is None or abs(spec[2] - self._fft_fs) > 0.1 * self._fft_fs):
+                # Taxa mudou (texto <-> binário): reescala o eixo e refaz o fundo
+                self._fft_fs = spec[2]
+                self.ax_fft.set_xlim(0, self._fft_fs / 2)
+                self.accel_canvas.draw()
+                return
 
-                self._log(f"Pyboard: {msg}")
-
-                if msg.startswith("A:"):
-                    try:
-                        x, y, z = map(int, msg[2:].split(","))
-                        self.pb_x.set((x + 32) / 63)
-                        self.pb_y.set((y + 32) / 63)
-                        self.pb_z.set((z + 32) / 63)
-                        self.lbl_x.configure(text=str(x))
-                        self.lbl_y.configure(text=str(y))
-                        self.lbl_z.configure(text=str(z))
-                    except Exception:
-                        pass
-                elif msg == "ERROR: DAC start":
-                    # Se o firmware acusar falha, tente um único rearm com backoff curto
-                    if self.is_wave_running and not self._awg_retry_armed:
-                        self._awg_retry_armed = True
-                        tok_before = self._awg_apply_token
-                        self.after(AWG_RETRY_BACKOFF_MS, lambda: self._retry_awg_if_still(tok_before))
+            lo = np.searchsorted(t, t[-1] - ACCEL_PLOT_SECONDS)
+            step = max(1, -(-(t.size - lo) // ACCEL_PLOT_POINTS))
+            tt, vv = t[lo::step] - t[-1], xyz[lo::step]
+            self.accel_canvas.restore_region(self._plot_bg)
+            for i, line in enumerate(self.strip_lines):
+                line.set_data(tt, vv[:, i])
+                self.ax_strip.draw_artist(line)
+            if spec is not None:
+                for i, line in enumerate(self.fft_lines):
+                    line.set_data(spec[0], spec[1][:, i])
+                    self.ax_fft.draw_artist(line)
+            self.accel_canvas.blit(self.accel_fig.bbox)
         finally:
-            self.after(80, self._process_serial_queue)
+            self.after(ACCEL_PLOT_MS, self._refresh_accel_plot)
 
-    def _retry_awg_if_still(self, prev_token):
-        # só re-tenta se ninguém mexeu desde então (token não mudou) e ainda está rodando
-        if not self.is_wave_running:
-            return
-        if prev_token != self._awg_apply_token:
-            return
-        self._queue_awg_rearm()
+    def _show_accel(self, x, y, z):
+        self.pb_x.set((x + 32) / 63)
+        self.pb_y.set((y + 32) / 63)
+        self.pb_z.set((z + 32) / 63)
+        self.lbl_x.configure(text=str(x))
+        self.lbl_y.configure(text=str(y))
+        self.lbl_z.configure(text=str(z))
 
     # ---------- Util ----------
     def _send(self, cmd: str):
         if not self.communicator.running:
             self._log("[pc] Não conectado.")
-            return
-        ok = self.communicator.send_command(cmd, enqueue=True)
-        if not ok:
-            self._log("[pc] Falha ao enfileirar comando.")
+            return None
+        return self._watch(self.client.submit(cmd), cmd)
+
+    def _watch(self, fut, what):
+        """Registra no console (via thread Tk) timeouts e falhas de um comando/sequência."""
+        def done(f):
+            if f.cancelled():
+                return
+            exc = f.exception()
+            if exc is None:
+                return
+            if isinstance(exc, TimeoutError):
+                text = f"[pc] {what}: {exc}."
+            else:
+                text = f"[pc] {what}: falha ({exc})."
+            self.ui_calls.put(lambda: self._log(text))
+        fut.add_done_callback(done)
+        return fut
 
     def _send_manual(self):
         txt = self.entry_cmd.get().strip()
@@ -582,13 +1478,12 @@ class App(ctk.CTk):
         self.entry_cmd.delete(0, tk.END)
 
     def _log(self, text: str):
-        self.console.configure(state="normal")
-        self.console.insert("end", text + "\n")
-        self.console.see("end")
-        self.console.configure(state="disabled")
+        # Só acumula; _flush_ui insere tudo de uma vez no próximo quadro
+        self._console_pending.append(text)
         self._update_status(last=text)
 
-    def _update_status(self, connected=None, port=None, tx=None, rx=None, last=None, last_tx=None):
+    def _update_status(self, connected=None, port=None, tx=None, rx=None, last=None, last_tx=None, rtt=None):
+        # Pode vir das threads do comunicador: só registra, o desenho fica para _flush_ui
         if connected is not None:
             self._status_data["connected"] = connected
         if port is not None:
@@ -601,21 +1496,28 @@ class App(ctk.CTk):
             self._status_data["last"] = last
         if last_tx is not None:
             self._status_data["last_tx"] = last_tx
+        if rtt is not None:
+            self._status_data["rtt"] = rtt
+        self._status_dirty = True
 
+    def _render_status(self):
         s = "Conectado" if self._status_data["connected"] else "Desconectado"
         p = self._status_data["port"] or "-"
         txb = self._status_data["tx"]
         rxb = self._status_data["rx"]
         lt = self._status_data.get("last_tx", "")
-        self.status.configure(text=f"{s} [{p}]   Tx:{txb}  Rx:{rxb}   Última TX: {lt}")
+        rtt = self._status_data.get("rtt")
+        rtt_txt = f"   RTT: {rtt*1000:.1f} ms" if rtt is not None else ""
+        self.status.configure(text=f"{s} [{p}]   Tx:{txb}  Rx:{rxb}   Última TX: {lt}{rtt_txt}")
 
     def _on_close(self):
         try:
             if self.communicator.running:
-                self._send("ACCEL 0")
-                self._send("DAC 0")
-                time.sleep(0.05)
+                self._shutdown_link()
                 self.communicator.disconnect()
+            self.communicator.stop_recording()
+            self.client.close()
+            plt.close(self.accel_fig)
         finally:
             self.destroy()
 
@@ -0,0 +1,768 @@
+"""
+Emulador da CLI do firmware Pyboard v1.1 (Core/Src/main.c) sobre um pseudo-terminal.
+
+Abre um par pty, imprime o caminho do lado "escravo" e responde como a placa:
+mesmo banner, mesmo prompt "> ", mesma tabela de comandos e as mesmas
+mensagens de erro. Também reproduz as limitações que importam para testar os
+hosts (gerador_funcionando.py, wav_control_pyboard.py, awg_stm32_sexta.py):
+
+  - slot único de linha do usbd_cdc_if.c: linhas que chegam enquanto o
+    comando anterior não foi consumido pelo superloop são descartadas;
+  - linhas truncadas em 127 bytes, '\r' ou '\n' terminam a linha;
+  - FPGA_UPLOAD em modo binário com anel de 2048 bytes; o EP OUT fica em NAK
+    enquanto o anel não comporta outro pacote (--no-usb-nak: overflow descarta),
+    consumo em blocos de 1024 bytes, tempo de SPI conforme SPI_SPEED e CRC32
+    idêntico ao periférico CRC do STM32;
+  - streaming "A:x,y,z" a ~10 Hz com o mesmo filtro de Kalman por eixo.
+
+Uso:
+    python pyboard_emulator.py [--link /tmp/pyboard] [--latency-ms 2] ...
+    PYBOARD_PORT=/tmp/pyboard python gerador_funcionando.py
+"""
+import argparse
+import errno
+import os
+import random
+import re
+import select
+import sys
+import time
+import tty
+import zlib
+
+import numpy as np
+
+# ========= Constantes do firmware =========
+SYSCLK_HZ = 168_000_000
+PCLK1_HZ = 42_000_000
+PCLK2_HZ = 84_000_000          # SPI1 fica no APB2
+LUT_N = 256
+DAC_FS_MAX_HZ = 1.0e6
+FMAX_HZ = DAC_FS_MAX_HZ / LUT_N
+
+RX_LINE_BUF_SZ = 128           # usbd_cdc_if.c
+RX_BIN_BUF_SZ = 2048           # anel do modo binário
+BIN_CHUNK = 1024               # process_fpga_upload()
+FPGA_MAX_BYTES = 32 * 1024 * 1024
+FPGA_PEEK_MAX = 1024
+USB_FS_PACKET = 64             # tamanho máximo do pacote bulk OUT (Full Speed)
+ACCEL_PERIOD_S = 0.100
+ACCEL_BIN_MAX_HZ = 8000        # ACCEL 2 <hz>: quadros binários de telemetria
+ACCEL_BIN_DEFAULT_HZ = 1000
+ACCEL_BIN_FLUSH_S = 0.005      # quadros acumulados por escrita (como o buffer de TX do CDC)
+SPI_DIVISORS = (2, 4, 8, 16, 32, 64, 128, 256)
+SPI_DEFAULT_DIV = 8
+
+WAVE_TYPES = ("SINE", "SQUARE", "TRI", "SAWUP", "SAWDN")
+WIN_TYPES = ("NONE", "HANN", "BLACKMAN", "NUTTALL")
+
+PROMPT = "> "
+EOL = "\r\n"
+BANNER = (f"{EOL}Pyboard v1.1 — AWG/ACCEL/FPGA CLI pronto. fmax(sine,N=256)={FMAX_HZ:.1f} Hz{EOL}"
+          f"Digite HELP{EOL}")
+
+# Tabela de ajuda na mesma ordem de cmds[] em main.c
+HELP_ROWS = (
+    ("HELP", "Lista de comandos"),
+    ("PING", "PONG"),
+    ("LED", "LED <n:0..3> <0|1>"),
+    ("ACCEL", "ACCEL <0|1|2 hz> (stream A:x,y,z | quadros)"),
+    ("KALMAN", "KALMAN <0|1> habilita filtro"),
+    ("KALMAN_SET", "KALMAN_SET <Q> <R>"),
+    ("DAC", "DAC <freq|0> (seno compat.)"),
+    ("WAVE", "WAVE <SINE|SQUARE|TRI|SAWUP|SAWDN> <freq>"),
+    ("WAVEWIN", "WAVEWIN <NONE|HANN|BLACKMAN|NUTTALL> <taper%>"),
+    ("AWG", "AWG <onda> <freq> <janela> <taper%> (atomico)"),
+    ("SYS", "SYS INFO | SYS HB <0|1> | SYS RESET"),
+    ("ADC_START", "ADC_START (DISABLED)"),
+    ("ADC_STOP", "ADC_STOP (DISABLED)"),
+    ("ADC_CFG", "ADC_CFG ... (DISABLED)"),
+    ("ADC_READ", "ADC_READ ... (DISABLED)"),
+    ("SPI_SPEED", "SPI_SPEED <2|4|8|16|32|64|128|256>"),
+    ("FPGA_CS", "FPGA_CS <0|1>"),
+    ("FPGA_UPLOAD", "FPGA_UPLOAD <bytes> <crc32>"),
+    ("FPGA_ABORT", "Cancela upload binario"),
+    ("FPGA_PEEK", "FPGA_PEEK <nbytes>"),
+    ("NOOP", "No operation"),
+)
+
+
+# ========= Conversões no estilo da libc =========
+_INT_RE = re.compile(r"\s*([+-]?\d+)")
+_FLOAT_RE = re.compile(r"\s*([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)")
+_UL_RE = re.compile(r"\s*([+-]?)(0[xX][0-9a-fA-F]+|0[0-7]*|[1-9]\d*)")
+
+
+def c_atoi(s):
+    m = _INT_RE.match(s)
+    return int(m.group(1)) if m else 0
+
+
+def c_strtof(s):
+    m = _FLOAT_RE.match(s)
+    return float(m.group(1)) if m else 0.0
+
+
+def c_strtoul(s):
+    """strtoul(s, NULL, 0) truncado em 32 bits."""
+    m = _UL_RE.match(s)
+    if not m:
+        return 0
+    tok = m.group(2)
+    if tok[:2] in ("0x", "0X"):
+        v = int(tok, 16)
+    elif tok.startswith("0"):
+        v = int(tok, 8)
+    else:
+        v = int(tok)
+    if m.group(1) == "-":
+        v = -v
+    return v & 0xFFFFFFFF
+
+
+# ========= CRC32 do periférico STM32 =========
+# Polinômio 0x04C11DB7, init 0xFFFFFFFF, sem reflexão e sem XOR final, alimentado
+# com palavras de 32 bits little-endian (o resto é completado com zeros).
+# Equivale ao CRC-32 refletido do zlib sobre os bytes de cada palavra em ordem
+# big-endian com os bits de cada byte invertidos; o estado do zlib é encadeável.
+_BITREV8 = np.array([int(f"{i:08b}"[::-1], 2) for i in range(256)], dtype=np.uint8)
+
+
+def _reverse32(v):
+    return int(f"{v:032b}"[::-1], 2)
+
+
+def stm32_crc32_update(state, data):
+    """Acumula `data` no estado interno (zlib) e devolve o novo estado.
+
+    O estado inicial é 0 (equivale ao DR resetado em 0xFFFFFFFF); converta com
+    stm32_crc32_value(). `data` com tamanho não múltiplo de 4 é completado com
+    zeros, como HAL_CRC_Accumulate() faz no último bloco do upload.
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    rem = buf.size % 4
+    if rem:
+        buf = np.concatenate((buf, np.zeros(4 - rem, dtype=np.uint8)))
+    words = buf.reshape(-1, 4)[:, ::-1]
+    return zlib.crc32(_BITREV8[words].tobytes(), state)
+
+
+def stm32_crc32_value(state):
+    return _reverse32(state ^ 0xFFFFFFFF)
+
+
+def stm32_crc32(data):
+    return stm32_crc32_value(stm32_crc32_update(0, data))
+
+
+# ========= Quadros binários de telemetria =========
+# A5 5A | seq u16 | ts u32 (us) | x y z int8 | flags u8 | CRC-16/CCITT (init FFFF) dos bytes 2..11
+# Tudo little-endian, 14 bytes. O firmware real (main.c) ainda só fala texto: "ACCEL 2"
+# vira ACCEL 1 pelo atoi(), então o host aceita os dois formatos.
+FRAME_SYNC = b"\xA5\x5A"
+FRAME_DTYPE = np.dtype([("sync", "u1", (2,)), ("seq", "<u2"), ("ts", "<u4"),
+                        ("xyz", "i1", (3,)), ("flags", "u1"), ("crc", "<u2")])
+FRAME_SIZE = FRAME_DTYPE.itemsize
+FLAG_KALMAN = 0x01
+
+
+def _crc16_table():
+    tab = np.zeros(256, dtype=np.uint16)
+    for i in range(256):
+        c = i << 8
+        for _ in range(8):
+            c = ((c << 1) ^ 0x1021) if c & 0x8000 else (c << 1)
+        tab[i] = c & 0xFFFF
+    return tab
+
+
+_CRC16_TABLE = _crc16_table()
+
+
+def crc16_ccitt_rows(rows):
+    """CRC-16/CCITT-FALSE de cada linha de uma matriz uint8 (n, k), vetorizado em n."""
+    crc = np.full(rows.shape[0], 0xFFFF, dtype=np.uint16)
+    for i in range(rows.shape[1]):
+        crc = (crc << 8) ^ _CRC16_TABLE[(crc >> 8) ^ rows[:, i]]
+    return crc
+
+
+def encode_frames(seq, ts_us, xyz, flags):
+    fr = np.zeros(len(seq), dtype=FRAME_DTYPE)
+    fr["sync"] = np.frombuffer(FRAME_SYNC, dtype=np.uint8)
+    fr["seq"] = seq
+    fr["ts"] = ts_us
+    fr["xyz"] = xyz
+    fr["flags"] = flags
+    raw = fr.view(np.uint8).reshape(-1, FRAME_SIZE)
+    fr["crc"] = crc16_ccitt_rows(raw[:, 2:12])
+    return fr
+
+
+# ========= Modelo do dispositivo =========
+class KalmanAxis:
+    def __init__(self):
+        self.Q, self.R, self.x, self.P = 0.02, 0.8, 0.0, 1.0
+
+    def step(self, z):
+        self.P += self.Q
+        k = self.P / (self.P + self.R)
+        self.x += k * (z - self.x)
+        self.P *= (1.0 - k)
+        return self.x
+
+
+class PyboardDevice:
+    """Máquina de estados do firmware, independente do transporte.
+
+    `usb_rx(packet, now)` é o CDC_Receive_FS (contexto de IRQ) e `poll(now)` é
+    uma volta do superloop. Tudo que o firmware imprime sai por `write(bytes)`.
+    """
+
+    def __init__(self, write, latency_s=0.0, jitter_s=0.0, drop_rate=0.0,
+                 dac_fail_rate=0.0, accel_fail_rate=0.0, corrupt_rate=0.0,
+                 frame_loss=0.0, frame_corrupt=0.0, queue_lines=False, usb_nak=True, seed=None):
+        self.write = write
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.drop_rate = drop_rate
+        self.dac_fail_rate = dac_fail_rate
+        self.accel_fail_rate = accel_fail_rate
+        self.corrupt_rate = corrupt_rate
+        self.frame_loss = frame_loss
+        self.frame_corrupt = frame_corrupt
+        self.queue_lines = queue_lines
+        self.usb_nak = usb_nak
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+        self.stats = {"rx_bytes": 0, "tx_bytes": 0, "commands": 0, "lines_dropped": 0,
+                      "lines_injected_drop": 0, "bin_overflow": 0, "uploads_ok": 0,
+                      "uploads_badcrc": 0, "accel_samples": 0,
+                      "frames": 0, "frames_lost": 0, "frames_corrupted": 0}
+        self.handlers = {
+            "HELP": self.cli_help, "PING": self.cli_ping, "LED": self.cli_led,
+            "ACCEL": self.cli_accel, "KALMAN": self.cli_kalman, "KALMAN_SET": self.cli_kalman_set,
+            "DAC": self.cli_dac, "WAVE": self.cli_wave, "WAVEWIN": self.cli_wavewin,
+            "AWG": self.cli_awg,
+            "SYS": self.cli_sys, "ADC_START": self.cli_disabled, "ADC_STOP": self.cli_disabled,
+            "ADC_CFG": self.cli_disabled, "ADC_READ": self.cli_disabled,
+            "SPI_SPEED": self.cli_spi_speed, "FPGA_CS": self.cli_fpga_cs,
+            "FPGA_UPLOAD": self.cli_fpga_upload, "FPGA_ABORT": self.cli_fpga_abort,
+            "FPGA_PEEK": self.cli_fpga_peek, "NOOP": self.cli_noop,
+        }
+        self.pending_reset = False
+        self.reset(0.0, banner=False)
+
+    # ---------- estado ----------
+    def reset(self, now, banner=True):
+        self.linebuf = bytearray()
+        self.cmd_slot = []           # slot único (lista só para o modo --queue-lines)
+        self.busy_until = now        # superloop ocupado (latência de comando / SPI)
+        self.pending_reply = None    # (instante, linha) em processamento
+        self.leds = [0, 0, 0, 0]
+        self.hb_enable = 1
+        self.accel_on = False
+        self.accel_hz = 0              # > 0: modo binário (ACCEL 2 <hz>)
+        self.frame_seq = 0
+        self.frames_sent = 0
+        self.bin_t0 = now
+        self.t_flush = now
+        self.kalman_on = 1
+        self.kf = [KalmanAxis(), KalmanAxis(), KalmanAxis()]
+        self.t_acc = now
+        self.wave, self.win, self.taper = "SINE", "NONE", 50.0
+        self.dac_freq = 0.0
+        self.spi_div = SPI_DEFAULT_DIV
+        self.fpga_cs = 0
+        self.bin_mode = False
+        self.ring = bytearray()
+        self.rx_paused = False       # EP OUT não re-armado (CDC_Receive_FS com anel cheio)
+        self.bin_left = 0
+        self.crc_expect = 0
+        self.crc_state = 0
+        self.upload_started = now
+        if banner:
+            self.out(BANNER + PROMPT)
+
+    def out(self, text):
+        data = text.encode("utf-8")
+        self.stats["tx_bytes"] += len(data)
+        self.write(data)
+
+    # ---------- USB (IRQ) ----------
+    def usb_rx(self, packet, now):
+        self.stats["rx_bytes"] += len(packet)
+        if self.bin_mode:
+            self._bin_rx(packet)
+            if self.usb_nak and RX_BIN_BUF_SZ - 1 - len(self.ring) < USB_FS_PACKET:
+                self.rx_paused = True
+            return
+        for c in packet:
+            if c in (0x0A, 0x0D):
+                if self.linebuf:
+                    self._line_complete(bytes(self.linebuf[:RX_LINE_BUF_SZ - 1]))
+                self.linebuf.clear()
+            elif len(self.linebuf) < RX_LINE_BUF_SZ - 1:
+                self.linebuf.append(c)
+
+    def _line_complete(self, line):
+        if self.drop_rate and self.rng.random() < self.drop_rate:
+            self.stats["lines_injected_drop"] += 1
+            return
+        if self.cmd_slot and not self.queue_lines:
+            self.stats["lines_dropped"] += 1
+            return
+        self.cmd_slot.append(line)
+
+    def _bin_rx(self, packet):
+        room = RX_BIN_BUF_SZ - 1 - len(self.ring)
+        if len(packet) > room:
+            self.stats["bin_overflow"] += len(packet) - room
+            packet = packet[:room]
+        if self.corrupt_rate and packet and self.rng.random() < self.corrupt_rate:
+            packet = bytearray(packet)
+            packet[self.rng.randrange(len(packet))] ^= 0x01
+        self.ring += packet
+
+    def resume_rx(self):
+        """CDC_ResumeRx(): re-arma o EP OUT quando o anel voltar a ter espaço."""
+        if self.rx_paused and (not self.bin_mode or RX_BIN_BUF_SZ - 1 - len(self.ring) >= USB_FS_PACKET):
+            self.rx_paused = False
+
+    # ---------- superloop ----------
+    def poll(self, now):
+        """Uma volta do for(;;) de main(); devolve o próximo instante de interesse."""
+        if now < self.busy_until:
+            return self.busy_until
+        if self.pending_reply is not None:
+            _, line = self.pending_reply
+            self.pending_reply = None
+            self._run_line(line, now)
+        elif self.cmd_slot:
+            line = self.cmd_slot.pop(0)
+            delay = self.latency_s + (self.rng.uniform(0, self.jitter_s) if self.jitter_s else 0.0)
+            if delay > 0:
+                self.pending_reply = (now + delay, line)
+                self.busy_until = now + delay
+                return self.busy_until
+            self._run_line(line, now)
+
+        if self.accel_hz and now - self.t_flush >= ACCEL_BIN_FLUSH_S:
+            self.t_flush = now
+            self._accel_frames(now)
+        elif self.accel_on and not self.accel_hz and now - self.t_acc > ACCEL_PERIOD_S:
+            self.t_acc = now
+            self._accel_sample(now)
+
+        if self.bin_mode:
+            self._process_fpga_upload(now)
+        self.resume_rx()
+        if now < self.busy_until:
+            return self.busy_until
+
+        deadline = now + 0.5
+        if self.accel_hz:
+            deadline = min(deadline, self.t_flush + ACCEL_BIN_FLUSH_S)
+        elif self.accel_on:
+            deadline = min(deadline, self.t_acc + ACCEL_PERIOD_S + 1e-3)
+        if self.cmd_slot:
+            deadline = now
+        return deadline
+
+    def _run_line(self, line, now):
+        argv = line.decode("latin-1").replace("\t", " ").split()[:12]
+        if not argv:
+            self.out(PROMPT)
+            return
+        self.stats["commands"] += 1
+        fn = self.handlers.get(argv[0])
+        if fn is None:
+            self.out("ERROR: comando desconhecido. Use HELP" + EOL)
+        else:
+            fn(argv, now)
+        if self.pending_reset:
+            self.pending_reset = False
+            self.reset(now)
+            return
+        self.out(PROMPT)
+
+    def _accel_values(self, t):
+        """Amostras (n, 3) int nos instantes `t`, com o Kalman por eixo se ligado."""
+        t = np.asarray(t, dtype=float)
+        # Vetor gravidade girando devagar + vibração (37 Hz em X, 120 Hz em Z) + ruído,
+        # quantizado como o MMA7660 (6 bits)
+        ph = 0.3 * t
+        raw = np.stack((21.0 * np.sin(ph) + 4.0 * np.sin(2 * np.pi * 37.0 * t),
+                        21.0 * np.cos(0.7 * ph),
+                        10.0 + 8.0 * np.sin(0.2 * ph) + 2.0 * np.sin(2 * np.pi * 120.0 * t)), axis=1)
+        raw = np.clip(np.round(raw + self.np_rng.normal(0.0, 1.5, raw.shape)), -32, 31)
+        if not self.kalman_on:
+            return raw.astype(int)
+        out = np.empty_like(raw)
+        for i in range(raw.shape[0]):
+            for k, axis in enumerate(self.kf):
+                out[i, k] = axis.step(raw[i, k])
+        return np.round(out).astype(int)
+
+    def _accel_sample(self, now):
+        x, y, z = self._accel_values([now])[0]
+        self.stats["accel_samples"] += 1
+        self.out("A:%d,%d,%d%s" % (x, y, z, EOL))
+
+    def _accel_frames(self, now):
+        due = int((now - self.bin_t0) * self.accel_hz) - self.frames_sent
+        if due <= 0:
+            return
+        t = self.bin_t0 + (self.frames_sent + np.arange(due)) / self.accel_hz
+        xyz = np.clip(self._accel_values(t), -32, 31)
+        seq = (self.frame_seq + np.arange(due)) & 0xFFFF
+        ts_us = np.round(t * 1e6).astype(np.int64) & 0xFFFFFFFF
+        frames = encode_frames(seq, ts_us, xyz, FLAG_KALMAN if self.kalman_on else 0)
+        self.frames_sent += due
+        self.frame_seq = (self.frame_seq + due) & 0xFFFF
+        self.stats["accel_samples"] += due
+        if self.frame_loss:
+            keep = self.np_rng.random(due) >= self.frame_loss
+            self.stats["frames_lost"] += int(due - keep.sum())
+            frames = frames[keep]
+        data = bytearray(frames.tobytes())
+        if self.frame_corrupt:
+            for i in range(len(frames)):
+                if self.rng.random() < self.frame_corrupt:
+                    data[i * FRAME_SIZE + self.rng.randrange(2, FRAME_SIZE)] ^= 0x10
+                    self.stats["frames_corrupted"] += 1
+        self.stats["frames"] += len(frames)
+        self.stats["tx_bytes"] += len(data)
+        self.write(bytes(data))
+
+    def _process_fpga_upload(self, now):
+        need = min(self.bin_left, BIN_CHUNK)
+        if len(self.ring) < need:
+            return
+        chunk = bytes(self.ring[:need])
+        del self.ring[:need]
+        self.resume_rx()
+        self.crc_state = stm32_crc32_update(self.crc_state, chunk)
+        # HAL_SPI_Transmit bloqueante: 8 bits por byte a PCLK2/divisor
+        self.busy_until = now + need * 8 * self.spi_div / PCLK2_HZ
+        self.bin_left -= need
+        if self.bin_left == 0:
+            crc = stm32_crc32_value(self.crc_state)
+            self.fpga_cs = 0
+            self.bin_mode = False
+            if crc == self.crc_expect:
+                self.stats["uploads_ok"] += 1
+                self.out("FPGA_UPLOAD_OK" + EOL)
+            else:
+                self.stats["uploads_badcrc"] += 1
+                self.out(f"FPGA_UPLOAD_BADCRC exp:{self.crc_expect} got:{crc}{EOL}")
+            self.out(PROMPT)
+
+    # ---------- comandos ----------
+    def cli_help(self, argv, now):
+        self.out("Comandos:" + EOL + "".join(f"  {n:<12s} {h}{EOL}" for n, h in HELP_ROWS
+                                               if n in self.handlers))
+
+    def cli_ping(self, argv, now):
+        self.out("PONG" + EOL)
+
+    def cli_led(self, argv, now):
+        if len(argv) < 3:
+            return self.out("ERROR: LED <n> <0|1>" + EOL)
+        n, v = c_atoi(argv[1]), c_atoi(argv[2])
+        if not 0 <= n <= 3:
+            return self.out("ERROR: LED invalido" + EOL)
+        self.leds[n] = 1 if v else 0
+        self.out("OK" + EOL)
+
+    def cli_accel(self, argv, now):
+        if len(argv) < 2:
+            return self.out("ERROR: ACCEL <0|1>" + EOL)
+        mode = c_atoi(argv[1])
+        if mode:
+            if self.accel_fail_rate and self.rng.random() < self.accel_fail_rate:
+                return self.out("ERROR: MMA7660 init" + EOL)
+            self.accel_on = True
+            self.accel_hz = 0
+            if mode == 2:
+                hz = c_atoi(argv[2]) if len(argv) > 2 else ACCEL_BIN_DEFAULT_HZ
+                self.accel_hz = max(1, min(ACCEL_BIN_MAX_HZ, hz))
+                self.bin_t0 = self.t_flush = now
+                self.frames_sent = 0
+        else:
+            self.accel_on = False
+            self.accel_hz = 0
+        self.out("OK" + EOL)
+
+    def cli_kalman(self, argv, now):
+        if len(argv) < 2:
+            return self.out("ERROR: KALMAN <0|1>" + EOL)
+        self.kalman_on = c_atoi(argv[1]) & 0xFF
+        self.out("OK" + EOL)
+
+    def cli_kalman_set(self, argv, now):
+        if len(argv) < 3:
+            return self.out("ERROR: KALMAN_SET <Q> <R>" + EOL)
+        q, r = c_strtof(argv[1]), c_strtof(argv[2])
+        for kf in self.kf:
+            kf.Q, kf.R = q, r
+        self.out("OK" + EOL)
+
+    def _dac_start(self, freq):
+        if self.dac_fail_rate and self.rng.random() < self.dac_fail_rate:
+            return False
+        self.dac_freq = min(freq, FMAX_HZ)
+        return True
+
+    def cli_dac(self, argv, now):
+        if len(argv) < 2:
+            return self.out("ERROR: DAC <freq|0>" + EOL)
+        f = c_strtof(argv[1])
+        if f > 0:
+            self.wave = "SINE"
+            self.out(("OK" if self._dac_start(f) else "ERROR: DAC start") + EOL)
+        else:
+            self.dac_freq = 0.0
+            self.out("OK" + EOL)
+
+    def cli_wave(self, argv, now):
+        if len(argv) < 3:
+            return self.out("ERROR: WAVE <SINE|SQUARE|TRI|SAWUP|SAWDN> <freq>" + EOL)
+        f = c_strtof(argv[2])
+        if f <= 0:
+            return self.out("ERROR: freq invalida" + EOL)
+        if argv[1] not in WAVE_TYPES:
+            return self.out("ERROR: tipo invalido" + EOL)
+        self.wave = argv[1]
+        self.out(("OK" if self._dac_start(f) else "ERROR: DAC start") + EOL)
+
+    def cli_wavewin(self, argv, now):
+        if len(argv) < 3:
+            return self.out("ERROR: WAVEWIN <NONE|HANN|BLACKMAN|NUTTALL> <taper%>" + EOL)
+        if argv[1] not in WIN_TYPES:
+            return self.out("ERROR: janela invalida" + EOL)
+        self.win = argv[1]
+        self.taper = max(0.0, min(100.0, c_strtof(argv[2])))
+        self.out("OK" + EOL)
+
+    def cli_awg(self, argv, now):
+        if len(argv) < 5:
+            return self.out("ERROR: AWG <SINE|SQUARE|TRI|SAWUP|SAWDN> <freq> "
+                            "<NONE|HANN|BLACKMAN|NUTTALL> <taper%>" + EOL)
+        if argv[1] not in WAVE_TYPES:
+            return self.out("ERROR: tipo invalido" + EOL)
+        f = c_strtof(argv[2])
+        if f <= 0:
+            return self.out("ERROR: freq invalida" + EOL)
+        if argv[3] not in WIN_TYPES:
+            return self.out("ERROR: janela invalida" + EOL)
+        self.dac_freq = 0.0
+        self.wave, self.win = argv[1], argv[3]
+        self.taper = max(0.0, min(100.0, c_strtof(argv[4])))
+        self.out(("OK" if self._dac_start(f) else "ERROR: DAC start") + EOL)
+
+    def cli_sys(self, argv, now):
+        if len(argv) >= 2:
+            if argv[1] == "RESET":
+                self.out("RESETTING..." + EOL)
+                self.pending_reset = True
+                return
+            if argv[1] == "HB" and len(argv) >= 3:
+                self.hb_enable = c_atoi(argv[2]) & 0xFF
+                return self.out("OK" + EOL)
+        self.out(f"SYS: SYSCLK={SYSCLK_HZ}, PCLK1={PCLK1_HZ}, PCLK2={PCLK2_HZ}, "
+                 f"HB={self.hb_enable}, fmax={FMAX_HZ:.1f}Hz{EOL}OK{EOL}")
+
+    def cli_disabled(self, argv, now):
+        self.out("DISABLED" + EOL)
+
+    def cli_spi_speed(self, argv, now):
+        if len(argv) < 2:
+            return self.out("ERROR: SPI_SPEED <2|4|8|16|32|64|128|256>" + EOL)
+        d = c_atoi(argv[1])
+        if d not in SPI_DIVISORS:
+            return self.out("ERROR: divisor invalido" + EOL)
+        self.spi_div = d
+        self.out("OK" + EOL)
+
+    def cli_fpga_cs(self, argv, now):
+        if len(argv) < 2:
+            return self.out("ERROR: FPGA_CS <0|1>" + EOL)
+        self.fpga_cs = 1 if c_atoi(argv[1]) else 0
+        self.out("OK" + EOL)
+
+    def cli_fpga_upload(self, argv, now):
+        if len(argv) < 3:
+            return self.out("ERROR: FPGA_UPLOAD <bytes> <crc32>" + EOL)
+        n, c = c_strtoul(argv[1]), c_strtoul(argv[2])
+        if not n or n > FPGA_MAX_BYTES:
+            return self.out("ERROR: tamanho invalido" + EOL)
+        self.crc_state = 0
+        self.fpga_cs = 1
+        self.ring = bytearray()
+        self.bin_left, self.crc_expect = n, c
+        self.bin_mode = True
+        self.upload_started = now
+        self.out("FPGA_UPLOAD_READY" + EOL)
+
+    def cli_fpga_abort(self, argv, now):
+        if self.bin_mode:
+            self.bin_mode = False
+            self.fpga_cs = 0
+        self.out("OK" + EOL)
+
+    def cli_fpga_peek(self, argv, now):
+        if len(argv) < 2:
+            return self.out("ERROR: FPGA_PEEK <nbytes>" + EOL)
+        n = c_strtoul(argv[1])
+        if not n or n > FPGA_PEEK_MAX:
+            return self.out("ERROR: limite 1024" + EOL)
+        # MISO em pull-up: a FPGA sem configuração devolve 0xFF
+        self.busy_until = now + n * 8 * self.spi_div / PCLK2_HZ
+        self.out("FF" * n + EOL + "OK" + EOL)
+
+    def cli_noop(self, argv, now):
+        self.out("OK" + EOL)
+
+
+# ========= Transporte pty =========
+class PtyServer:
+    """Liga um PyboardDevice a um pseudo-terminal, com taxa USB limitada."""
+
+    def __init__(self, device_kwargs, usb_rate=1_000_000, link=None, verbose=False):
+        self.master, slave = os.openpty()
+        tty.setraw(slave)
+        self.slave_fd = slave        # mantido aberto: o pty não dá EIO quando o host fecha
+        self.slave_path = os.ttyname(slave)
+        os.set_blocking(self.master, False)
+        self.link = link
+        if link:
+            try:
+                os.unlink(link)
+            except FileNotFoundError:
+                pass
+            os.symlink(self.slave_path, link)
+        self.usb_rate = usb_rate
+        self.verbose = verbose
+        self.tx_dropped = 0
+        self.device = PyboardDevice(self._write, **device_kwargs)
+
+    def _write(self, data):
+        # _write() do firmware descarta o que não couber no timeout de 25 ms
+        view = memoryview(data)
+        t_end = time.monotonic() + 0.025
+        while view:
+            try:
+                n = os.write(self.master, view)
+                view = view[n:]
+            except BlockingIOError:
+                if time.monotonic() > t_end:
+                    self.tx_dropped += len(view)
+                    return
+                select.select([], [self.master], [], 0.005)
+        if self.verbose:
+            sys.stderr.write(f"<< {bytes(data)!r}\n")
+
+    def serve_forever(self):
+        dev = self.device
+        vt = time.monotonic()
+        dev.reset(vt)
+        wake = vt
+        backlog = b""     # lido do pty mas ainda não aceito pelo EP OUT (NAK)
+        while True:
+            now = time.monotonic()
+            vt = max(vt, now)
+            timeout = max(0.0, min(wake, now + 0.5) - now)
+            # Com o EP em NAK o pty não é lido: o buffer do kernel enche e o write() do host bloqueia
+            rlist = [] if (dev.rx_paused or backlog) else [self.master]
+            r, _, _ = select.select(rlist, [], [], 0.0 if backlog and not dev.rx_paused else timeout)
+            data = backlog
+            if r:
+                try:
+                    new = os.read(self.master, 4096)
+                except OSError as e:
+                    if e.errno in (errno.EAGAIN, errno.EIO):
+                        new = b""
+                    else:
+                        raise
+                if self.verbose and new:
+                    sys.stderr.write(f">> {new!r}\n")
+                data += new
+            if data:
+                # Entrega em pacotes USB FS e deixa o superloop rodar entre eles,
+                # num relógio virtual que avança na taxa do barramento.
+                i = 0
+                while i < len(data) and not dev.rx_paused:
+                    pkt = data[i:i + USB_FS_PACKET]
+                    i += len(pkt)
+                    if self.usb_rate:
+                        vt += len(pkt) / self.usb_rate
+                    dev.usb_rx(pkt, vt)
+                    dev.poll(vt)
+                backlog = data[i:]
+                lag = vt - time.monotonic()
+                if lag > 0:
+                    time.sleep(lag)
+            wake = dev.poll(max(vt, time.monotonic()))
+
+    def close(self):
+        if self.link:
+            try:
+                os.unlink(self.link)
+            except OSError:
+                pass
+        os.close(self.master)
+        os.close(self.slave_fd)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Emulador da CLI do Pyboard v1.1 em pseudo-terminal.")
+    ap.add_argument("--link", help="cria um symlink com este caminho para o pty (ex.: /tmp/pyboard)")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="tempo de processamento por comando")
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="jitter uniforme somado à latência")
+    ap.add_argument("--usb-rate", type=float, default=1_000_000,
+                    help="bytes/s aceitos no endpoint OUT (0 = ilimitado)")
+    ap.add_argument("--drop-rate", type=float, default=0.0, help="probabilidade de perder uma linha")
+    ap.add_argument("--dac-fail-rate", type=float, default=0.0, help="probabilidade de 'ERROR: DAC start'")
+    ap.add_argument("--accel-fail-rate", type=float, default=0.0,
+                    help="probabilidade de 'ERROR: MMA7660 init'")
+    ap.add_argument("--corrupt-rate", type=float, default=0.0,
+                    help="probabilidade por pacote de inverter um bit no modo binário")
+    ap.add_argument("--frame-loss", type=float, default=0.0,
+                    help="probabilidade de perder um quadro de telemetria (ACCEL 2)")
+    ap.add_argument("--frame-corrupt", type=float, default=0.0,
+                    help="probabilidade de corromper um quadro de telemetria (ACCEL 2)")
+    ap.add_argument("--no-awg", action="store_true",
+                    help="firmware antigo, sem o comando AWG (testa o fallback do host)")
+    ap.add_argument("--queue-lines", action="store_true",
+                    help="enfileira linhas em vez de descartar com o slot ocupado (placa idealizada)")
+    ap.add_argument("--no-usb-nak", action="store_true",
+                    help="firmware antigo: EP OUT sempre re-armado, overflow do anel descarta bytes")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("-v", "--verbose", action="store_true", help="mostra o tráfego em stderr")
+    args = ap.parse_args(argv)
+
+    server = PtyServer(
+        dict(latency_s=args.latency_ms / 1000.0, jitter_s=args.jitter_ms / 1000.0,
+             drop_rate=args.drop_rate, dac_fail_rate=args.dac_fail_rate,
+             accel_fail_rate=args.accel_fail_rate, corrupt_rate=args.corrupt_rate,
+             frame_loss=args.frame_loss, frame_corrupt=args.frame_corrupt,
+             queue_lines=args.queue_lines, usb_nak=not args.no_usb_nak, seed=args.seed),
+        usb_rate=args.usb_rate, link=args.link, verbose=args.verbose)
+    if args.no_awg:
+        del server.device.handlers["AWG"]
+    print(f"Pyboard emulado em {server.slave_path}" + (f" (link {args.link})" if args.link else ""),
+          flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        st = server.device.stats
+        st["tx_dropped"] = server.tx_dropped
+        print("Estatísticas: " + ", ".join(f"{k}={v}" for k, v in st.items()), flush=True)
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,9 @@ from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolb
 from matplotlib.ticker import FuncFormatter
 from scipy.signal import square, sawtooth, unit_impulse, gausspulse, chirp
 from scipy.fft import fft, fftfreq, fftshift
-from scipy.interpolate import CubicSpline
 from scipy.special import jv
 from scipy.stats import kurtosis, skew
 from scipy.signal import find_peaks
-import csv
 import json
 from concurrent.futures import ThreadPoolExecutor
 import struct
@@ -20,6 +18,13 @@ import math
 import array
 import logging
 import time
+import threading
+import hashlib
+import shutil
+import mmap
+import re
+import queue
+from collections import OrderedDict
 
 # Configurar logging com mais detalhes
 logging.basicConfig(
@@ -37,10 +42,30 @@ ctk.set_default_color_theme("blue")
 
 # Constantes
 INTERP_THRESHOLD = 100
-INTERP_SAMPLES = 500
+RECON_HALF_TAPS = 16  # amostras de guarda de cada lado na reconstrução por sinc
+RECON_KAISER_BETA = 8.6
+RECON_CACHE_SIZE = 32
+DISPLAY_POINTS_PER_PIXEL = 2  # pontos do envelope mín/máx por pixel horizontal
+PYRAMID_MIN_BLOCK = 16  # bloco do nível mais fino da pirâmide de envelopes
+PYRAMID_MIN_SAMPLES = 1_000_000  # abaixo disso o envelope direto já é instantâneo
+PANEL_REFRESH_MS = 16  # atualização dos rótulos durante o arraste (~60 Hz)
+COALESCE_INTERVAL_MS = 16  # no máximo uma execução por quadro para cada controle
+COALESCE_SETTLE_MS = 150  # refinamento em qualidade total após o controle parar
 UNIT_MULTIPLIERS = {"Hz": 1, "kHz": 1e3, "MHz": 1e6, "GHz": 1e9}
 WAV_TOTAL_SIZE = 15360  # Tamanho total do arquivo para compatibilidade
+WAV_CHANNEL_OFFSET = 1000  # Início do CH1; o CH2 vem logo após (offset 4000)
+WAV_CHANNEL_BYTES = 3000  # 1500 amostras de 16 bits por canal
+WAV_SAMPLES = 1500
+WAV_PROBE_LIST = [1, 10, 100]
+WAV_COUPLING_LIST = ["DC", "AC"]
 ANALYSIS_MAX_POINTS = 1000000  # Máximo de pontos para análise
+PREVIEW_POINTS = 32768  # pontos da prévia publicada antes do cálculo completo
+PREVIEW_OVERSAMPLE = 4  # Fs da prévia decimada deve ser >= 4x a banda estimada
+PIPELINE_CACHE_BYTES = 512 * 1024 * 1024  # memória máxima dos estágios memoizados
+NONDETERMINISTIC_WAVEFORMS = {"Ruído Branco"}  # nunca reaproveitados do cache
+RESULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "fft_sinais")
+RESULT_CACHE_MAX_BYTES = 2 * 1024 ** 3  # acima disso as entradas menos usadas são removidas
+RESULT_CACHE_PARAMS = ('waveform', 'duration', 'N', 'Fs', 'Fc', 'Fm', 'am_on', 'am_depth', 'fm_on', 'fm_dev')
 
 # Escalas pré-definidas FNIRSI
 VOLT_LIST = [[5.0, "V", 1], [2.5, "V", 1], [1.0, "V", 1], [500, "mV", 0.001],
@@ -54,6 +79,1376 @@ TIME_LIST = [[50, "S", 1], [20, "S", 1], [10, "S", 1], [5, "S", 1], [2, "S", 1],
              [500, "nS", 1e-9], [200, "nS", 1e-9], [100, "nS", 1e-9], [50, "nS", 1e-9], [20, "nS", 1e-9],
              [10, "nS", 1e-9]]
 
+# Impressão digital espectral (busca de capturas semelhantes)
+FINGERPRINT_BANDS = 48  # bandas logarítmicas de 1 Hz a 100 MHz
+FINGERPRINT_FREQ_RANGE = (1.0, 1e8)
+FINGERPRINT_TIME_WEIGHT = 0.25  # fração da norma dedicada às estatísticas de tempo
+FINGERPRINT_PREFILTER_FACTOR = 10  # candidatos do pré-filtro = k * fator
+FINGERPRINT_INDEX_FILE = ".fft_fingerprints.npz"
+
+# Monitoramento de pasta (ingestão automática de capturas)
+WATCH_POLL_INTERVAL_S = 1.0
+WATCH_FULL_RESCAN_TICKS = 10  # força listagem completa a cada N ciclos
+WATCH_DRAIN_MS = 250  # período de entrega dos resultados para a interface
+CAPTURE_CACHE_MAX = 500  # capturas mantidas em memória
+
+# Exportação em blocos
+EXPORT_CHUNK_ROWS = 262144  # linhas formatadas por bloco
+EXPORT_FLOAT_FMT = "%.10g"
+EXPORT_BINARY_FORMATS = {
+    # chave: (rótulo do menu, extensão)
+    'npy': ("NumPy (.npy)", ".npy"),
+    'npz': ("NumPy compactado (.npz)", ".npz"),
+    'raw_f32': ("Bruto float32 + JSON", ".f32"),
+    'raw_i16': ("Bruto int16 + JSON", ".i16"),
+    'wav_pcm16': ("WAV PCM 16 bits", ".wav"),
+    'wav_float': ("WAV IEEE float 32 bits", ".wav"),
+}
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+
+# Importação de CSV/JSON
+IMPORT_CHUNK_BYTES = 16 * 1024 * 1024
+IMPORT_TIME_KEYS = ["tempo", "time", "t", "time_values"]
+IMPORT_SIGNAL_KEYS = ["sinal", "signal", "y", "values", "signal_values"]
+IMPORT_UNIFORM_RTOL = 1e-3  # tolerância relativa do passo para considerar amostragem uniforme
+
+
+def compute_fingerprint(t, y):
+    """Reduz um sinal a um vetor unitário: espectro log-binado + estatísticas de tempo.
+
+    A similaridade entre duas capturas é o produto escalar (cosseno) dos vetores.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    if len(y) > ANALYSIS_MAX_POINTS:
+        y = y[:ANALYSIS_MAX_POINTS]
+    dt = (t[1] - t[0]) if len(t) > 1 else 1.0
+    y_ac = y - np.mean(y)
+
+    # Espectro de potência em bandas logarítmicas de frequência absoluta
+    power = np.abs(np.fft.rfft(y_ac * np.hanning(len(y_ac)))) ** 2
+    freqs = np.fft.rfftfreq(len(y_ac), dt)
+    edges = np.logspace(np.log10(FINGERPRINT_FREQ_RANGE[0]), np.log10(FINGERPRINT_FREQ_RANGE[1]),
+                        FINGERPRINT_BANDS + 1)
+    cum = np.concatenate(([0.0], np.cumsum(power)))
+    idx = np.searchsorted(freqs, edges)
+    bands = cum[idx[1:]] - cum[idx[:-1]]
+    total = cum[-1]
+    spectral = np.log1p(1e3 * bands / total) if total > 0 else np.zeros(FINGERPRINT_BANDS)
+    norm = np.linalg.norm(spectral)
+    if norm > 0:
+        spectral /= norm
+
+    # Estatísticas de tempo comprimidas para a faixa [-1, 1]
+    rms = np.sqrt(np.mean(y_ac ** 2))
+    crest = np.max(np.abs(y_ac)) / rms if rms > 0 else 0.0
+    duration = dt * len(y)
+    zc_rate = np.count_nonzero(np.diff(np.signbit(y_ac))) / duration if duration > 0 else 0.0
+    duty = np.mean(y_ac > 0)
+    stats = np.array([
+        np.tanh(np.log10(rms + 1e-12) / 3),
+        np.tanh(np.log10(np.mean(np.abs(y)) + 1e-12) / 3),
+        np.tanh((crest - np.sqrt(2)) / 2),
+        np.tanh(np.log10(zc_rate + 1.0) / 8),
+        2 * duty - 1,
+        np.tanh(skew(y_ac) / 2) if rms > 0 else 0.0,
+        np.tanh(kurtosis(y_ac) / 5) if rms > 0 else 0.0,
+    ])
+    norm = np.linalg.norm(stats)
+    if norm > 0:
+        stats /= norm
+
+    vec = np.concatenate((spectral * np.sqrt(1 - FINGERPRINT_TIME_WEIGHT),
+                          stats * np.sqrt(FINGERPRINT_TIME_WEIGHT)))
+    return vec.astype(np.float32)
+
+
+class SpectralFingerprintIndex:
+    """Índice em memória de impressões digitais com busca por produto matricial.
+
+    Mantém os vetores em float32 e uma cópia quantizada em int8 usada como
+    pré-filtro grosseiro; a consulta exata reordena apenas os candidatos.
+    """
+
+    def __init__(self, dim=FINGERPRINT_BANDS + 7):
+        self.dim = dim
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._codes = np.zeros((0, dim), dtype=np.int8)
+        self._size = 0
+        self.keys = []
+        self.stamps = []  # (mtime_ns, size) de cada arquivo indexado
+        self._positions = {}
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, n):
+        if n <= len(self._vectors):
+            return
+        cap = max(n, 2 * len(self._vectors), 1024)
+        vectors = np.zeros((cap, self.dim), dtype=np.float32)
+        codes = np.zeros((cap, self.dim), dtype=np.int8)
+        vectors[:self._size] = self._vectors[:self._size]
+        codes[:self._size] = self._codes[:self._size]
+        self._vectors, self._codes = vectors, codes
+
+    def add(self, key, vector, stamp=(0, 0)):
+        """Adiciona (ou substitui) a impressão digital associada a key"""
+        pos = self._positions.get(key)
+        if pos is None:
+            self._reserve(self._size + 1)
+            pos = self._size
+            self._size += 1
+            self._positions[key] = pos
+            self.keys.append(key)
+            self.stamps.append(tuple(stamp))
+        else:
+            self.stamps[pos] = tuple(stamp)
+        self._vectors[pos] = vector
+        self._codes[pos] = np.clip(np.rint(vector * 127), -127, 127)
+
+    def discard(self, keys):
+        """Remove as entradas de keys (chaves ausentes são ignoradas); retorna quantas saíram"""
+        drop = {self._positions[k] for k in keys if k in self._positions}
+        if not drop:
+            return 0
+        keep = np.array([i for i in range(self._size) if i not in drop], dtype=np.int64)
+        n = len(keep)
+        self._vectors[:n] = self._vectors[keep]
+        self._codes[:n] = self._codes[keep]
+        self.keys = [self.keys[i] for i in keep]
+        self.stamps = [self.stamps[i] for i in keep]
+        self._size = n
+        self._positions = {k: i for i, k in enumerate(self.keys)}
+        return len(drop)
+
+    def stamp_of(self, key):
+        pos = self._positions.get(key)
+        return None if pos is None else self.stamps[pos]
+
+    def vector_of(self, key):
+        pos = self._positions.get(key)
+        return None if pos is None else self._vectors[pos].copy()
+
+    def copy(self):
+        """Cópia independente, para consulta fora da thread que altera o índice"""
+        other = SpectralFingerprintIndex(self.dim)
+        other._vectors = self._vectors[:self._size].copy()
+        other._codes = self._codes[:self._size].copy()
+        other._size = self._size
+        other.keys = list(self.keys)
+        other.stamps = list(self.stamps)
+        other._positions = dict(self._positions)
+        return other
+
+    def query(self, vector, k=20, prefilter=False):
+        """Retorna [(key, similaridade)] das k capturas mais semelhantes"""
+        n = self._size
+        if n == 0:
+            return []
+        k = min(k, n)
+        q = np.asarray(vector, dtype=np.float32)
+
+        if prefilter and n > k * FINGERPRINT_PREFILTER_FACTOR:
+            # Pré-filtro grosseiro sobre os códigos int8, em blocos para limitar memória
+            coarse = np.empty(n, dtype=np.float32)
+            q_code = np.clip(np.rint(q * 127), -127, 127).astype(np.float32)
+            block = 65536
+            for i in range(0, n, block):
+                coarse[i:i + block] = self._codes[i:min(i + block, n)].astype(np.float32) @ q_code
+            m = k * FINGERPRINT_PREFILTER_FACTOR
+            candidates = np.argpartition(coarse, -m)[-m:]
+            scores = self._vectors[candidates] @ q
+        else:
+            candidates = np.arange(n)
+            scores = self._vectors[:n] @ q
+
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(self.keys[candidates[i]], float(scores[i])) for i in top]
+
+    def save(self, path):
+        np.savez(path, vectors=self._vectors[:self._size], keys=np.array(self.keys, dtype=str),
+                 stamps=np.array(self.stamps, dtype=np.int64).reshape(-1, 2))
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        vectors = data['vectors'].astype(np.float32)
+        index = cls(dim=vectors.shape[1])
+        index._reserve(len(vectors))
+        index._size = len(vectors)
+        index._vectors[:index._size] = vectors
+        index._codes[:index._size] = np.clip(np.rint(vectors * 127), -127, 127)
+        index.keys = [str(k) for k in data['keys']]
+        index.stamps = [(int(a), int(b)) for a, b in data['stamps']]
+        index._positions = {k: i for i, k in enumerate(index.keys)}
+        return index
+
+
+class CaptureFolderWatcher:
+    """Monitora uma pasta por polling barato e processa apenas arquivos novos ou alterados.
+
+    Cada ciclo compara o mtime do diretório; a listagem completa (scandir +
+    snapshot de mtime/tamanho) só acontece quando o diretório mudou, quando há
+    arquivos ainda sendo gravados ou a cada WATCH_FULL_RESCAN_TICKS ciclos.
+    Um arquivo só é processado depois que seu snapshot se repete em dois
+    ciclos (escrita concluída). Os resultados de process_fn vão para out_queue.
+    A listagem inicial também roda na thread do monitor; se a pasta não puder
+    ser lida, error_cb(exc) é chamado (nessa thread) e o monitor termina.
+    """
+
+    def __init__(self, folder, process_fn, out_queue, suffix=".wav",
+                 interval=WATCH_POLL_INTERVAL_S, ingest_existing=False, error_cb=None):
+        self.folder = folder
+        self.process_fn = process_fn
+        self.out_queue = out_queue
+        self.suffix = suffix.lower()
+        self.interval = interval
+        self.ingest_existing = ingest_existing
+        self.error_cb = error_cb or (lambda exc: None)
+        self.logger = logging.getLogger("SignalGenerator")
+        self._snapshot = {}  # path -> (mtime_ns, size) já processado
+        self._pending = {}  # path -> (mtime_ns, size) aguardando estabilizar
+        self._dir_mtime = None
+        self._tick = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+
+    def _run(self):
+        if not self.ingest_existing:
+            try:
+                # mtime antes da listagem: o que mudar durante ela força nova varredura
+                self._dir_mtime = os.stat(self.folder).st_mtime_ns
+                self._snapshot = self._scan()
+            except OSError as e:
+                self.logger.warning(f"Falha ao abrir {self.folder}: {str(e)}")
+                self.error_cb(e)
+                return
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except OSError as e:
+                self.logger.warning(f"Falha ao monitorar {self.folder}: {str(e)}")
+
+    def _scan(self):
+        snap = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(self.suffix) and entry.is_file():
+                    st = entry.stat()
+                    snap[entry.path] = (st.st_mtime_ns, st.st_size)
+        return snap
+
+    def poll(self):
+        """Executa um ciclo de verificação; retorna o número de arquivos processados"""
+        self._tick += 1
+        dir_mtime = os.stat(self.folder).st_mtime_ns
+        if (dir_mtime == self._dir_mtime and not self._pending
+                and self._tick % WATCH_FULL_RESCAN_TICKS):
+            return 0
+        self._dir_mtime = dir_mtime
+
+        current = self._scan()
+        for path in set(self._snapshot) - set(current):
+            del self._snapshot[path]
+
+        ready = []
+        pending = {}
+        for path, stamp in current.items():
+            if self._snapshot.get(path) == stamp:
+                continue
+            if self._pending.get(path) == stamp:
+                ready.append((path, stamp))
+            else:
+                pending[path] = stamp
+        self._pending = pending
+
+        for path, stamp in ready:
+            if self._stop.is_set():
+                break
+            self._snapshot[path] = stamp
+            try:
+                self.out_queue.put(self.process_fn(path))
+            except Exception as e:
+                self.logger.warning(f"Falha ao processar {path}: {str(e)}")
+        return len(ready)
+
+
+def minmax_envelope(t, y, i0, i1, n_buckets):
+    """Reduz y[i0:i1] a um par mín/máx por bloco, mantendo a ordem temporal de cada par.
+
+    Picos isolados continuam visíveis porque cada bloco contribui com seus dois
+    extremos. Trechos com até 2 * n_buckets amostras são devolvidos inteiros.
+    """
+    count = i1 - i0
+    if count <= 2 * n_buckets:
+        return t[i0:i1], y[i0:i1]
+
+    size = count // n_buckets
+    n_blocks = count // size
+    stop = i0 + n_blocks * size
+    blocks = y[i0:stop].reshape(n_blocks, size)
+    i_min = blocks.argmin(axis=1)
+    i_max = blocks.argmax(axis=1)
+    base = i0 + np.arange(n_blocks) * size
+
+    idx = np.empty(2 * n_blocks, dtype=np.int64)
+    idx[0::2] = base + np.minimum(i_min, i_max)
+    idx[1::2] = base + np.maximum(i_min, i_max)
+    if stop < i1:  # sobra final menor que um bloco
+        tail = y[stop:i1]
+        idx = np.concatenate([idx, stop + np.sort([tail.argmin(), tail.argmax()])])
+    return t[idx], y[idx]
+
+
+class EnvelopePyramid:
+    """Envelopes mín/máx em float32 para blocos de 16, 32, 64... amostras.
+
+    Construída uma vez por sinal (em segundo plano); cada zoom escolhe o nível
+    cujo bloco cabe em um pixel e só fatia os vetores, sem varrer as amostras.
+    Enquanto não estiver pronta, envelope() recorre a minmax_envelope.
+    """
+
+    def __init__(self, y, min_block=PYRAMID_MIN_BLOCK):
+        self.y = y
+        self.min_block = min_block
+        self.levels = []  # (tamanho do bloco, mínimos, máximos)
+        self.ready = threading.Event()
+
+    def build(self):
+        n_blocks = len(self.y) // self.min_block
+        blocks = self.y[:n_blocks * self.min_block].reshape(n_blocks, self.min_block)
+        mins = blocks.min(axis=1).astype(np.float32)
+        maxs = blocks.max(axis=1).astype(np.float32)
+        levels = []
+        size = self.min_block
+        while len(mins) >= 1:
+            levels.append((size, mins, maxs))
+            half = len(mins) // 2
+            if half < 1:
+                break
+            mins = np.minimum(mins[0:2 * half:2], mins[1:2 * half:2])
+            maxs = np.maximum(maxs[0:2 * half:2], maxs[1:2 * half:2])
+            size *= 2
+        self.levels = levels
+        self.ready.set()
+        return self
+
+    def envelope(self, t, i0, i1, n_buckets):
+        """Pontos (t, y) do trecho [i0, i1) com cerca de 2 * n_buckets pontos"""
+        bucket = (i1 - i0) // max(n_buckets, 1)
+        if not self.ready.is_set() or bucket < self.min_block:
+            return minmax_envelope(t, self.y, i0, i1, n_buckets)
+
+        # Maior bloco que ainda cabe em um balde (pixel)
+        size, mins, maxs = next(level for level in reversed(self.levels) if level[0] <= bucket)
+        j0 = i0 // size
+        j1 = min(-(-i1 // size), len(mins))
+        starts = np.arange(j0, j1) * size
+
+        t_out = np.empty(2 * len(starts))
+        y_out = np.empty(2 * len(starts))
+        t_out[0::2] = t[starts]
+        t_out[1::2] = t[starts + size // 2]
+        y_out[0::2] = mins[j0:j1]
+        y_out[1::2] = maxs[j0:j1]
+
+        covered = len(mins) * size
+        if j1 == len(mins) and covered < i1:  # sobra final fora dos blocos completos
+            t_tail, y_tail = minmax_envelope(t, self.y, covered, i1, 1)
+            t_out = np.concatenate([t_out, t_tail])
+            y_out = np.concatenate([y_out, y_tail])
+        return t_out, y_out
+
+
+class PlotManager:
+    """Artistas fixos dos gráficos de tempo e de frequência.
+
+    Linhas, títulos, grades e formatadores são criados uma única vez; cada novo
+    sinal só troca os dados (set_data) e os limites dos eixos. O tight_layout
+    é refeito apenas quando a janela muda de tamanho.
+    """
+
+    TIME_COLORS = ["cyan", "yellow"]
+    FREQ_COLORS = ["orange", "magenta"]
+
+    def __init__(self, fig, ax_time, ax_freq, time_formatter, freq_formatter):
+        self.fig = fig
+        self.ax_time = ax_time
+        self.ax_freq = ax_freq
+
+        self.time_lines = [ax_time.plot([], [], color=color, zorder=5 - i, label=f"CH{i + 1}")[0]
+                           for i, color in enumerate(self.TIME_COLORS)]
+        self.freq_lines = [ax_freq.plot([], [], color=color, label=f"CH{i + 1}")[0]
+                           for i, color in enumerate(self.FREQ_COLORS)]
+
+        ax_time.set_title("Domínio do Tempo", color='white')
+        ax_time.set_ylabel('Amplitude (mV)')
+        ax_time.grid(True, linestyle='--', alpha=0.5)
+        ax_time.tick_params(colors='white')
+        ax_time.xaxis.set_major_formatter(FuncFormatter(time_formatter))
+
+        ax_freq.set_title("Domínio da Frequência (FFT)", color='white')
+        ax_freq.set_ylabel("|Y(f)|", color='white')
+        ax_freq.grid(True, linestyle='--', alpha=0.5)
+        ax_freq.tick_params(colors='white')
+        ax_freq.xaxis.set_major_formatter(FuncFormatter(freq_formatter))
+
+        fig.canvas.mpl_connect('resize_event', self._on_resize)
+
+    def show_channels(self, n_channels):
+        """Mostra as n primeiras linhas de cada gráfico; legenda só com mais de um canal"""
+        for lines in (self.time_lines, self.freq_lines):
+            for i, line in enumerate(lines):
+                line.set_visible(i < n_channels)
+                if i >= n_channels:
+                    line.set_data([], [])
+        for ax, lines in ((self.ax_time, self.time_lines), (self.ax_freq, self.freq_lines)):
+            legend = ax.get_legend()
+            if n_channels > 1:
+                ax.legend(handles=lines[:n_channels], loc="upper right")
+            elif legend is not None:
+                legend.remove()
+
+    def set_freq_data(self, f, Y_channels):
+        for line, Y in zip(self.freq_lines, Y_channels):
+            line.set_data(f, Y)
+
+    def _on_resize(self, event):
+        self.fig.tight_layout(pad=3.0)
+
+
+class BlitManager:
+    """Redesenho por blitting dos artistas que se movem (marcadores arrastados, cursor em cruz).
+
+    O fundo de cada eixo é copiado a cada desenho completo do canvas, já sem os
+    artistas animados; update() só restaura esse fundo e desenha por cima os
+    artistas animados, sem renderizar de novo os traços de milhões de pontos.
+    """
+
+    def __init__(self, canvas, axes):
+        self.canvas = canvas
+        self.axes = list(axes)
+        self.backgrounds = {}
+        self._artists = []
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def add_artist(self, artist):
+        if artist not in self._artists:
+            artist.set_animated(True)
+            self._artists.append(artist)
+
+    def remove_artist(self, artist):
+        if artist in self._artists:
+            self._artists.remove(artist)
+            artist.set_animated(False)
+
+    def begin_drag(self, artist):
+        """Tira o artista do fundo: um desenho completo, depois só blits"""
+        self.add_artist(artist)
+        self.canvas.draw()
+
+    def end_drag(self, artist):
+        self.remove_artist(artist)
+        self.canvas.draw_idle()
+
+    def _on_draw(self, event):
+        self.backgrounds = {ax: self.canvas.copy_from_bbox(ax.bbox) for ax in self.axes}
+        for artist in self._artists:
+            if artist.get_visible() and artist.axes is not None:
+                artist.axes.draw_artist(artist)
+
+    def update(self):
+        if not self.backgrounds:
+            self.canvas.draw_idle()
+            return
+        for ax in self.axes:
+            self.canvas.restore_region(self.backgrounds[ax])
+            for artist in self._artists:
+                if artist.axes is ax and artist.get_visible():
+                    ax.draw_artist(artist)
+            self.canvas.blit(ax.bbox)
+
+
+class EventCoalescer:
+    """Agrupa callbacks de controles que disparam muitas vezes por segundo (sliders).
+
+    Para cada chave só o último valor pendente é mantido, e o handler roda no
+    máximo uma vez por intervalo via after(). O tempo de execução de cada chave
+    é acompanhado por média móvel: handlers lentos ganham intervalos maiores e
+    podem consultar quality() para reduzir o próprio custo.
+    """
+
+    def __init__(self, widget, interval_ms=COALESCE_INTERVAL_MS):
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self._pending = {}  # chave -> (handler, args)
+        self._after_ids = {}
+        self.exec_time = {}  # chave -> média móvel do tempo de execução (s)
+
+    def submit(self, key, handler, *args, delay_ms=None, debounce=False):
+        """Agenda handler(*args); chamadas repetidas antes da execução só trocam os argumentos.
+
+        Com debounce=True o prazo recomeça a cada chamada (roda só depois que o
+        controle para de mudar).
+        """
+        self._pending[key] = (handler, args)
+        if debounce and key in self._after_ids:
+            self.widget.after_cancel(self._after_ids.pop(key))
+        if key not in self._after_ids:
+            if delay_ms is None:
+                # Handlers mais lentos que o intervalo não podem saturar o loop do Tk
+                delay_ms = max(self.interval_ms, int(1250 * self.exec_time.get(key, 0.0)))
+            self._after_ids[key] = self.widget.after(delay_ms, self._run, key)
+
+    def _run(self, key):
+        self._after_ids.pop(key, None)
+        handler, args = self._pending.pop(key, (None, ()))
+        if handler is None:
+            return
+        start = time.perf_counter()
+        try:
+            handler(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            previous = self.exec_time.get(key)
+            self.exec_time[key] = elapsed if previous is None else 0.7 * previous + 0.3 * elapsed
+
+    def quality(self, key):
+        """1.0 enquanto o handler cabe no intervalo; menor quando ele está lento"""
+        elapsed = self.exec_time.get(key, 0.0)
+        budget = self.interval_ms / 1000.0
+        return 1.0 if elapsed <= budget else max(budget / elapsed, 0.25)
+
+    def is_pending(self, key):
+        return key in self._after_ids
+
+    def cancel_all(self):
+        for after_id in self._after_ids.values():
+            self.widget.after_cancel(after_id)
+        self._after_ids.clear()
+        self._pending.clear()
+
+
+class BandLimitedReconstructor:
+    """Reconstrução limitada em banda (sinc janelada por Kaiser) para zoom profundo.
+
+    Avalia o sinal apenas nas posições dos pixels, usando RECON_HALF_TAPS amostras
+    de cada lado de cada ponto (incluindo a banda de guarda fora da janela
+    visível). Os resultados ficam em cache LRU por (canal, janela, largura).
+    """
+
+    def __init__(self, half_taps=RECON_HALF_TAPS, beta=RECON_KAISER_BETA, cache_size=RECON_CACHE_SIZE):
+        self.half_taps = half_taps
+        self.beta = beta
+        self.cache_size = cache_size
+        self._offsets = np.arange(-half_taps + 1, half_taps + 1)
+        self._cache = OrderedDict()
+
+    def clear(self):
+        self._cache.clear()
+
+    def reconstruct(self, key, t, y, x0, x1, n_points):
+        """Pontos (x, y(x)) em n_points posições uniformes de [x0, x1]; t deve ser uniforme"""
+        cache_key = (key, x0, x1, n_points)
+        if cache_key in self._cache:
+            self._cache.move_to_end(cache_key)
+            return self._cache[cache_key]
+
+        dt = t[1] - t[0]
+        x = np.linspace(max(x0, t[0]), min(x1, t[-1]), n_points)
+        u = (x - t[0]) / dt
+        idx = np.floor(u).astype(np.int64)[:, None] + self._offsets
+        d = u[:, None] - idx
+        taper = np.clip(1.0 - (d / self.half_taps) ** 2, 0.0, None)
+        weights = np.sinc(d) * np.i0(self.beta * np.sqrt(taper)) / np.i0(self.beta)
+        # Fora do registro repete a amostra da borda; a normalização preserva o nível DC
+        samples = y[np.clip(idx, 0, len(y) - 1)]
+        values = (weights * samples).sum(axis=1) / weights.sum(axis=1)
+
+        self._cache[cache_key] = (x, values)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return x, values
+
+
+def estimate_bandwidth(p):
+    """Estimativa da maior frequência relevante do sinal gerado (Hz) para decidir a prévia"""
+    wf, Fc, Fm = p['waveform'], p['Fc'], p['Fm']
+    if wf == "Chirp Linear":
+        bw = 5 * Fc
+    elif wf == "Chirp Quadrático":
+        bw = 10 * Fc
+    elif wf == "Onda FM":
+        bw = Fc + 6 * Fm  # Carson com índice 5
+    elif wf == "Onda FM Estéreo":
+        bw = Fc + 1000 + 4 * Fm
+    elif wf in ("Batimento", "Sinc Modulado", "Onda AM", "Onda AM-DSB",
+                "Onda Quadrada Modulada", "Onda Triangular Modulada"):
+        bw = Fc + Fm
+    elif wf == "Onda Harmônica":
+        bw = 2 * Fc
+    else:
+        bw = max(Fc, Fm)
+    if p['am_on']:
+        bw += Fm
+    if p['fm_on']:
+        bw = max(bw, Fc + p['fm_dev'] + Fm)
+    return bw
+
+
+def compute_signal_metrics(t, y, f, Y, waveform="", am_on=False, fm_on=False):
+    """Métricas dos painéis de análise como valores numéricos (None = não se aplica).
+
+    Função pura: não lê a interface, então pode rodar no executor e ser memoizada.
+    """
+    # Limitar pontos para análise (performance)
+    step = max(1, len(y) // min(len(y), ANALYSIS_MAX_POINTS)) if len(y) else 1
+    t = np.asarray(t[::step])
+    y = np.asarray(y[::step])
+    metrics = {}
+
+    # Análise no domínio do tempo
+    if len(y) > 0:
+        vpp = np.max(y) - np.min(y)
+        rms = np.sqrt(np.mean(y ** 2))
+        metrics['vpp'] = vpp
+        metrics['rms'] = rms
+        metrics['mean'] = np.mean(y)
+        metrics['crest_factor'] = np.max(np.abs(y)) / rms if rms > 0 else 0
+
+        # Taxa de cruzamento por zero
+        zero_crossings = np.where(np.diff(np.sign(y)))[0]
+        metrics['zero_crossing'] = len(zero_crossings) / (t[-1] - t[0]) if len(zero_crossings) > 0 else 0.0
+
+        # Frequência estimada
+        freq_est = 0.0
+        if len(zero_crossings) > 1:
+            periods = np.diff(t[zero_crossings])
+            if len(periods) > 0:
+                avg_period = np.mean(periods) * 2
+                freq_est = 1 / avg_period if avg_period > 0 else 0
+        metrics['frequency'] = freq_est
+
+        # Duty cycle (apenas para ondas quadradas)
+        metrics['duty_cycle'] = None
+        if (waveform.startswith("Quadrada") or waveform.startswith("Pulso")) and vpp > 0:
+            threshold = (np.max(y) + np.min(y)) / 2
+            metrics['duty_cycle'] = np.sum(y > threshold) / len(y) * 100
+
+        metrics['peak_to_rms'] = np.max(np.abs(y)) / rms if rms > 0 else 0
+        metrics['kurtosis'] = kurtosis(y) if len(y) > 3 else None
+        metrics['skewness'] = skew(y) if len(y) > 2 else None
+
+    # Análise no domínio da frequência (apenas frequências positivas)
+    positive_mask = f >= 0
+    f_positive = f[positive_mask]
+    Y_positive = Y[positive_mask]
+    if len(Y_positive) == 0:
+        return metrics
+
+    # Frequência fundamental (maior magnitude)
+    fundamental_idx = np.argmax(Y_positive)
+    fundamental_freq = f_positive[fundamental_idx]
+    fundamental_amp = Y_positive[fundamental_idx]
+    metrics['fundamental'] = fundamental_freq
+    metrics['fund_amp'] = fundamental_amp
+
+    # Harmônicos (excluindo o fundamental) e picos significativos
+    harmonic_mask = (f_positive > fundamental_freq * 0.9) & (f_positive < f_positive[-1])
+    harmonic_freqs = f_positive[harmonic_mask]
+    harmonic_amps = Y_positive[harmonic_mask]
+    peaks, _ = find_peaks(harmonic_amps, height=fundamental_amp * 0.05, distance=10)
+    harmonic_peaks = peaks[np.argsort(harmonic_amps[peaks])[::-1]]
+
+    # THD (Total Harmonic Distortion)
+    thd = 0.0
+    harmonics_level = 0.0
+    if len(harmonic_peaks) > 0 and fundamental_amp > 0:
+        harmonic_power = np.sum(harmonic_amps[harmonic_peaks] ** 2)
+        thd = np.sqrt(harmonic_power / (fundamental_amp ** 2)) * 100
+        harmonics_level = harmonic_power / (fundamental_amp ** 2)
+    metrics['thd'] = thd
+    metrics['harmonics'] = harmonics_level
+
+    # SNR: tudo que não é fundamental ou harmônicos é ruído
+    metrics['snr'] = np.inf
+    metrics['noise_floor'] = None
+    if fundamental_amp > 0:
+        noise_mask = (f_positive > 0) & ~harmonic_mask
+        noise_power = np.sum(Y_positive[noise_mask] ** 2)
+        if noise_power > 0:
+            metrics['snr'] = 10 * np.log10(fundamental_amp ** 2 / noise_power)
+            metrics['noise_floor'] = np.sqrt(noise_power)
+
+    # SFDR (Spurious Free Dynamic Range)
+    metrics['sfdr'] = np.inf
+    if len(harmonic_peaks) > 0:
+        max_spur = np.max(harmonic_amps[harmonic_peaks])
+        if fundamental_amp > 0 and max_spur > 0:
+            metrics['sfdr'] = 20 * np.log10(fundamental_amp / max_spur)
+
+    # Largura de banda a -3dB
+    metrics['bandwidth'] = None
+    if fundamental_amp > 0:
+        indices = np.where(Y_positive > fundamental_amp / np.sqrt(2))[0]
+        if len(indices):
+            metrics['bandwidth'] = f_positive[indices[-1]] - f_positive[indices[0]]
+
+    # Índice de modulação (estimado)
+    metrics['mod_index'] = None
+    if am_on and len(y) > 0:
+        # Para AM: m = (A_max - A_min) / (A_max + A_min)
+        A_max = np.max(y)
+        A_min = np.min(y)
+        if A_max + A_min != 0:
+            metrics['mod_index'] = (A_max - A_min) / (A_max + A_min) * 100
+    elif fm_on and fundamental_amp > 0:
+        sideband_mask = (f_positive > fundamental_freq - 10) & (f_positive < fundamental_freq + 10)
+        metrics['mod_index'] = np.max(Y_positive[sideband_mask]) / fundamental_amp * 100
+
+    # Frequência de pico (maior harmônico)
+    metrics['peak_freq'] = harmonic_freqs[harmonic_peaks[0]] if len(harmonic_peaks) > 0 else None
+    return metrics
+
+
+class SignalPipeline:
+    """Geração do sinal como grafo de estágios memoizados.
+
+    tempo -> portadora -> amplitude -> AM -> FM -> espectro -> métricas
+
+    A chave de cada estágio inclui a chave do estágio anterior e os parâmetros
+    que ele usa, então mudar, por exemplo, a profundidade de AM só recalcula AM
+    e os estágios seguintes. As saídas ficam em um cache LRU limitado em bytes;
+    formas de onda não determinísticas (ruído) nunca são reaproveitadas.
+    """
+
+    def __init__(self, generate_waveform, max_bytes=PIPELINE_CACHE_BYTES):
+        self.generate_waveform = generate_waveform
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()  # chave -> (valor, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _nbytes(value):
+        if isinstance(value, np.ndarray):
+            return value.nbytes
+        if isinstance(value, (tuple, list)):
+            return sum(SignalPipeline._nbytes(v) for v in value)
+        return 0
+
+    def _stage(self, key, compute, cacheable=True):
+        if cacheable:
+            with self._lock:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return self._cache[key][0]
+        value = compute()
+        self.misses += 1
+        if cacheable:
+            size = self._nbytes(value)
+            with self._lock:
+                if key not in self._cache:
+                    self._cache[key] = (value, size)
+                    self._bytes += size
+                while self._bytes > self.max_bytes and len(self._cache) > 1:
+                    _, (_, evicted) = self._cache.popitem(last=False)
+                    self._bytes -= evicted
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._bytes = 0
+
+    def run(self, p, vpp=None):
+        """Executa o grafo para os parâmetros validados; vpp None mantém a amplitude padrão"""
+        deterministic = p['waveform'] not in NONDETERMINISTIC_WAVEFORMS
+
+        key = ('time', p['N'], p['Fs'])
+        t = self._stage(key, lambda: np.arange(p['N']) / p['Fs'])
+        time_key = key
+
+        key = ('carrier', key, p['waveform'], p['Fc'], p['Fm'], p['duration'])
+        y = self._stage(key, lambda: self.generate_waveform(p, t), deterministic)
+
+        if vpp is not None:
+            key = ('amplitude', key, vpp)
+            carrier = y
+            y = self._stage(key, lambda: carrier * (vpp / 2), deterministic)  # Normaliza para Vpp
+
+        # Modulações apenas se não forem formas de onda pré-moduladas
+        if not p['waveform'].startswith("Onda AM") and not p['waveform'].startswith("Onda FM"):
+            if p['am_on']:
+                key = ('am', key, p['am_depth'], p['Fm'])
+                unmodulated = y
+                y = self._stage(key, lambda: unmodulated * (1 + p['am_depth'] * np.sin(2 * np.pi * p['Fm'] * t)),
+                                deterministic)
+            if p['fm_on']:
+                # O sinal FM substitui o anterior: só depende da base de tempo e dos parâmetros de FM
+                key = ('fm', time_key, p['Fc'], p['Fm'], p['fm_dev'])
+                deterministic = True
+                y = self._stage(key, lambda: self._fm(p, t))
+
+        # FFT com zero no centro, limitada para evitar processamento excessivo
+        N_fft = min(p['N'], ANALYSIS_MAX_POINTS)
+        key = ('spectrum', key, N_fft)
+        signal = y
+        f, Y = self._stage(key, lambda: self._spectrum(signal, N_fft, p['Fs']), deterministic)
+
+        key = ('metrics', key, p['waveform'], p['am_on'], p['fm_on'])
+        metrics = self._stage(key, lambda: compute_signal_metrics(t, signal, f, Y, p['waveform'],
+                                                                  p['am_on'], p['fm_on']), deterministic)
+        return {'t': t, 'y': y, 'f': f, 'Y': Y, 'metrics': metrics}
+
+    @staticmethod
+    def _fm(p, t):
+        # Para FM, usamos a integral do sinal modulador
+        phase = 2 * np.pi * p['Fc'] * t + 2 * np.pi * p['fm_dev'] * np.cumsum(np.sin(2 * np.pi * p['Fm'] * t)) * (
+                1 / p['Fs'])
+        return np.sin(phase)
+
+    @staticmethod
+    def _spectrum(y, N_fft, Fs):
+        Y = fft(y, n=N_fft)
+        f = fftfreq(N_fft, 1 / Fs)
+        return fftshift(f), np.abs(fftshift(Y))
+
+
+class ResultCache:
+    """Cache em disco de sinais gerados, endereçado pelo conteúdo dos parâmetros.
+
+    Cada entrada é um diretório nomeado pelo sha256 dos parâmetros canônicos e
+    da versão do código, com y/f/Y em .npy (abertos com mmap_mode='r') e as
+    métricas em JSON. A data de modificação do diretório marca o último uso;
+    ao passar de max_bytes, as entradas mais antigas são removidas.
+    """
+
+    _code_version = None
+
+    def __init__(self, directory=RESULT_CACHE_DIR, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger("SignalGenerator")
+
+    @classmethod
+    def code_version(cls):
+        """Hash deste arquivo: qualquer mudança no código invalida o cache inteiro"""
+        if cls._code_version is None:
+            with open(os.path.abspath(__file__), "rb") as f:
+                cls._code_version = hashlib.sha256(f.read()).hexdigest()
+        return cls._code_version
+
+    def key(self, params, vpp):
+        canonical = {name: params[name] for name in RESULT_CACHE_PARAMS}
+        canonical.update(vpp=vpp, code=self.code_version())
+        return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def cacheable(params):
+        return params['waveform'] not in NONDETERMINISTIC_WAVEFORMS
+
+    def load(self, params, vpp):
+        """Resultado salvo para os parâmetros ou None"""
+        if not self.cacheable(params):
+            return None
+        path = os.path.join(self.directory, self.key(params, vpp))
+        if not os.path.isdir(path):
+            return None
+        try:
+            data = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in ('y', 'f', 'Y')}
+            with open(os.path.join(path, "metrics.json")) as f:
+                data['metrics'] = json.load(f)
+            data['t'] = np.arange(params['N']) / params['Fs']
+            os.utime(path)  # Marca como usado recentemente
+            return data
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Entrada de cache inválida removida: {path} ({str(e)})")
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+
+    def store(self, params, vpp, data):
+        if not self.cacheable(params):
+            return
+        path = os.path.join(self.directory, self.key(params, vpp))
+        if os.path.isdir(path):
+            return
+        # Escreve em diretório temporário e renomeia: leitores nunca veem entrada incompleta
+        tmp_path = f"{path}.tmp{os.getpid()}_{threading.get_ident()}"
+        try:
+            os.makedirs(tmp_path)
+            for name in ('y', 'f', 'Y'):
+                np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(data[name]))
+            metrics = {k: (None if v is None else float(v)) for k, v in data['metrics'].items()}
+            with open(os.path.join(tmp_path, "metrics.json"), "w") as f:
+                json.dump(metrics, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning(f"Falha ao gravar cache de resultado: {str(e)}")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if ".tmp" in name or not os.path.isdir(path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+            entries.append((os.path.getmtime(path), size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+class ExportCancelled(Exception):
+    """Exportação interrompida pelo usuário"""
+
+
+class ChunkedExporter:
+    """Grava as tabelas de tempo e de espectro em blocos grandes já formatados.
+
+    Cada bloco é convertido em texto com uma única operação de formatação,
+    sem passar linha a linha pelo módulo csv. O progresso é informado por
+    progress_cb(feitos, total) e cancel_event interrompe antes do próximo bloco;
+    um cancelamento que chega depois do último bloco não desfaz a exportação.
+    """
+
+    def __init__(self, progress_cb=None, cancel_event=None, chunk_rows=EXPORT_CHUNK_ROWS):
+        self.progress_cb = progress_cb or (lambda done, total: None)
+        self.cancel_event = cancel_event or threading.Event()
+        self.chunk_rows = chunk_rows
+        self._done = 0
+        self._total = 0
+
+    @staticmethod
+    def tables(data):
+        """Separa last_data em tabela de tempo e de espectro, cada uma com seu tamanho"""
+        channels = data.get('channels')
+        if channels is not None and len(channels) > 1:
+            time_cols = [('t', data['t'])] + [(f"CH{i + 1}", ch) for i, ch in enumerate(channels)]
+            freq_cols = [('f', data['f'])] + [(f"Y_CH{i + 1}", Y) for i, Y in enumerate(data['Y_channels'])]
+        else:
+            time_cols = [('t', data['t']), ('y', data['y'])]
+            freq_cols = [('f', data['f']), ('Y', data['Y'])]
+        return [('tempo', time_cols), ('espectro', freq_cols)]
+
+    def _format_block(self, columns, start, stop, sep, end):
+        block = np.column_stack([np.asarray(col[start:stop], dtype=np.float64) for col in columns])
+        row_fmt = sep.join([EXPORT_FLOAT_FMT] * block.shape[1]) + end
+        return (row_fmt * block.shape[0]) % tuple(block.ravel().tolist())
+
+    def _check_cancel(self):
+        if self.cancel_event.is_set():
+            raise ExportCancelled()
+
+    def _advance(self, rows):
+        self._done += rows
+        self.progress_cb(self._done, self._total)
+
+    def export_csv(self, base_path, data):
+        """Retorna os caminhos gerados: <base>_tempo.csv e <base>_espectro.csv"""
+        base = os.path.splitext(base_path)[0]
+        tables = self.tables(data)
+        self._total = sum(len(cols[0][1]) for _, cols in tables)
+        paths = []
+        try:
+            for name, cols in tables:
+                path = f"{base}_{name}.csv"
+                paths.append(path)
+                arrays = [c for _, c in cols]
+                with open(path, "w", newline="") as f:
+                    f.write(",".join(label for label, _ in cols) + "\n")
+                    for i in range(0, len(arrays[0]), self.chunk_rows):
+                        stop = min(i + self.chunk_rows, len(arrays[0]))
+                        self._check_cancel()
+                        f.write(self._format_block(arrays, i, stop, ",", "\n"))
+                        self._advance(stop - i)
+        except ExportCancelled:
+            self._remove(paths)
+            raise
+        return paths
+
+    def export_json(self, path, data):
+        """Grava {"tempo": {...}, "espectro": {...}} escrevendo cada vetor em blocos"""
+        tables = self.tables(data)
+        self._total = sum(len(cols[0][1]) * len(cols) for _, cols in tables)
+        try:
+            with open(path, "w") as f:
+                f.write("{")
+                for ti, (name, cols) in enumerate(tables):
+                    f.write(f'{"," if ti else ""}\n"{name}": {{')
+                    for ci, (label, arr) in enumerate(cols):
+                        f.write(f'{"," if ci else ""}\n  {json.dumps(label)}: [')
+                        for i in range(0, len(arr), self.chunk_rows):
+                            stop = min(i + self.chunk_rows, len(arr))
+                            text = self._format_block([arr], i, stop, "", ",")
+                            if i + self.chunk_rows >= len(arr):
+                                text = text[:-1]  # sem vírgula após o último valor
+                            if not np.all(np.isfinite(arr[i:stop])):
+                                text = text.replace("-inf", "null").replace("inf", "null").replace("nan", "null")
+                            self._check_cancel()
+                            f.write(text)
+                            self._advance(stop - i)
+                        f.write("]")
+                    f.write("\n}")
+                f.write("\n}\n")
+        except ExportCancelled:
+            self._remove([path])
+            raise
+        return [path]
+
+    @staticmethod
+    def signal_matrix(data):
+        """Sinal no tempo como matriz (canais, amostras)"""
+        channels = data.get('channels')
+        if channels is not None:
+            return np.atleast_2d(channels)
+        return np.atleast_2d(data['y'])
+
+    @staticmethod
+    def sample_rate(t):
+        if len(t) < 2 or t[-1] == t[0]:
+            raise ValueError("Base de tempo insuficiente para determinar a taxa de amostragem")
+        return (len(t) - 1) / (t[-1] - t[0])
+
+    def _write_interleaved(self, f, signal, dtype, scale=1.0):
+        """Converte e grava (canais, amostras) intercalado, bloco a bloco"""
+        n = signal.shape[1]
+        self._total = n
+        for i in range(0, n, self.chunk_rows):
+            stop = min(i + self.chunk_rows, n)
+            block = signal[:, i:stop].T * scale
+            if np.dtype(dtype).kind == 'i':
+                info = np.iinfo(dtype)
+                block = np.clip(np.round(block), info.min, info.max)
+            self._check_cancel()
+            f.write(np.ascontiguousarray(block, dtype=dtype).tobytes())
+            self._advance(stop - i)
+
+    @staticmethod
+    def _int16_scale(signal):
+        peak = float(np.max(np.abs(signal[np.isfinite(signal)]), initial=0.0))
+        return 32767.0 / peak if peak > 0 else 1.0
+
+    def export_npy(self, path, data):
+        """Matriz (canais, amostras) em float64, gravada por blocos via memmap"""
+        signal = self.signal_matrix(data)
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=signal.shape)
+        self._total = signal.shape[1]
+        try:
+            for i in range(0, signal.shape[1], self.chunk_rows):
+                stop = min(i + self.chunk_rows, signal.shape[1])
+                self._check_cancel()
+                out[:, i:stop] = signal[:, i:stop]
+                self._advance(stop - i)
+            out.flush()
+        except ExportCancelled:
+            del out
+            self._remove([path])
+            raise
+        del out
+        return [path]
+
+    def export_npz(self, path, data):
+        """Todos os vetores (tempo, sinal, espectro) em um único arquivo compactado"""
+        arrays = {k: np.asarray(data[k]) for k in ('t', 'y', 'f', 'Y', 'channels', 'Y_channels') if k in data}
+        self._total = 1
+        self._check_cancel()
+        # Por arquivo aberto, o numpy não acrescenta ".npz" e o caminho devolvido é o gravado
+        with open(path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        self._advance(1)
+        return [path]
+
+    def export_raw(self, path, data, dtype):
+        """Amostras intercaladas little-endian e um JSON ao lado descrevendo o arquivo"""
+        t = np.asarray(data['t'])
+        signal = self.signal_matrix(data)
+        dtype = np.dtype(dtype).newbyteorder('<')
+        scale = self._int16_scale(signal) if dtype.kind == 'i' else 1.0
+        sidecar_path = os.path.splitext(path)[0] + ".json"
+        try:
+            with open(path, "wb") as f:
+                self._write_interleaved(f, signal, dtype, scale)
+        except ExportCancelled:
+            self._remove([path])
+            raise
+        sidecar = {
+            "file": os.path.basename(path),
+            "dtype": dtype.str,
+            "byte_order": "little",
+            "channels": int(signal.shape[0]),
+            "interleaved": True,
+            "samples": int(signal.shape[1]),
+            "sample_rate": self.sample_rate(t),
+            "t0": float(t[0]),
+            "volts_per_count": 1.0 / scale,
+        }
+        with open(sidecar_path, "w") as f:
+            json.dump(sidecar, f, indent=2)
+        return [path, sidecar_path]
+
+    def export_riff_wav(self, path, data, float_samples=False):
+        """WAV RIFF padrão (PCM 16 bits ou IEEE float); tamanhos corrigidos ao final"""
+        t = np.asarray(data['t'])
+        signal = self.signal_matrix(data)
+        rate = int(round(self.sample_rate(t)))
+        if not 0 < rate <= 0xFFFFFFFF:
+            raise ValueError(f"Taxa de amostragem {rate} Hz não cabe em um cabeçalho WAV")
+        channels = signal.shape[0]
+        if float_samples:
+            fmt_tag, dtype, scale = WAVE_FORMAT_IEEE_FLOAT, np.dtype('<f4'), 1.0
+        else:
+            fmt_tag, dtype, scale = WAVE_FORMAT_PCM, np.dtype('<i2'), self._int16_scale(signal)
+        block_align = channels * dtype.itemsize
+
+        try:
+            with open(path, "wb") as f:
+                f.write(b"RIFF\0\0\0\0WAVE")
+                # cbSize só existe no formato não-PCM, que também exige o bloco fact
+                fmt_body = struct.pack('<HHIIHH', fmt_tag, channels, rate, rate * block_align,
+                                       block_align, dtype.itemsize * 8)
+                if float_samples:
+                    fmt_body += struct.pack('<H', 0)
+                f.write(b"fmt " + struct.pack('<I', len(fmt_body)) + fmt_body)
+                fact_pos = None
+                if float_samples:
+                    f.write(b"fact" + struct.pack('<I', 4))
+                    fact_pos = f.tell()
+                    f.write(b"\0\0\0\0")
+                f.write(b"data\0\0\0\0")
+                data_pos = f.tell()
+
+                self._write_interleaved(f, signal, dtype, scale)
+                data_size = f.tell() - data_pos
+                if data_size % 2:
+                    f.write(b"\0")  # blocos RIFF têm tamanho par
+                riff_size = f.tell() - 8
+                if riff_size > 0xFFFFFFFF:
+                    raise ValueError("Sinal excede o limite de 4 GB do formato WAV")
+
+                f.seek(4)
+                f.write(struct.pack('<I', riff_size))
+                if fact_pos is not None:
+                    f.seek(fact_pos)
+                    f.write(struct.pack('<I', signal.shape[1]))
+                f.seek(data_pos - 4)
+                f.write(struct.pack('<I', data_size))
+        except (ExportCancelled, ValueError):
+            self._remove([path])
+            raise
+        return [path]
+
+    def export_binary(self, path, data, fmt):
+        if fmt == 'npy':
+            return self.export_npy(path, data)
+        if fmt == 'npz':
+            return self.export_npz(path, data)
+        if fmt == 'raw_f32':
+            return self.export_raw(path, data, np.float32)
+        if fmt == 'raw_i16':
+            return self.export_raw(path, data, np.int16)
+        if fmt in ('wav_pcm16', 'wav_float'):
+            return self.export_riff_wav(path, data, float_samples=(fmt == 'wav_float'))
+        raise ValueError(f"Formato de exportação desconhecido: {fmt}")
+
+    @staticmethod
+    def _remove(paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class SignalFileImporter:
+    """Leitura vetorizada de sinais em CSV ("Tempo,Sinal") e JSON ({"tempo": [...], "sinal": [...]}).
+
+    O CSV é lido em blocos de bytes e cada bloco é convertido de uma só vez por
+    np.fromstring; os vetores do JSON são localizados no arquivo mapeado em
+    memória e convertidos sem passar por listas Python.
+    """
+
+    def __init__(self, chunk_bytes=IMPORT_CHUNK_BYTES):
+        self.chunk_bytes = chunk_bytes
+
+    def load(self, path):
+        """Retorna (t, canais, info) com t uniforme e canais no formato (n_canais, amostras)"""
+        if path.lower().endswith(".json"):
+            t, channels = self.read_json(path)
+        else:
+            t, channels = self.read_csv(path)
+        return self.uniform_time_base(t, channels)
+
+    @staticmethod
+    def _pick_column(names, candidates):
+        lowered = [n.strip().strip('"').lower() for n in names]
+        for key in candidates:
+            if key in lowered:
+                return lowered.index(key)
+        return None
+
+    def read_csv(self, path):
+        with open(path, "rb") as f:
+            header = f.readline().decode("utf-8-sig").strip()
+            sep = max([",", ";", "\t"], key=header.count)
+            names = header.split(sep)
+            ncols = len(names)
+            try:
+                # Sem cabeçalho: a primeira linha já é numérica
+                first = np.array([float(v) for v in names])
+                names = [f"col{i}" for i in range(ncols)]
+            except ValueError:
+                first = np.empty(0)
+            sep_byte = sep.encode()
+            # Um bloco termina no último \n; o resto segue para o próximo bloco
+            parts = [first]
+            tail = b""
+            while True:
+                chunk = f.read(self.chunk_bytes)
+                if not chunk:
+                    break
+                chunk = tail + chunk
+                cut = chunk.rfind(b"\n")
+                if cut < 0:
+                    tail = chunk
+                    continue
+                tail = chunk[cut + 1:]
+                parts.append(self._parse_block(chunk[:cut], sep_byte))
+            if tail.strip():
+                parts.append(self._parse_block(tail, sep_byte))
+
+        values = np.concatenate(parts)
+        if values.size % ncols:
+            raise ValueError(f"{os.path.basename(path)}: linhas com número de colunas inconsistente")
+        table = values.reshape(-1, ncols).T
+
+        time_col = self._pick_column(names, IMPORT_TIME_KEYS)
+        time_col = 0 if time_col is None else time_col
+        signal_col = self._pick_column(names, IMPORT_SIGNAL_KEYS)
+        if signal_col is not None:
+            signal_cols = [signal_col]
+        else:
+            signal_cols = [i for i in range(ncols) if i != time_col]
+        if not signal_cols:
+            raise ValueError(f"{os.path.basename(path)}: nenhuma coluna de sinal encontrada")
+        return table[time_col], table[signal_cols]
+
+    @staticmethod
+    def _parse_block(block, sep_byte):
+        block = block.replace(b"\r", b"")
+        if sep_byte != b",":
+            block = block.replace(sep_byte, b",")
+        block = block.replace(b"\n", b",").strip(b",")
+        if not block:
+            return np.empty(0)
+        return np.fromstring(block, dtype=np.float64, sep=",")
+
+    def read_json(self, path):
+        arrays = self._read_json_flat(path)
+        if arrays is None:
+            arrays = self._read_json_full(path)  # fora do layout plano: parser completo
+
+        t = next((arrays[k] for k in IMPORT_TIME_KEYS if k in arrays), None)
+        y = next((arrays[k] for k in IMPORT_SIGNAL_KEYS if k in arrays), None)
+        if t is None or y is None:
+            raise ValueError(f"{os.path.basename(path)}: vetores de tempo e sinal não encontrados")
+        if len(t) != len(y):
+            raise ValueError(f"{os.path.basename(path)}: tempo ({len(t)}) e sinal ({len(y)}) com tamanhos diferentes")
+        return t, y[np.newaxis, :]
+
+    @staticmethod
+    def _read_json_flat(path):
+        """Caminho rápido: cada vetor é o texto entre "chave": [ e o primeiro ], lido do mmap.
+
+        Retorna None se algum vetor não for uma lista plana de números (listas
+        aninhadas, objetos), para o chamador recorrer ao parser completo.
+        """
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            arrays = {}
+            for key in IMPORT_TIME_KEYS + IMPORT_SIGNAL_KEYS:
+                match = re.search(rb'"' + re.escape(key.encode()) + rb'"\s*:\s*\[', mm)
+                if match is None:
+                    continue
+                end = mm.find(b"]", match.end())
+                if end < 0:
+                    raise ValueError(f"{os.path.basename(path)}: vetor '{key}' sem fechamento")
+                body = mm[match.end():end]
+                if b"[" in body or b"{" in body:
+                    return None
+                if b"null" in body:
+                    body = body.replace(b"null", b"nan")
+                try:
+                    arrays[key] = np.fromstring(body, dtype=np.float64, sep=",") if body.strip() else np.empty(0)
+                except ValueError:
+                    return None
+        return arrays
+
+    @staticmethod
+    def _read_json_full(path):
+        name = os.path.basename(path)
+        with open(path, encoding="utf-8") as f:
+            doc = json.load(f)
+        if not isinstance(doc, dict):
+            raise ValueError(f"{name}: esperado um objeto JSON com os vetores de tempo e sinal")
+        # Objetos em largura: a chave no objeto raiz tem prioridade sobre a de um aninhado
+        objects = [doc]
+        for obj in objects:
+            objects.extend(v for v in obj.values() if isinstance(v, dict))
+        arrays = {}
+        for key in IMPORT_TIME_KEYS + IMPORT_SIGNAL_KEYS:
+            owner = next((obj for obj in objects if key in obj), None)
+            if owner is None:
+                continue
+            try:
+                arr = np.array(owner[key], dtype=np.float64)  # null vira nan
+            except (TypeError, ValueError):
+                arr = None
+            if arr is None or arr.ndim != 1:
+                raise ValueError(f"{name}: vetor '{key}' precisa ser uma lista plana de números")
+            arrays[key] = arr
+        return arrays
+
+    @staticmethod
+    def uniform_time_base(t, channels):
+        """Troca t por uma base uniforme; reamostra com np.interp se o passo variar"""
+        n = len(t)
+        if n < 2:
+            raise ValueError("Sinal precisa de pelo menos duas amostras")
+        dt = np.diff(t)
+        step = (t[-1] - t[0]) / (n - 1)
+        uniform = step > 0 and bool(np.all(np.abs(dt - step) <= IMPORT_UNIFORM_RTOL * step))
+        t_uniform = t[0] + np.arange(n) * step if step > 0 else None
+        if not uniform:
+            order = np.argsort(t, kind="stable")
+            t_sorted = t[order]
+            if t_sorted[-1] <= t_sorted[0]:
+                raise ValueError("Base de tempo sem variação")
+            step = (t_sorted[-1] - t_sorted[0]) / (n - 1)
+            t_uniform = t_sorted[0] + np.arange(n) * step
+            channels = np.vstack([np.interp(t_uniform, t_sorted, ch[order]) for ch in channels])
+        info = {'uniform': uniform, 'sample_rate': float(1.0 / step), 'samples': n}
+        return t_uniform, channels, info
+
 
 class SignalGeneratorApp(ctk.CTk):
     def __init__(self):
@@ -78,6 +1473,10 @@ class SignalGeneratorApp(ctk.CTk):
         file_menu.add_separator()
         file_menu.add_command(label="Exportar Dados", command=self.export_data)
         file_menu.add_command(label="Exportar WAV", command=self.export_wav)
+        binary_menu = tk.Menu(file_menu, tearoff=0)
+        for fmt, (label, _) in EXPORT_BINARY_FORMATS.items():
+            binary_menu.add_command(label=label, command=lambda fmt=fmt: self.export_binary(fmt))
+        file_menu.add_cascade(label="Exportar Binário", menu=binary_menu)
         file_menu.add_separator()
         file_menu.add_command(label="Sair", command=self._on_closing)
         self.menu_bar.add_cascade(label="Arquivo", menu=file_menu)
@@ -86,6 +1485,14 @@ class SignalGeneratorApp(ctk.CTk):
         tools_menu = tk.Menu(self.menu_bar, tearoff=0)
         tools_menu.add_command(label="Importar Forma de Onda (WAV)",
                                command=self.import_wav)  # CORREÇÃO: Adicionado de volta
+        tools_menu.add_command(label="Importar Sinal (CSV/JSON)", command=self.import_signal_file)
+        tools_menu.add_separator()
+        tools_menu.add_command(label="Indexar Pasta de Capturas...", command=self.index_capture_folder)
+        tools_menu.add_command(label="Buscar Capturas Semelhantes", command=self.find_similar_captures)
+        tools_menu.add_separator()
+        tools_menu.add_command(label="Monitorar Pasta de Capturas...", command=self.start_folder_watch)
+        tools_menu.add_command(label="Parar Monitoramento", command=self.stop_folder_watch)
+        tools_menu.add_command(label="Capturas Recebidas", command=self.show_capture_list)
         self.menu_bar.add_cascade(label="Ferramentas", menu=tools_menu)  # CORREÇÃO: Adicionado de volta
 
         # Menu Ajuda
@@ -95,6 +1502,9 @@ class SignalGeneratorApp(ctk.CTk):
 
         self.executor = ThreadPoolExecutor(max_workers=20)
         self.last_data = {}
+        self._generation = 0  # incrementado a cada geração; invalida prévias e resultados antigos
+        self.signal_pipeline = SignalPipeline(self._generate_waveform)
+        self.result_cache = ResultCache()
         self.markers = {
             'time_v': [],  # verticais no plot de tempo
             'time_h': [],  # horizontais no plot de tempo
@@ -104,13 +1514,24 @@ class SignalGeneratorApp(ctk.CTk):
         self.dragging_marker = None
         self.dragging_type = None
         self.original_position = None
+        self.crosshair_enabled = tk.BooleanVar(value=False)
+        self._panel_after_id = None
+        self._pending_status = None
+        self.event_coalescer = EventCoalescer(self)
         self.time_plot_line = None
+        self.time_traces = []  # (linha, EnvelopePyramid do sinal em V) por canal
+        self.reconstructor = BandLimitedReconstructor()
         self.freq_plot_line = None
         self.after_ids = []
         self.y_scale = 1.0  # Escala de amplitude
         self.zoom_factor = 1.0  # Fator de zoom inicial
         self.imported_voltage_scale = [1.0, "V", 1]  # Armazena a escala de tensão importada
         self.imported_time_scale = [1.0, "S", 1]  # Armazena a escala de tempo importada
+        self.fingerprint_index = SpectralFingerprintIndex()  # Biblioteca de capturas indexadas
+        self.capture_cache = OrderedDict()  # path -> captura decodificada com medições
+        self.ingest_queue = queue.Queue()
+        self.folder_watcher = None
+        self._ingest_after_id = None
 
         self.mod_am = tk.BooleanVar(value=False)
         self.mod_fm = tk.BooleanVar(value=False)
@@ -273,6 +1694,13 @@ class SignalGeneratorApp(ctk.CTk):
         """Cancelar callbacks pendentes ao fechar a janela"""
         for after_id in self.after_ids:
             self.after_cancel(after_id)
+        if self._ingest_after_id:
+            self.after_cancel(self._ingest_after_id)
+        if self._panel_after_id:
+            self.after_cancel(self._panel_after_id)
+        self.event_coalescer.cancel_all()
+        if self.folder_watcher:
+            self.folder_watcher.stop()
         self.logger.info("Aplicativo encerrado")
         self.destroy()
 
@@ -382,6 +1810,18 @@ class SignalGeneratorApp(ctk.CTk):
         self.fig.tight_layout(pad=3.0)
         self.canvas = FigureCanvasTkAgg(self.fig, master=graph_frame)
         self.canvas.get_tk_widget().pack(fill="both", expand=True, padx=0, pady=0)
+        self.plot_manager = PlotManager(self.fig, self.ax_time, self.ax_freq,
+                                        self._format_time_axis, self._format_freq_axis)
+        self.time_plot_line = self.plot_manager.time_lines[0]
+        self.freq_plot_line = self.plot_manager.freq_lines[0]
+        self.ax_time.callbacks.connect('xlim_changed', self._refresh_time_trace)
+
+        # Cursor em cruz: artistas sempre animados, desenhados só por blitting
+        self.blit_manager = BlitManager(self.canvas, (self.ax_time, self.ax_freq))
+        self.crosshair = {}
+        for ax in (self.ax_time, self.ax_freq):
+            self.crosshair[ax] = (ax.axvline(0, color='white', linewidth=0.8, alpha=0.6, visible=False),
+                                  ax.axhline(0, color='white', linewidth=0.8, alpha=0.6, visible=False))
 
         # Frame para sliders de escala Y (agora ao lado dos gráficos)
         y_scale_frame = ctk.CTkFrame(main_plot_frame, width=40)
@@ -390,13 +1830,13 @@ class SignalGeneratorApp(ctk.CTk):
         # Sliders de escala Y
         ctk.CTkLabel(y_scale_frame, text="Escala Tempo").pack(pady=(5, 0))
         self.scale_time = ctk.CTkSlider(y_scale_frame, from_=0.1, to=5.0,
-                                        orientation="vertical", command=self.update_time_scale)
+                                        orientation="vertical", command=self._coalesced(self.update_time_scale))
         self.scale_time.set(1.0)
         self.scale_time.pack(fill="y", expand=True, pady=5, padx=5)
 
         ctk.CTkLabel(y_scale_frame, text="Escala Freq").pack(pady=(5, 0))
         self.scale_freq = ctk.CTkSlider(y_scale_frame, from_=0.1, to=5.0,
-                                        orientation="vertical", command=self.update_freq_scale)
+                                        orientation="vertical", command=self._coalesced(self.update_freq_scale))
         self.scale_freq.set(1.0)
         self.scale_freq.pack(fill="y", expand=True, pady=5, padx=5)
 
@@ -406,12 +1846,12 @@ class SignalGeneratorApp(ctk.CTk):
 
         # Controles de zoom
         ctk.CTkLabel(ctrl_frame, text="Zoom Tempo:").pack(side="left", padx=(10, 5))
-        self.zoom_time = ctk.CTkSlider(ctrl_frame, from_=0.001, to=1.0, command=self.update_time_zoom)
+        self.zoom_time = ctk.CTkSlider(ctrl_frame, from_=0.001, to=1.0, command=self._coalesced(self.update_time_zoom))
         self.zoom_time.set(1.0)
         self.zoom_time.pack(side="left", fill="x", expand=True, padx=5)
 
         ctk.CTkLabel(ctrl_frame, text="Zoom Freq:").pack(side="left", padx=(10, 5))
-        self.zoom_freq = ctk.CTkSlider(ctrl_frame, from_=0.001, to=1.0, command=self.update_freq_zoom)
+        self.zoom_freq = ctk.CTkSlider(ctrl_frame, from_=0.001, to=1.0, command=self._coalesced(self.update_freq_zoom))
         self.zoom_freq.set(1.0)
         self.zoom_freq.pack(side="left", fill="x", expand=True, padx=5)
 
@@ -423,6 +1863,10 @@ class SignalGeneratorApp(ctk.CTk):
         self.canvas.mpl_connect('motion_notify_event', self._on_mouse_motion)
         self.canvas.mpl_connect('pick_event', self._on_pick_event)
 
+    def _coalesced(self, handler):
+        """Callback de slider que passa pelo EventCoalescer"""
+        return lambda value: self.event_coalescer.submit(handler.__name__, handler, value)
+
     def update_time_scale(self, value):
         """Atualiza a escala do eixo Y no gráfico de tempo"""
         if not self.last_data:
@@ -460,6 +1904,9 @@ class SignalGeneratorApp(ctk.CTk):
         self.menu.add_command(label="Marcar Frequência (horizontal)", command=lambda: self.add_marker('freq_h'))
         self.menu.add_separator()
         self.menu.add_command(label="Limpar Todos Marcadores", command=lambda: self.clear_markers('all'))
+        self.menu.add_separator()
+        self.menu.add_checkbutton(label="Cursor em Cruz", variable=self.crosshair_enabled,
+                                  command=self._toggle_crosshair)
 
     def _build_marker_panel(self):
         # Container à direita da área dos gráficos - AUMENTADO para 400px
@@ -605,11 +2052,12 @@ class SignalGeneratorApp(ctk.CTk):
         self.logger.info("Submetendo tarefa de plotagem")
         self.btn_generate.configure(state="disabled", text="Gerando...")
         self.set_status("⏳ Iniciando geração de sinal...", "yellow")
-        future = self.executor.submit(self._compute_and_plot_task)
+        self._generation += 1
+        future = self.executor.submit(self._compute_and_plot_task, self._generation)
         future.add_done_callback(
             lambda future: self.after(0, lambda: self.btn_generate.configure(state="normal", text="Gerar Sinal")))
 
-    def _compute_and_plot_task(self):
+    def _compute_and_plot_task(self, generation):
         self.logger.info("Iniciando cálculo e plotagem de sinal")
         start_time = time.time()
         try:
@@ -619,44 +2067,23 @@ class SignalGeneratorApp(ctk.CTk):
                 self.logger.warning("Validação falhou, parâmetros inválidos")
                 return
 
-            # gera eixo tempo e sinal
-            t = np.arange(params['N']) / params['Fs']
-            y = self._generate_waveform(params, t)
-
-            # Aplica amplitude
-            try:
-                vpp = float(self.entry_vpp.get())
-                y = y * (vpp / 2)  # Normaliza para Vpp
-                self.logger.debug(f"Amplitude aplicada: Vpp={vpp}")
-            except ValueError:
-                self.logger.warning("Amplitude inválida, usando padrão")
-                y = y  # Mantém amplitude padrão se entrada inválida
-
-            # Aplica modulações apenas se não forem formas de onda pré-moduladas
-            if not params['waveform'].startswith("Onda AM") and not params['waveform'].startswith("Onda FM"):
-                y = self._apply_modulation(params, y, t)
-                self.logger.debug("Modulação aplicada")
-
-            # FFT com zero no centro
-            self.logger.info("Calculando FFT")
-
-            # Limitar pontos da FFT para evitar processamento excessivo
-            N_fft = min(params['N'], ANALYSIS_MAX_POINTS)
-            Y = fft(y, n=N_fft)
-            f = fftfreq(N_fft, 1 / params['Fs'])
-
-            # Centraliza o zero
-            Y_shifted = fftshift(Y)
-            f_shifted = fftshift(f)
-            Y_abs = np.abs(Y_shifted)
+            vpp = self._read_vpp()
+            cached = self.result_cache.load(params, vpp)
+            if cached is not None:
+                self.after(0, self._publish_signal, generation, cached, True)
+                self.logger.info(f"Sinal carregado do cache em disco em {time.time() - start_time:.3f}s")
+                return
 
-            # guarda os dados para plot
-            self.last_data = {'t': t, 'y': y, 'f': f_shifted, 'Y': Y_abs}
+            # Prévia rápida para sinais grandes; o resultado completo a substitui depois
+            if params['N'] > 2 * PREVIEW_POINTS:
+                preview = self._compute_preview(params, vpp)
+                self.after(0, self._publish_signal, generation, preview, False)
+                self.logger.info(f"Prévia publicada em {time.time() - start_time:.3f}s")
 
-            # executa atualização de plot na thread principal
-            self.after(0, self._update_plots)
-            self.after(0, self.update_analysis_panels)
+            data = self._compute_signal(params, vpp)
+            self.after(0, self._publish_signal, generation, data, True)
             self.logger.info(f"Cálculo do sinal concluído com sucesso em {time.time() - start_time:.3f}s")
+            self.result_cache.store(params, vpp, data)
 
         except Exception as e:
             error_msg = str(e)
@@ -664,6 +2091,47 @@ class SignalGeneratorApp(ctk.CTk):
             self.after(0, lambda: messagebox.showerror("Erro de Cálculo", error_msg))
             self.set_status(f"❌ Erro: {error_msg}", "red")
 
+    def _read_vpp(self):
+        try:
+            return float(self.entry_vpp.get())
+        except ValueError:
+            self.logger.warning("Amplitude inválida, usando padrão")
+            return None
+
+    def _compute_signal(self, params, vpp):
+        """Gera tempo, sinal, espectro centralizado e métricas pelo SignalPipeline"""
+        data = self.signal_pipeline.run(params, vpp)
+        self.logger.debug(f"Pipeline: {self.signal_pipeline.hits} estágios reaproveitados, "
+                          f"{self.signal_pipeline.misses} calculados")
+        return data
+
+    def _compute_preview(self, params, vpp):
+        """Versão reduzida do sinal com cerca de PREVIEW_POINTS pontos.
+
+        Gera com Fs decimada quando a banda estimada permite; se a decimação
+        violasse Nyquist, gera só as primeiras PREVIEW_POINTS amostras na Fs
+        original, mantendo a duração (formas que dependem dela, como os
+        decaimentos, saem iguais ao início do sinal completo).
+        """
+        factor = -(-params['N'] // PREVIEW_POINTS)
+        preview_fs = params['Fs'] / factor
+        if preview_fs >= PREVIEW_OVERSAMPLE * estimate_bandwidth(params):
+            preview_params = dict(params, Fs=preview_fs, N=-(-params['N'] // factor))
+        else:
+            preview_params = dict(params, N=PREVIEW_POINTS)
+        return self._compute_signal(preview_params, vpp)
+
+    def _publish_signal(self, generation, data, final):
+        """Troca last_data na thread da interface; resultados de gerações antigas são descartados"""
+        if generation != self._generation:
+            return
+        self.last_data = data
+        self._update_plots()
+        if final:
+            self.update_analysis_panels()
+        else:
+            self.set_status(f"⏳ Prévia com {len(data['y'])} pontos; calculando sinal completo...", "yellow")
+
     def _validate_inputs(self):
         try:
             p = {
@@ -823,37 +2291,16 @@ class SignalGeneratorApp(ctk.CTk):
             self.logger.warning(f"Forma de onda desconhecida: {wf}, retornando zero")
             return np.zeros_like(t)
 
-    def _apply_modulation(self, p, y, t):
-        # Aplicação correta de AM e FM
-        if p['am_on']:
-            modulator = np.sin(2 * np.pi * p['Fm'] * t)
-            y = y * (1 + p['am_depth'] * modulator)
-            self.logger.debug("Modulação AM aplicada")
-
-        if p['fm_on']:
-            # Para FM, usamos a integral do sinal modulador
-            phase = 2 * np.pi * p['Fc'] * t + 2 * np.pi * p['fm_dev'] * np.cumsum(np.sin(2 * np.pi * p['Fm'] * t)) * (
-                    1 / p['Fs'])
-            y = np.sin(phase)
-            self.logger.debug("Modulação FM aplicada")
-
-        return y
-
     def _read_wav_file(self, filepath):
-        """Lê o arquivo WAV e retorna o cabeçalho e buffers de dados"""
+        """Lê o arquivo WAV de uma vez e retorna o cabeçalho e o bloco dos dois canais"""
         self.logger.info(f"Lendo arquivo WAV: {filepath}")
         with open(filepath, 'rb') as f:
-            header = f.read(208)  # Cabeçalho de 208 bytes
+            raw = f.read(WAV_CHANNEL_OFFSET + WAV_CHANNEL_BYTES * 2)
 
-            # Posiciona e lê os dados do canal 1
-            f.seek(1000)
-            data_ch1 = f.read(3000)
-
-            # Posiciona e lê os dados do canal 2
-            f.seek(4000)
-            data_ch2 = f.read(3000)
-
-        return header, data_ch1, data_ch2
+        header = raw[:208]  # Cabeçalho de 208 bytes
+        # CH1 em 1000..4000 e CH2 em 4000..7000, contíguos
+        data = raw[WAV_CHANNEL_OFFSET:WAV_CHANNEL_OFFSET + WAV_CHANNEL_BYTES * 2]
+        return header, data
 
     def _parse_header(self, header_bytes):
         """Decodifica o cabeçalho do WAV do Fnirsi"""
@@ -885,39 +2332,51 @@ class SignalGeneratorApp(ctk.CTk):
             self.logger.error("Erro ao analisar cabeçalho", exc_info=True)
             raise ValueError("Formato de cabeçalho WAV inválido") from e
 
-    def _parse_channel_data(self, data_bytes, scale):
-        """Decodifica os dados de um canal específico"""
-        self.logger.info("Decodificando dados do canal")
-        try:
-            values = []
-            # Verifica se temos dados suficientes
-            if len(data_bytes) < 3000:
-                self.logger.warning(f"Buffer de dados pequeno: {len(data_bytes)} bytes, esperado 3000")
-                # Preenche com zeros se não houver dados suficientes
-                data_bytes = data_bytes + b'\x00' * (3000 - len(data_bytes))
-
-            for i in range(1500):  # 1500 amostras por canal
-                # Cada amostra são 2 bytes (little-endian)
-                byte1 = data_bytes[i * 2]
-                byte2 = data_bytes[i * 2 + 1]
-
-                # Converte para valor numérico
-                raw_val = byte1 + 256 * byte2
-                # Verificação de valores inválidos
-                if raw_val < 0 or raw_val > 65535:
-                    self.logger.warning(f"Valor bruto inválido na posição {i}: {raw_val}")
-                    raw_val = 200  # Valor padrão seguro
-
-                val = (raw_val - 200) * scale[0] / 50.0
-                values.append(val)
-
-            return values
-        except Exception as e:
-            self.logger.error("Erro ao decodificar dados do canal", exc_info=True)
-            raise ValueError("Erro ao analisar dados do canal") from e
-
-    def _show_wav_preview(self, t, y, filename):
-        """Mostra uma prévia do sinal WAV em uma janela modal com análises e marcadores"""
+    def _parse_channel_settings(self, header_bytes, volt_scale):
+        """Decodifica escala, ponta de prova e acoplamento de cada canal"""
+        settings = []
+        for x in range(2):
+            probe_idx = header_bytes[10 + x * 10]
+            coupling_idx = header_bytes[8 + x * 10]
+            settings.append({
+                'channel': f"CH{x + 1}",
+                'scale': volt_scale[x],
+                'probe': WAV_PROBE_LIST[probe_idx] if probe_idx < len(WAV_PROBE_LIST) else 1,
+                'coupling': WAV_COUPLING_LIST[coupling_idx] if coupling_idx < len(WAV_COUPLING_LIST) else "DC",
+            })
+        return settings
+
+    def _decode_channels(self, data_bytes, volt_scale):
+        """Decodifica os dois canais em uma única passada vetorizada -> matriz (2, 1500)"""
+        expected = WAV_CHANNEL_BYTES * 2
+        if len(data_bytes) < expected:
+            self.logger.warning(f"Buffer de dados pequeno: {len(data_bytes)} bytes, esperado {expected}")
+            # Preenche com zeros se não houver dados suficientes
+            data_bytes = data_bytes + b'\x00' * (expected - len(data_bytes))
+
+        # Cada amostra são 2 bytes (little-endian), 1500 amostras por canal
+        raw = np.frombuffer(data_bytes[:expected], dtype='<u2').reshape(2, WAV_SAMPLES)
+        scales = np.array([scale[0] for scale in volt_scale], dtype=np.float64)
+        return (raw.astype(np.float64) - 200) * scales[:, None] / 50.0
+
+    def _load_wav_capture(self, filepath):
+        """Decodifica uma captura WAV do Fnirsi sem alterar a interface (seguro em threads)
+
+        Retorna o vetor de tempo, a matriz (2, N) com CH1/CH2 e as configurações dos canais.
+        """
+        header, data = self._read_wav_file(filepath)
+        volt_scale, ts = self._parse_header(header)
+        channels = self._decode_channels(data, volt_scale)
+        total_time = 12 * ts[0] * ts[2]
+        t = np.linspace(0, total_time, channels.shape[1], endpoint=False)
+        return t, channels, self._parse_channel_settings(header, volt_scale)
+
+    def _show_wav_preview(self, t, y, filename, channel_settings=None):
+        """Mostra uma prévia do sinal WAV em uma janela modal com análises e marcadores
+
+        y pode ser um canal único ou a matriz (canais, N); neste caso todos os
+        canais são plotados e analisados juntos.
+        """
         self.logger.info(f"Mostrando prévia do WAV: {filename}")
         preview = ctk.CTkToplevel(self)
         preview.title(f"Visualização do Sinal: {filename}")
@@ -939,8 +2398,17 @@ class SignalGeneratorApp(ctk.CTk):
         ax = fig.add_subplot(111)
 
         # CORREÇÃO: Converter para array antes de multiplicar
-        y_mV = np.array(y) * 1000  # Converter para mV
-        line, = ax.plot(t, y_mV, 'b-')
+        y_mV = np.atleast_2d(np.asarray(y)) * 1000  # Converter para mV
+        colors = ['b', 'orange']
+        for i, channel in enumerate(y_mV):
+            label = f"CH{i + 1}"
+            if channel_settings:
+                cfg = channel_settings[i]
+                label += f" ({cfg['scale'][0]} {cfg['scale'][1]}/div, x{cfg['probe']}, {cfg['coupling']})"
+            ax.plot(t, channel, color=colors[i % len(colors)], label=label)
+        if len(y_mV) > 1:
+            ax.legend()
+        y_ch1 = np.atleast_2d(np.asarray(y))[0]  # Amostragem/exportação operam sobre o CH1
 
         ax.set_title(f"Forma de Onda: {filename}")
         ax.set_xlabel('Tempo (s)')
@@ -962,11 +2430,11 @@ class SignalGeneratorApp(ctk.CTk):
 
         # Botão para abrir janela de amostragem
         ctk.CTkButton(ctrl_frame, text="Amostrar Sinal",
-                      command=lambda: self._open_sampling_window(preview, t, y, filename)).pack(side="left", padx=5)
+                      command=lambda: self._open_sampling_window(preview, t, y_ch1, filename)).pack(side="left", padx=5)
 
         # Botão para exportar
         ctk.CTkButton(ctrl_frame, text="Exportar WAV",
-                      command=lambda: self._export_from_preview(preview, t, y, filename)).pack(side="right", padx=5)
+                      command=lambda: self._export_from_preview(preview, t, y_ch1, filename)).pack(side="right", padx=5)
 
         # Botão para fechar
         ctk.CTkButton(ctrl_frame, text="Fechar", command=preview.destroy).pack(side="right", padx=5)
@@ -1222,10 +2690,10 @@ class SignalGeneratorApp(ctk.CTk):
             self.set_status(f"❌ Erro ao exportar: {error_msg}", "red")
 
     def _calculate_fft(self, t, y):
-        """Calcula a FFT para o sinal"""
-        N = len(y)
+        """Calcula a FFT para o sinal (ao longo do último eixo, aceita vários canais)"""
+        N = np.shape(y)[-1]
         Fs = 1 / (t[1] - t[0]) if len(t) > 1 else 1  # Frequência de amostragem estimada
-        Y = fftshift(fft(y))
+        Y = fftshift(fft(y, axis=-1), axes=-1)
         f = fftshift(fftfreq(N, 1 / Fs))
         return f, np.abs(Y)
 
@@ -1252,49 +2720,63 @@ class SignalGeneratorApp(ctk.CTk):
             ctk.CTkLabel(frame, text=value, width=120, anchor="e").pack(side="right")
 
     def _calculate_time_analysis(self, t, y):
-        """Calcula métricas para análise de tempo"""
-        y = np.array(y)  # Corrige o TypeError para operações matemáticas
+        """Calcula métricas para análise de tempo
+
+        Aceita um canal ou a matriz (canais, N); as métricas são calculadas em
+        lote ao longo do eixo dos canais e os valores exibidos como "CH1 | CH2".
+        """
+        y = np.atleast_2d(np.asarray(y, dtype=np.float64))  # Corrige o TypeError para operações matemáticas
+        duration = t[-1] - t[0] if len(t) > 1 else 0
 
         # Tensão pico a pico
-        vpp = np.max(y) - np.min(y)
+        vpp = np.ptp(y, axis=-1)
 
         # Tensão RMS
-        rms = np.sqrt(np.mean(y ** 2))
+        rms = np.sqrt(np.mean(y ** 2, axis=-1))
 
         # Tensão média (DC offset)
-        mean = np.mean(y)
+        mean = np.mean(y, axis=-1)
 
         # Fator de crista (Crest Factor)
-        crest_factor = np.max(np.abs(y)) / rms if rms > 0 else 0
+        peak = np.max(np.abs(y), axis=-1)
+        crest_factor = np.divide(peak, rms, out=np.zeros_like(rms), where=rms > 0)
 
         # Taxa de cruzamento por zero
-        zero_crossings = np.where(np.diff(np.sign(y)))[0]
-        zero_crossing_rate = len(zero_crossings) / (t[-1] - t[0]) if len(t) > 1 else 0
+        crossings = np.diff(np.sign(y), axis=-1) != 0
+        n_crossings = np.count_nonzero(crossings, axis=-1)
+        zero_crossing_rate = n_crossings / duration if duration > 0 else np.zeros_like(rms)
 
-        # Frequência estimada
-        freq_est = 0.0  # Inicializa com valor padrão
-        if len(zero_crossings) > 1:
-            avg_period = np.mean(np.diff(t[zero_crossings])) * 2
-            freq_est = 1 / avg_period if avg_period > 0 else 0
+        # Frequência estimada: período médio entre o primeiro e o último cruzamento
+        first = np.argmax(crossings, axis=-1)
+        last = crossings.shape[-1] - 1 - np.argmax(crossings[:, ::-1], axis=-1)
+        avg_period = np.zeros_like(rms)
+        many = n_crossings > 1
+        avg_period[many] = (t[last[many]] - t[first[many]]) / (n_crossings[many] - 1) * 2
+        freq_est = np.divide(1.0, avg_period, out=np.zeros_like(rms), where=avg_period > 0)
+
+        def fmt(values, spec, unit=""):
+            return " | ".join(f"{v:{spec}}{unit}" for v in values)
 
         # Retorna as métricas formatadas
         return [
-            ("Tensão Pico a Pico (Vpp):", f"{vpp:.4f} V"),
-            ("Tensão RMS:", f"{rms:.4f} V"),
-            ("Tensão Média (DC):", f"{mean:.4f} V"),
-            ("Fator de Crista:", f"{crest_factor:.4f}"),
-            ("Taxa de Cruzamento por Zero:", f"{zero_crossing_rate:.2f} Hz"),
-            ("Frequência Estimada:", f"{freq_est:.2f} Hz")
+            ("Tensão Pico a Pico (Vpp):", fmt(vpp, ".4f", " V")),
+            ("Tensão RMS:", fmt(rms, ".4f", " V")),
+            ("Tensão Média (DC):", fmt(mean, ".4f", " V")),
+            ("Fator de Crista:", fmt(crest_factor, ".4f")),
+            ("Taxa de Cruzamento por Zero:", fmt(zero_crossing_rate, ".2f", " Hz")),
+            ("Frequência Estimada:", fmt(freq_est, ".2f", " Hz"))
         ]
 
     def _calculate_freq_analysis(self, f, Y):
-        """Calcula métricas para análise de frequência"""
+        """Calcula métricas para análise de frequência (um canal ou matriz (canais, N))"""
+        Y = np.atleast_2d(Y)
+
         # Encontra a frequência fundamental (apenas frequências positivas)
         positive_mask = f >= 0
         f_positive = f[positive_mask]
-        Y_positive = Y[positive_mask]
+        Y_positive = Y[:, positive_mask]
 
-        if len(Y_positive) == 0:
+        if Y_positive.shape[-1] == 0:
             return [
                 ("Frequência Fundamental:", "---"),
                 ("Amplitude Fundamental:", "---"),
@@ -1302,30 +2784,32 @@ class SignalGeneratorApp(ctk.CTk):
                 ("SNR (Relação Sinal-Ruído):", "---")
             ]
 
-        fundamental_idx = np.argmax(Y_positive)
+        fundamental_idx = np.argmax(Y_positive, axis=-1)
         fundamental_freq = f_positive[fundamental_idx]
-        fundamental_amp = Y_positive[fundamental_idx]
-
-        # THD (Total Harmonic Distortion)
-        peaks, _ = find_peaks(Y_positive, height=np.max(Y_positive) * 0.05, distance=10)
-        if len(peaks) > 1 and fundamental_idx in peaks:
-            harmonic_peaks = np.delete(peaks, np.where(peaks == fundamental_idx))
-            harmonic_power = np.sum(Y_positive[harmonic_peaks] ** 2)
-            thd = np.sqrt(harmonic_power / (fundamental_amp ** 2)) * 100 if fundamental_amp > 0 else 0
-        else:
-            thd = 0
+        fundamental_amp = Y_positive[np.arange(len(Y_positive)), fundamental_idx]
+
+        # THD (Total Harmonic Distortion) - a busca de picos é inerentemente por canal
+        thd = np.zeros(len(Y_positive))
+        for ch, spectrum in enumerate(Y_positive):
+            peaks, _ = find_peaks(spectrum, height=np.max(spectrum) * 0.05, distance=10)
+            if len(peaks) > 1 and fundamental_idx[ch] in peaks and fundamental_amp[ch] > 0:
+                harmonic_peaks = peaks[peaks != fundamental_idx[ch]]
+                harmonic_power = np.sum(spectrum[harmonic_peaks] ** 2)
+                thd[ch] = np.sqrt(harmonic_power / (fundamental_amp[ch] ** 2)) * 100
 
         # SNR (estimado)
-        signal_power = np.sum(Y_positive ** 2)
-        noise_power = signal_power - (fundamental_amp ** 2)
-        snr = 10 * np.log10(fundamental_amp ** 2 / noise_power) if noise_power > 0 else float('inf')
+        signal_power = np.sum(Y_positive ** 2, axis=-1)
+        noise_power = signal_power - fundamental_amp ** 2
+        snr = np.full(len(Y_positive), np.inf)
+        valid = noise_power > 0
+        snr[valid] = 10 * np.log10(fundamental_amp[valid] ** 2 / noise_power[valid])
 
         # Retorna as métricas formatadas
         return [
-            ("Frequência Fundamental:", f"{self._format_freq(fundamental_freq)}"),
-            ("Amplitude Fundamental:", f"{fundamental_amp:.4f}"),
-            ("THD (Distorção Harmônica):", f"{thd:.2f}%"),
-            ("SNR (Relação Sinal-Ruído):", f"{snr:.2f} dB" if snr != float('inf') else "inf dB")
+            ("Frequência Fundamental:", " | ".join(self._format_freq(v) for v in fundamental_freq)),
+            ("Amplitude Fundamental:", " | ".join(f"{v:.4f}" for v in fundamental_amp)),
+            ("THD (Distorção Harmônica):", " | ".join(f"{v:.2f}%" for v in thd)),
+            ("SNR (Relação Sinal-Ruído):", " | ".join(f"{v:.2f} dB" if np.isfinite(v) else "inf dB" for v in snr))
         ]
 
     def import_wav(self):
@@ -1337,33 +2821,36 @@ class SignalGeneratorApp(ctk.CTk):
             return
 
         try:
-            # Lê o arquivo WAV
-            header, data_ch1, data_ch2 = self._read_wav_file(filepath)
+            # Lê o arquivo WAV (cabeçalho e os dois canais em uma única leitura)
+            header, data = self._read_wav_file(filepath)
 
             # Decodifica o cabeçalho
             volt_scale, ts = self._parse_header(header)
             self.imported_voltage_scale = volt_scale[0]  # Salva a escala para exportação (canal 1)
             self.imported_time_scale = ts  # Salva a entrada completa da escala de tempo
+            channel_settings = self._parse_channel_settings(header, volt_scale)
 
-            # Decodifica os dados dos canais
-            ch1_data = self._parse_channel_data(data_ch1, volt_scale[0])
+            # Decodifica os dados dos dois canais -> matriz (2, 1500)
+            channels = self._decode_channels(data, volt_scale)
+            ch1_data = channels[0]
 
             # Calcula parâmetros do sinal
-            N = len(ch1_data)
+            N = channels.shape[1]
             # Calcula o vetor de tempo: total_time = 12 divisões * (ts[0] * ts[2]) segundos
             time_per_division = ts[0] * ts[2]  # em segundos
             total_time = 12 * time_per_division
             t = np.linspace(0, total_time, N, endpoint=False)
             Fs = N / total_time  # Frequência de amostragem
 
-            vpp = max(ch1_data) - min(ch1_data)  # Tensão pico a pico
+            vpp = np.ptp(ch1_data)  # Tensão pico a pico
 
-            # FFT com zero centralizado
-            Y = fftshift(fft(ch1_data))
-            f = fftshift(fftfreq(N, 1 / Fs))
+            # FFT com zero centralizado, em lote para os dois canais
+            f, Y_channels = self._calculate_fft(t, channels)
 
-            # Salva os dados
-            self.last_data = {'t': t, 'y': ch1_data, 'f': f, 'Y': np.abs(Y)}
+            # Salva os dados ('y'/'Y' continuam apontando para o CH1)
+            self._generation += 1  # Descarta uma geração de sinal ainda em andamento
+            self.last_data = {'t': t, 'y': ch1_data, 'f': f, 'Y': Y_channels[0],
+                              'channels': channels, 'Y_channels': Y_channels}
 
             # Atualiza campos de entrada
             self.after(0, lambda: self.entry_duration.delete(0, tk.END))
@@ -1382,7 +2869,8 @@ class SignalGeneratorApp(ctk.CTk):
             self.set_status(f"✅ Sinal importado: {os.path.basename(filepath)}", "lightgreen")
 
             # Mostra prévia do sinal em janela modal com análises
-            self.after(0, lambda: self._show_wav_preview(t, ch1_data, os.path.basename(filepath)))
+            self.after(0, lambda: self._show_wav_preview(t, channels, os.path.basename(filepath),
+                                                         channel_settings))
 
             # Salva como JSON
             json_path = os.path.splitext(filepath)[0] + ".json"
@@ -1391,8 +2879,10 @@ class SignalGeneratorApp(ctk.CTk):
                     'time_per_division': time_per_division,
                     'total_time': total_time,
                     'voltage_scale': volt_scale[0],
+                    'channels': channel_settings,
                     'time_values': t.tolist(),
-                    'signal_values': ch1_data
+                    'signal_values': ch1_data.tolist(),
+                    'signal_values_ch2': channels[1].tolist()
                 }, f, indent=2)
 
             self.set_status(f"📊 Dados salvos em: {json_path}", "lightblue")
@@ -1404,6 +2894,280 @@ class SignalGeneratorApp(ctk.CTk):
             self.after(0, lambda: messagebox.showerror("Erro ao importar WAV", error_msg))
             self.set_status(f"❌ Erro ao importar: {error_msg}", "red")
 
+    def import_signal_file(self):
+        """Importa sinais em CSV/JSON (dados_sinal e exportações do próprio programa)"""
+        filepath = filedialog.askopenfilename(filetypes=[("Sinais", "*.csv *.json"),
+                                                         ("CSV", "*.csv"), ("JSON", "*.json")])
+        if not filepath:
+            return
+
+        def task():
+            start_time = time.time()
+            t, channels, info = SignalFileImporter().load(filepath)
+            f, Y_channels = self._calculate_fft(t, channels)
+            return t, channels, f, Y_channels, info, time.time() - start_time
+
+        def on_done(future):
+            self.after(0, lambda: self._finish_signal_import(future, filepath))
+
+        self.set_status(f"⏳ Importando {os.path.basename(filepath)}...", "yellow")
+        self.executor.submit(task).add_done_callback(on_done)
+
+    def _finish_signal_import(self, future, filepath):
+        try:
+            t, channels, f, Y_channels, info, elapsed = future.result()
+        except Exception as e:
+            self.logger.error(f"Falha na importação de {filepath}: {str(e)}", exc_info=True)
+            messagebox.showerror("Erro ao importar sinal", str(e))
+            self.set_status(f"❌ Erro ao importar: {str(e)}", "red")
+            return
+
+        self._generation += 1  # Descarta uma geração de sinal ainda em andamento
+        self.last_data = {'t': t, 'y': channels[0], 'f': f, 'Y': Y_channels[0]}
+        if len(channels) > 1:
+            self.last_data.update(channels=channels, Y_channels=Y_channels)
+
+        total_time = t[-1] - t[0] + 1.0 / info['sample_rate']
+        for entry, value in ((self.entry_duration, f"{total_time:.6g}"),
+                             (self.entry_fc, "0"),
+                             (self.entry_fs, f"{info['sample_rate']:.6g}"),
+                             (self.entry_vpp, f"{np.ptp(channels[0]):.2f}")):
+            entry.delete(0, tk.END)
+            entry.insert(0, value)
+        self.units_fs.set("Hz")
+
+        self._update_plots()
+        self.update_analysis_panels()
+        note = "" if info['uniform'] else " (reamostrado: passo não uniforme)"
+        self.set_status(f"✅ {os.path.basename(filepath)}: {info['samples']} amostras em {elapsed:.1f}s{note}",
+                        "lightgreen")
+        self.logger.info(f"Sinal importado de {filepath}: {info}")
+
+    def index_capture_folder(self):
+        """Indexa as capturas .wav de uma pasta para a busca por similaridade"""
+        folder = filedialog.askdirectory(title="Selecione a pasta de capturas do Fnirsi")
+        if not folder:
+            return
+        self.set_status("⏳ Indexando capturas...", "yellow")
+        # A tarefa consulta uma cópia da biblioteca; a original só muda na thread da interface
+        self.executor.submit(self._index_folder_task, folder, self.fingerprint_index.copy())
+
+    def _index_folder_task(self, folder, library):
+        start_time = time.time()
+        index_path = os.path.join(folder, FINGERPRINT_INDEX_FILE)
+        index = SpectralFingerprintIndex()  # Índice persistido desta pasta
+        if os.path.exists(index_path):
+            try:
+                index = SpectralFingerprintIndex.load(index_path)
+            except Exception as e:
+                self.logger.warning(f"Índice corrompido em {index_path}, reconstruindo: {str(e)}")
+
+        added = 0
+        changed = False
+        updates = []  # (caminho, vetor, carimbo) que a biblioteca ainda não tem
+        seen = set()
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not entry.name.lower().endswith(".wav") or not entry.is_file():
+                    continue
+                seen.add(entry.path)
+                st = entry.stat()
+                stamp = (st.st_mtime_ns, st.st_size)
+                if index.stamp_of(entry.path) == stamp:
+                    vector = index.vector_of(entry.path)  # Já indexado e inalterado
+                elif library.stamp_of(entry.path) == stamp:
+                    vector = library.vector_of(entry.path)  # Ingerido pelo monitor
+                    index.add(entry.path, vector, stamp)
+                    changed = True
+                else:
+                    try:
+                        t, channels, _ = self._load_wav_capture(entry.path)
+                        vector = compute_fingerprint(t, channels[0])
+                    except Exception as e:
+                        self.logger.warning(f"Falha ao indexar {entry.path}: {str(e)}")
+                        continue
+                    index.add(entry.path, vector, stamp)
+                    changed = True
+                    added += 1
+                if library.stamp_of(entry.path) != stamp:
+                    updates.append((entry.path, vector, stamp))
+
+        # Capturas desta pasta apagadas ou renomeadas, no índice salvo ou na biblioteca
+        folder_key = os.path.dirname(os.path.join(folder, ""))
+        stale = {key for key in index.keys if key not in seen}
+        stale.update(key for key in library.keys if key not in seen and os.path.dirname(key) == folder_key)
+        if index.discard(stale):
+            changed = True
+
+        if changed:
+            try:
+                index.save(index_path)
+            except OSError as e:
+                self.logger.warning(f"Não foi possível salvar o índice: {str(e)}")
+
+        elapsed = time.time() - start_time
+        self.after(0, self._merge_folder_index, updates, stale, len(index), added, elapsed)
+
+    def _merge_folder_index(self, updates, stale, count, added, elapsed):
+        """Aplica na biblioteca o resultado da indexação de uma pasta (thread da interface)"""
+        library = self.fingerprint_index
+        library.discard(stale)
+        for key, vector, stamp in updates:
+            library.add(key, vector, stamp)
+        removed = len(stale)
+        self.logger.info(f"{count} capturas indexadas ({added} novas, {removed} removidas) em {elapsed:.3f}s; "
+                         f"biblioteca com {len(library)}")
+        self.set_status(f"✅ {count} capturas indexadas ({added} novas, {removed} removidas) em {elapsed:.1f}s; "
+                        f"biblioteca com {len(library)}", "lightgreen")
+
+    def find_similar_captures(self):
+        """Busca na biblioteca as capturas mais parecidas com o sinal atual"""
+        if not self.last_data:
+            messagebox.showerror("Erro", "Gere ou importe um sinal primeiro.")
+            return
+        if not len(self.fingerprint_index):
+            messagebox.showinfo("Busca", "Indexe uma pasta de capturas primeiro.")
+            return
+
+        start_time = time.time()
+        vector = compute_fingerprint(self.last_data['t'], self.last_data['y'])
+        results = self.fingerprint_index.query(vector, k=20, prefilter=len(self.fingerprint_index) > 50000)
+        elapsed = time.time() - start_time
+        self.logger.info(f"Busca por similaridade em {len(self.fingerprint_index)} capturas: {elapsed:.3f}s")
+        self.set_status(f"🔎 {len(results)} capturas semelhantes encontradas ({elapsed * 1000:.0f} ms)", "lightblue")
+        self._show_similarity_results(results)
+
+    def _show_similarity_results(self, results):
+        """Lista os resultados da busca; cada item abre a prévia da captura"""
+        win = ctk.CTkToplevel(self)
+        win.title("Capturas Semelhantes")
+        win.geometry("600x600")
+        win.transient(self)
+
+        frame = ctk.CTkScrollableFrame(win)
+        frame.pack(fill="both", expand=True, padx=10, pady=10)
+
+        for path, score in results:
+            row = ctk.CTkFrame(frame, fg_color="transparent")
+            row.pack(fill="x", padx=5, pady=2)
+            ctk.CTkLabel(row, text=f"{score:.3f}", width=60, anchor="w").pack(side="left")
+            ctk.CTkLabel(row, text=os.path.basename(path), anchor="w").pack(side="left", fill="x", expand=True)
+            ctk.CTkButton(row, text="Abrir", width=70,
+                          command=lambda p=path: self._open_capture_preview(p)).pack(side="right")
+
+    def _open_capture_preview(self, filepath):
+        try:
+            t, channels, settings = self._load_wav_capture(filepath)
+            self._show_wav_preview(t, channels, os.path.basename(filepath), settings)
+        except Exception as e:
+            self.logger.error(f"Falha ao abrir captura: {str(e)}", exc_info=True)
+            messagebox.showerror("Erro ao abrir captura", str(e))
+
+    def start_folder_watch(self):
+        """Inicia a ingestão automática das capturas gravadas em uma pasta"""
+        folder = filedialog.askdirectory(title="Selecione a pasta monitorada (pendrive do Fnirsi)")
+        if not folder:
+            return
+        self.stop_folder_watch()
+        watcher = CaptureFolderWatcher(
+            folder, self._ingest_capture, self.ingest_queue,
+            error_cb=lambda e: self.after(0, self._folder_watch_failed, watcher, e))
+        self.folder_watcher = watcher
+        watcher.start()
+        if self._ingest_after_id is None:
+            self._ingest_after_id = self.after(WATCH_DRAIN_MS, self._drain_ingest_queue)
+        self.set_status(f"👁 Monitorando: {folder}", "lightblue")
+        self.logger.info(f"Monitoramento iniciado em {folder}")
+
+    def _folder_watch_failed(self, watcher, error):
+        """A pasta não pôde ser lida pelo monitor (chamado na thread da interface)"""
+        if self.folder_watcher is not watcher:
+            return  # monitor já substituído ou encerrado
+        self.folder_watcher = None
+        self.set_status("❌ Monitoramento de pasta falhou", "red")
+        messagebox.showerror("Erro", f"Não foi possível monitorar a pasta:\n{str(error)}")
+
+    def stop_folder_watch(self):
+        if self.folder_watcher:
+            self.folder_watcher.stop()
+            self.logger.info(f"Monitoramento encerrado em {self.folder_watcher.folder}")
+            self.folder_watcher = None
+            self.set_status("Monitoramento de pasta encerrado", "white")
+
+    def _ingest_capture(self, filepath):
+        """Decodifica e pré-calcula as medições de uma captura (executa na thread do monitor)"""
+        st = os.stat(filepath)  # antes de decodificar: se o arquivo mudar no meio, reindexa depois
+        t, channels, settings = self._load_wav_capture(filepath)
+        f, Y_channels = self._calculate_fft(t, channels)
+        return {
+            'path': filepath,
+            't': t, 'y': channels[0], 'f': f, 'Y': Y_channels[0],
+            'channels': channels, 'Y_channels': Y_channels, 'settings': settings,
+            'time_metrics': self._calculate_time_analysis(t, channels),
+            'freq_metrics': self._calculate_freq_analysis(f, Y_channels),
+            'fingerprint': compute_fingerprint(t, channels[0]),
+            'stamp': (st.st_mtime_ns, st.st_size),
+        }
+
+    def _drain_ingest_queue(self):
+        """Entrega na thread da interface as capturas processadas pelo monitor"""
+        received = []
+        while True:
+            try:
+                received.append(self.ingest_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        for capture in received:
+            path = capture['path']
+            self.capture_cache[path] = capture
+            self.capture_cache.move_to_end(path)
+            self.fingerprint_index.add(path, capture['fingerprint'], capture['stamp'])
+        while len(self.capture_cache) > CAPTURE_CACHE_MAX:
+            self.capture_cache.popitem(last=False)
+
+        if received:
+            last = os.path.basename(received[-1]['path'])
+            self.set_status(f"📥 {len(received)} nova(s) captura(s): {last}", "lightgreen")
+            self.logger.info(f"{len(received)} capturas ingeridas, última: {last}")
+
+        if self.folder_watcher:
+            self._ingest_after_id = self.after(WATCH_DRAIN_MS, self._drain_ingest_queue)
+        else:
+            self._ingest_after_id = None
+
+    def show_capture_list(self):
+        """Lista as capturas recebidas pelo monitoramento com as medições pré-calculadas"""
+        if not self.capture_cache:
+            messagebox.showinfo("Capturas", "Nenhuma captura recebida ainda.")
+            return
+
+        win = ctk.CTkToplevel(self)
+        win.title("Capturas Recebidas")
+        win.geometry("700x600")
+        win.transient(self)
+
+        frame = ctk.CTkScrollableFrame(win)
+        frame.pack(fill="both", expand=True, padx=10, pady=10)
+
+        for path, capture in reversed(self.capture_cache.items()):
+            metrics = dict(capture['time_metrics'] + capture['freq_metrics'])
+            row = ctk.CTkFrame(frame, fg_color="transparent")
+            row.pack(fill="x", padx=5, pady=2)
+            ctk.CTkLabel(row, text=os.path.basename(path), width=200, anchor="w").pack(side="left")
+            ctk.CTkLabel(row, text=metrics.get("Tensão Pico a Pico (Vpp):", "---"), width=100).pack(side="left")
+            ctk.CTkLabel(row, text=metrics.get("Frequência Fundamental:", "---"), width=100).pack(side="left")
+            ctk.CTkButton(row, text="Carregar", width=80,
+                          command=lambda c=capture: self._load_cached_capture(c)).pack(side="right")
+
+    def _load_cached_capture(self, capture):
+        """Carrega uma captura em cache na área principal sem decodificar novamente"""
+        self._generation += 1  # Descarta uma geração de sinal ainda em andamento
+        self.last_data = {key: capture[key] for key in ('t', 'y', 'f', 'Y', 'channels', 'Y_channels')}
+        self._update_plots()
+        self.update_analysis_panels()
+        self.set_status(f"✅ Captura carregada: {os.path.basename(capture['path'])}", "lightgreen")
+
     def _format_freq(self, f):
         """Formata valores de frequência para exibição"""
         if f < 1e3:
@@ -1546,23 +3310,17 @@ class SignalGeneratorApp(ctk.CTk):
             return
 
         try:
-            # Salva os marcadores existentes antes de limpar
-            saved_markers = self._save_markers_state()
-
-            # Limpa apenas o conteúdo dos eixos, preservando os marcadores
-            self.ax_time.clear()
-            self.ax_freq.clear()
-
-            # Converter sinal para mV
-            y_mV = np.array(self.last_data['y']) * 1000
-
-            # Plota os novos dados em mV
-            self.time_plot_line, = self.ax_time.plot(self.last_data['t'], y_mV, color="cyan", zorder=5)
-            self.ax_time.set_title("Domínio do Tempo", color='white')
-            self.ax_time.set_ylabel('Amplitude (mV)')  # Adiciona label em mV
-            self.ax_time.grid(True, linestyle='--', alpha=0.5)
-            self.ax_time.tick_params(colors='white')
-            self.ax_time.xaxis.set_major_formatter(FuncFormatter(self._format_time_axis))
+            # Sinais importados do Fnirsi trazem também o CH2
+            channels = self.last_data.get('channels')
+            if channels is None or len(channels) < 2:
+                channels = [self.last_data['y']]
+            self.plot_manager.show_channels(len(channels))
+
+            # O trecho visível é decimado em _refresh_time_trace
+            self.time_traces = [(line, EnvelopePyramid(y))
+                                for line, y in zip(self.plot_manager.time_lines, channels)]
+            self.reconstructor.clear()
+            self._build_envelope_pyramids()
 
             # Configura escala fixa para eixo Y do tempo em mV
             try:
@@ -1579,15 +3337,13 @@ class SignalGeneratorApp(ctk.CTk):
                 self.ax_time.grid(True, which='both', axis='y', linestyle='--', alpha=0.5)
 
             # Gráfico de frequência com zero centralizado
-            self.freq_plot_line, = self.ax_freq.plot(self.last_data['f'], self.last_data['Y'], color="orange")
-            self.ax_freq.set_title("Domínio da Frequência (FFT)", color='white')
-            self.ax_freq.set_ylabel("|Y(f)|", color='white')
-            self.ax_freq.grid(True, linestyle='--', alpha=0.5)
-            self.ax_freq.tick_params(colors='white')
-            self.ax_freq.xaxis.set_major_formatter(FuncFormatter(self._format_freq_axis))
+            Y_channels = self.last_data.get('Y_channels')
+            self.plot_manager.set_freq_data(self.last_data['f'], Y_channels if Y_channels is not None
+                                            else [self.last_data['Y']])
 
             # Configura escala para eixo Y da frequência
-            self.ax_freq.set_ylim(0, np.max(self.last_data['Y']) * 1.1)
+            Y_max = np.max(Y_channels) if Y_channels is not None else np.max(self.last_data['Y'])
+            self.ax_freq.set_ylim(0, Y_max * 1.1)
 
             # Centraliza o zero na frequência
             max_freq = np.max(np.abs(self.last_data['f']))
@@ -1595,12 +3351,9 @@ class SignalGeneratorApp(ctk.CTk):
 
             # Ajusta a visualização inicial para mostrar o centro do sinal
             self._adjust_initial_view()
+            self._refresh_time_trace()
 
-            # Restaura os marcadores
-            self._restore_markers_state(saved_markers)
-
-            self.fig.tight_layout(pad=3.0)
-            self.canvas.draw()
+            self.canvas.draw_idle()
             self.set_status(f"✅ Gráficos atualizados com sucesso! ({time.time() - start_time:.3f}s)", "lightgreen")
             self.logger.info(f"Gráficos atualizados com sucesso em {time.time() - start_time:.3f}s")
         except Exception as e:
@@ -1684,33 +3437,6 @@ class SignalGeneratorApp(ctk.CTk):
             self.zoom_time.set(1.0)
             self.zoom_freq.set(1.0)
 
-    def _save_markers_state(self):
-        """Salva o estado atual dos marcadores"""
-        state = {}
-        for marker_type in self.markers:
-            state[marker_type] = []
-            for marker in self.markers[marker_type]:
-                if marker_type.endswith('_v'):
-                    state[marker_type].append(marker.get_xdata()[0])
-                else:
-                    state[marker_type].append(marker.get_ydata()[0])
-        return state
-
-    def _restore_markers_state(self, state):
-        """Restaura os marcadores a partir do estado salvo"""
-        for marker_type in state:
-            self.markers[marker_type] = []
-            for value in state[marker_type]:
-                ax = self.ax_time if marker_type.startswith('time') else self.ax_freq
-                color = 'red' if marker_type.startswith('time') else 'lime'
-
-                if marker_type.endswith('_v'):
-                    marker = ax.axvline(x=value, linestyle='--', color=color, picker=5)
-                else:
-                    marker = ax.axhline(y=value, linestyle='--', color=color, picker=5)
-
-                self.markers[marker_type].append(marker)
-
     def reset_zoom(self):
         if not self.last_data:
             return
@@ -1722,32 +3448,71 @@ class SignalGeneratorApp(ctk.CTk):
         if not self.last_data or self.time_plot_line is None:
             return
 
-        # Define os novos limites do eixo X
+        # Define os novos limites do eixo X; o traço é refeito pelo callback de xlim
         center = self.ax_time.get_xlim()[0] + (self.ax_time.get_xlim()[1] - self.ax_time.get_xlim()[0]) / 2
         if val is not None:
             total_width = self.last_data['t'][-1] - self.last_data['t'][0]
             new_width = total_width * float(val) if val > 0.001 else total_width * 0.001
             self.ax_time.set_xlim(center - new_width / 2, center + new_width / 2)
+        else:
+            self._refresh_time_trace()
+
+        # Se o traço saiu em qualidade reduzida, refaz completo quando o slider parar
+        if self.event_coalescer.quality('update_time_zoom') < 1.0:
+            self.event_coalescer.submit('refine_time_trace', self._refine_time_trace,
+                                        delay_ms=COALESCE_SETTLE_MS, debounce=True)
+        self.canvas.draw_idle()
 
-        # Interpolação Dinâmica
+    def _refine_time_trace(self):
+        self._refresh_time_trace(full_quality=True)
+        self.canvas.draw_idle()
+
+    def _refresh_time_trace(self, ax=None, full_quality=False):
+        """Recalcula os pontos exibidos para o trecho visível do gráfico de tempo.
+
+        Poucos pontos visíveis são reconstruídos por sinc janelada nas posições dos
+        pixels; muitos são reduzidos a um envelope mín/máx com
+        DISPLAY_POINTS_PER_PIXEL pontos por pixel.
+        """
+        if not self.last_data or not self.time_traces:
+            return
+
+        t = self.last_data['t']
         x_lim = self.ax_time.get_xlim()
-        visible_indices = np.where((self.last_data['t'] >= x_lim[0]) & (self.last_data['t'] <= x_lim[1]))[0]
+        # Uma amostra extra de cada lado mantém o traço contínuo até as bordas
+        i0 = max(int(np.searchsorted(t, x_lim[0], side='left')) - 1, 0)
+        i1 = min(int(np.searchsorted(t, x_lim[1], side='right')) + 1, len(t))
+        # Durante um zoom lento, menos pontos por pixel até o refinamento final
+        quality = 1.0 if full_quality else self.event_coalescer.quality('update_time_zoom')
+        n_buckets = max(int(self.ax_time.bbox.width * DISPLAY_POINTS_PER_PIXEL / 2 * quality), 1)
+
+        for channel, (line, pyramid) in enumerate(self.time_traces):
+            if i1 - i0 < INTERP_THRESHOLD and len(t) > 1:
+                n_pixels = max(int(self.ax_time.bbox.width), 2)
+                t_plot, y_plot = self.reconstructor.reconstruct(channel, t, pyramid.y,
+                                                                x_lim[0], x_lim[1], n_pixels)
+            else:
+                t_plot, y_plot = pyramid.envelope(t, i0, i1, n_buckets)
+            line.set_data(t_plot, y_plot * 1000)  # Converter para mV
 
-        if 4 < len(visible_indices) < INTERP_THRESHOLD:
-            t_visible = self.last_data['t'][visible_indices]
-            y_visible = self.last_data['y'][visible_indices]
+    def _build_envelope_pyramids(self):
+        """Constrói as pirâmides de envelope no executor e redesenha quando prontas"""
+        pyramids = [pyramid for _, pyramid in self.time_traces if len(pyramid.y) >= PYRAMID_MIN_SAMPLES]
 
-            # Usa spline cúbica para interpolação suave
-            cs = CubicSpline(t_visible, y_visible)
-            t_interp = np.linspace(t_visible[0], t_visible[-1], INTERP_SAMPLES)
-            y_interp = cs(t_interp) * 1000  # Converter para mV
+        def on_done(future):
+            if future.exception() is not None:
+                self.logger.error(f"Erro ao construir pirâmide de envelopes: {future.exception()}")
+                return
+            self.after(0, self._on_pyramid_ready, future.result())
 
-            self.time_plot_line.set_data(t_interp, y_interp)
-        else:
-            # Converter para mV
-            self.time_plot_line.set_data(self.last_data['t'], np.array(self.last_data['y']) * 1000)
+        for pyramid in pyramids:
+            self.executor.submit(pyramid.build).add_done_callback(on_done)
 
-        self.canvas.draw_idle()
+    def _on_pyramid_ready(self, pyramid):
+        # Ignora pirâmides de um sinal que já foi substituído
+        if any(p is pyramid for _, p in self.time_traces):
+            self._refresh_time_trace()
+            self.canvas.draw_idle()
 
     def update_freq_zoom(self, val):
         if not self.last_data:
@@ -1781,13 +3546,20 @@ class SignalGeneratorApp(ctk.CTk):
 
         self.dragging_marker = event.artist
         self.original_position = (event.mouseevent.xdata, event.mouseevent.ydata)
+        self.blit_manager.begin_drag(self.dragging_marker)
 
     def _on_mouse_release(self, event):
+        if self.dragging_marker is not None:
+            self.blit_manager.end_drag(self.dragging_marker)
+            self._flush_marker_panel()
         self.dragging_marker = None
         self.dragging_type = None
         self.original_position = None
 
     def _on_mouse_motion(self, event):
+        if self.crosshair_enabled.get():
+            self._move_crosshair(event)
+
         if not self.dragging_marker or not event.inaxes or not self.original_position:
             return
 
@@ -1799,10 +3571,55 @@ class SignalGeneratorApp(ctk.CTk):
             if event.ydata is not None:
                 self.dragging_marker.set_ydata([event.ydata])
 
-        # Atualiza o painel de informações
-        self.update_marker_panel()
+        # Só o marcador é redesenhado; o painel segue no ritmo da tela
+        self.blit_manager.update()
+        self._schedule_marker_panel(("🔧 Marcador movido", "cyan"))
+
+    def _move_crosshair(self, event):
+        for ax, (v_line, h_line) in self.crosshair.items():
+            inside = event.inaxes is ax and event.xdata is not None
+            v_line.set_visible(inside)
+            h_line.set_visible(inside)
+            if inside:
+                v_line.set_xdata([event.xdata, event.xdata])
+                h_line.set_ydata([event.ydata, event.ydata])
+        self.blit_manager.update()
+
+        if event.inaxes is self.ax_time and event.xdata is not None:
+            text = f"✚ t = {self._format_time(event.xdata)}  |  {event.ydata:.1f} mV"
+        elif event.inaxes is self.ax_freq and event.xdata is not None:
+            text = f"✚ f = {self._format_freq(event.xdata)}  |  |Y| = {event.ydata:.3g}"
+        else:
+            return
+        if not self.dragging_marker:
+            self._schedule_marker_panel((text, "white"))
+
+    def _toggle_crosshair(self):
+        enabled = self.crosshair_enabled.get()
+        for v_line, h_line in self.crosshair.values():
+            for line in (v_line, h_line):
+                line.set_visible(False)
+                if enabled:
+                    self.blit_manager.add_artist(line)
+                else:
+                    self.blit_manager.remove_artist(line)
         self.canvas.draw_idle()
-        self.set_status("🔧 Marcador movido", "cyan")
+
+    def _schedule_marker_panel(self, status=None):
+        """Agrupa as atualizações do painel em no máximo uma a cada PANEL_REFRESH_MS"""
+        if status is not None:
+            self._pending_status = status
+        if self._panel_after_id is None:
+            self._panel_after_id = self.after(PANEL_REFRESH_MS, self._flush_marker_panel)
+
+    def _flush_marker_panel(self):
+        if self._panel_after_id is not None:
+            self.after_cancel(self._panel_after_id)
+            self._panel_after_id = None
+        self.update_marker_panel()
+        if self._pending_status is not None:
+            self.set_status(*self._pending_status)
+            self._pending_status = None
 
     def add_marker(self, kind):
         ev = self.last_click_event
@@ -1836,10 +3653,7 @@ class SignalGeneratorApp(ctk.CTk):
             for mk in list(self.markers[k]):
                 try:
                     # Remove fisicamente a linha do gráfico
-                    if mk in self.ax_time.lines:
-                        self.ax_time.lines.remove(mk)
-                    elif mk in self.ax_freq.lines:
-                        self.ax_freq.lines.remove(mk)
+                    mk.remove()
                 except ValueError:
                     pass
             self.markers[k] = []
@@ -1900,203 +3714,15 @@ class SignalGeneratorApp(ctk.CTk):
             return
 
         try:
-            # Limitar pontos para análise (performance)
-            max_points = min(len(self.last_data['y']), ANALYSIS_MAX_POINTS)
-            step = max(1, len(self.last_data['y']) // max_points)
-
-            t = np.array(self.last_data['t'][::step])
-            y = np.array(self.last_data['y'][::step])
-            f = self.last_data['f']
-            Y = self.last_data['Y']
-
-            self.logger.debug(f"Dados preparados para análise. Tempo: {len(t)} pts, Freq: {len(f)} pts")
-
-            # Análise no domínio do tempo
-            if len(y) > 0:
-                # Tensão pico a pico
-                vpp = np.max(y) - np.min(y)
-                self.time_analysis_labels['vpp'].configure(text=f"{vpp:.4f} V")
-                self.logger.debug(f"Vpp: {vpp:.4f} V")
-
-                # Tensão RMS
-                rms = np.sqrt(np.mean(y ** 2))
-                self.time_analysis_labels['rms'].configure(text=f"{rms:.4f} V")
-                self.logger.debug(f"RMS: {rms:.4f} V")
-
-                # Tensão média (DC offset)
-                mean = np.mean(y)
-                self.time_analysis_labels['mean'].configure(text=f"{mean:.4f} V")
-                self.logger.debug(f"Média: {mean:.4f} V")
-
-                # Fator de crista (Crest Factor)
-                crest_factor = np.max(np.abs(y)) / rms if rms > 0 else 0
-                self.time_analysis_labels['crest_factor'].configure(text=f"{crest_factor:.4f}")
-                self.logger.debug(f"Fator de crista: {crest_factor:.4f}")
-
-                # Taxa de cruzamento por zero
-                zero_crossings = np.where(np.diff(np.sign(y)))[0]
-                if len(zero_crossings) > 0:
-                    zero_crossing_rate = len(zero_crossings) / (t[-1] - t[0])
-                    self.time_analysis_labels['zero_crossing'].configure(text=f"{zero_crossing_rate:.2f} Hz")
-                    self.logger.debug(f"Taxa de cruzamento: {zero_crossing_rate:.2f} Hz")
-                else:
-                    self.time_analysis_labels['zero_crossing'].configure(text="0 Hz")
-                    self.logger.debug("Taxa de cruzamento: 0 Hz")
-
-                # Frequência estimada - INICIALIZAÇÃO CORRIGIDA
-                freq_est = 0.0
-                if len(zero_crossings) > 1:
-                    periods = np.diff(t[zero_crossings])
-                    if len(periods) > 0:
-                        avg_period = np.mean(periods) * 2
-                        freq_est = 1 / avg_period if avg_period > 0 else 0
-                self.time_analysis_labels['frequency'].configure(text=f"{freq_est:.2f} Hz")
-                self.logger.debug(f"Frequência estimada: {freq_est:.2f} Hz")
-
-                # Duty cycle (apenas para ondas quadradas)
-                if self.waveform.get().startswith("Quadrada") or self.waveform.get().startswith("Pulso"):
-                    if vpp > 0:
-                        threshold = (np.max(y) + np.min(y)) / 2
-                        positive_samples = np.sum(y > threshold)
-                        duty_cycle = positive_samples / len(y) * 100
-                        self.time_analysis_labels['duty_cycle'].configure(text=f"{duty_cycle:.1f}%")
-                        self.logger.debug(f"Duty cycle: {duty_cycle:.1f}%")
-                    else:
-                        self.time_analysis_labels['duty_cycle'].configure(text="N/A")
-                        self.logger.debug("Duty cycle: N/A")
-                else:
-                    self.time_analysis_labels['duty_cycle'].configure(text="N/A")
-                    self.logger.debug("Duty cycle: N/A")
-
-                # Relação Pico/RMS
-                peak_to_rms = np.max(np.abs(y)) / rms if rms > 0 else 0
-                self.time_analysis_labels['peak_to_rms'].configure(text=f"{peak_to_rms:.4f}")
-                self.logger.debug(f"Pico/RMS: {peak_to_rms:.4f}")
-
-                # Curtose
-                if len(y) > 3:
-                    kurt_val = kurtosis(y)
-                    self.time_analysis_labels['kurtosis'].configure(text=f"{kurt_val:.4f}")
-                    self.logger.debug(f"Curtose: {kurt_val:.4f}")
-                else:
-                    self.time_analysis_labels['kurtosis'].configure(text="---")
-                    self.logger.debug("Curtose: ---")
-
-                # Assimetria (Skewness)
-                if len(y) > 2:
-                    skew_val = skew(y)
-                    self.time_analysis_labels['skewness'].configure(text=f"{skew_val:.4f}")
-                    self.logger.debug(f"Assimetria: {skew_val:.4f}")
-                else:
-                    self.time_analysis_labels['skewness'].configure(text="---")
-                    self.logger.debug("Assimetria: ---")
-
-            # Análise no domínio da frequência
-            if len(Y) > 0:
-                # Considerar apenas frequências positivas para análise
-                positive_mask = f >= 0
-                f_positive = f[positive_mask]
-                Y_positive = Y[positive_mask]
-
-                if len(Y_positive) == 0:
-                    self.logger.warning("Nenhuma frequência positiva para análise")
-                    return
-
-                # Encontra a frequência fundamental (maior magnitude)
-                fundamental_idx = np.argmax(Y_positive)
-                fundamental_freq = f_positive[fundamental_idx]
-                fundamental_amp = Y_positive[fundamental_idx]
-                self.freq_analysis_labels['fundamental'].configure(text=f"{self._format_freq(fundamental_freq)}")
-                self.freq_analysis_labels['fund_amp'].configure(text=f"{fundamental_amp:.4f}")
-                self.logger.debug(f"Fundamental: {fundamental_freq} Hz, Amplitude: {fundamental_amp:.4f}")
-
-                # Encontra harmônicos (excluindo o fundamental)
-                harmonic_mask = (f_positive > fundamental_freq * 0.9) & (f_positive < f_positive[-1])
-                harmonic_freqs = f_positive[harmonic_mask]
-                harmonic_amps = Y_positive[harmonic_mask]
-
-                # Identifica picos significativos
-                peaks, _ = find_peaks(harmonic_amps, height=fundamental_amp * 0.05, distance=10)
-                harmonic_peaks = peaks[np.argsort(harmonic_amps[peaks])[::-1]]
-
-                # Calcula THD (Total Harmonic Distortion)
-                thd = 0.0
-                harmonics_level = 0.0
-                if len(harmonic_peaks) > 0 and fundamental_amp > 0:
-                    harmonic_power = np.sum(harmonic_amps[harmonic_peaks] ** 2)
-                    thd = np.sqrt(harmonic_power / (fundamental_amp ** 2)) * 100
-                    harmonics_level = harmonic_power / (fundamental_amp ** 2)
-                self.freq_analysis_labels['thd'].configure(text=f"{thd:.2f}%")
-                self.freq_analysis_labels['harmonics'].configure(text=f"{harmonics_level:.4f}")
-
-                # SNR (Signal to Noise Ratio)
-                snr = "inf dB"
-                noise_floor = "---"
-                if fundamental_amp > 0:
-                    # Considera tudo que não é fundamental ou harmônicos como ruído
-                    noise_mask = (f_positive > 0) & ~harmonic_mask
-                    noise_power = np.sum(Y_positive[noise_mask] ** 2)
-
-                    if noise_power > 0:
-                        snr_val = 10 * np.log10(fundamental_amp ** 2 / noise_power)
-                        snr = f"{snr_val:.2f} dB"
-                        noise_floor = f"{np.sqrt(noise_power):.4f}"
-                self.freq_analysis_labels['snr'].configure(text=snr)
-                self.freq_analysis_labels['noise_floor'].configure(text=noise_floor)
-
-                # SFDR (Spurious Free Dynamic Range)
-                sfdr = "inf dB"
-                if len(harmonic_peaks) > 0:
-                    max_spur = np.max(harmonic_amps[harmonic_peaks])
-                    if fundamental_amp > 0 and max_spur > 0:
-                        sfdr_val = 20 * np.log10(fundamental_amp / max_spur)
-                        sfdr = f"{sfdr_val:.2f} dB"
-                self.freq_analysis_labels['sfdr'].configure(text=sfdr)
-
-                # Largura de banda a -3dB (método robusto)
-                bandwidth = "---"
-                if fundamental_amp > 0:
-                    half_power = fundamental_amp / np.sqrt(2)
-                    above_threshold = Y_positive > half_power
-                    if np.any(above_threshold):
-                        indices = np.where(above_threshold)[0]
-                        min_idx = indices[0]
-                        max_idx = indices[-1]
-                        min_freq = f_positive[min_idx]
-                        max_freq = f_positive[max_idx]
-                        bandwidth_val = max_freq - min_freq
-                        bandwidth = self._format_freq(bandwidth_val)
-                self.freq_analysis_labels['bandwidth'].configure(text=bandwidth)
-
-                # Índice de modulação (estimado)
-                mod_index = "N/A"
-                if self.mod_am.get():
-                    # Para AM: m = (A_max - A_min) / (A_max + A_min)
-                    A_max = np.max(y)
-                    A_min = np.min(y)
-                    if A_max + A_min != 0:
-                        mod_index_val = (A_max - A_min) / (A_max + A_min) * 100
-                        mod_index = f"{mod_index_val:.1f}%"
-                elif self.mod_fm.get():
-                    # Para FM: β = Δf / f_m
-                    if fundamental_amp > 0:
-                        sideband_mask = (f_positive > fundamental_freq - 10) & (f_positive < fundamental_freq + 10)
-                        sideband_amp = np.max(Y_positive[sideband_mask])
-                        if fundamental_amp > 0:
-                            mod_index_val = sideband_amp / fundamental_amp * 100
-                            mod_index = f"{mod_index_val:.1f}%"
-                self.freq_analysis_labels['mod_index'].configure(text=mod_index)
-
-                # Frequência de pico (maior harmônico)
-                peak_freq = "---"
-                if len(harmonic_peaks) > 0:
-                    peak_harmonic_idx = harmonic_peaks[0]
-                    peak_freq = self._format_freq(harmonic_freqs[peak_harmonic_idx])
-                self.freq_analysis_labels['peak_freq'].configure(text=peak_freq)
+            # Sinais gerados já trazem as métricas do pipeline; importados são calculados aqui
+            metrics = self.last_data.get('metrics')
+            if metrics is None:
+                metrics = compute_signal_metrics(self.last_data['t'], self.last_data['y'],
+                                                 self.last_data['f'], self.last_data['Y'],
+                                                 self.waveform.get(), self.mod_am.get(), self.mod_fm.get())
+            self._show_metrics(metrics)
 
             self.logger.info(f"Painéis de análise atualizados em {time.time() - start_time:.3f}s")
-            self.logger.debug(f"Métricas tempo: Vpp={vpp:.4f}, RMS={rms:.4f}, Freq={freq_est:.2f}")
-            self.logger.debug(f"Métricas freq: Fund={fundamental_freq:.2f}, THD={thd:.2f}%")
 
             # Forçar atualização da interface
             self.update_idletasks()
@@ -2105,11 +3731,42 @@ class SignalGeneratorApp(ctk.CTk):
             error_msg = f"Erro ao atualizar painéis de análise: {str(e)}"
             self.logger.error(error_msg, exc_info=True)
             self.set_status(f"❌ {error_msg}", "red")
-            self.logger.debug(f"Tipo de dados: t={type(t)}, y={type(y)}, f={type(f)}, Y={type(Y)}")
-            self.logger.debug(f"Comprimentos: t={len(t) if hasattr(t, '__len__') else 'N/A'}, "
-                              f"y={len(y) if hasattr(y, '__len__') else 'N/A'}, "
-                              f"f={len(f) if hasattr(f, '__len__') else 'N/A'}, "
-                              f"Y={len(Y) if hasattr(Y, '__len__') else 'N/A'}")
+
+    def _show_metrics(self, m):
+        """Formata as métricas de compute_signal_metrics nos rótulos dos painéis"""
+        def fmt(value, spec, missing):
+            return missing if value is None else format(value, spec)
+
+        if 'vpp' in m:
+            labels = self.time_analysis_labels
+            labels['vpp'].configure(text=f"{m['vpp']:.4f} V")
+            labels['rms'].configure(text=f"{m['rms']:.4f} V")
+            labels['mean'].configure(text=f"{m['mean']:.4f} V")
+            labels['crest_factor'].configure(text=f"{m['crest_factor']:.4f}")
+            labels['zero_crossing'].configure(
+                text=f"{m['zero_crossing']:.2f} Hz" if m['zero_crossing'] else "0 Hz")
+            labels['frequency'].configure(text=f"{m['frequency']:.2f} Hz")
+            labels['duty_cycle'].configure(text=fmt(m['duty_cycle'], ".1f", "N/A") +
+                                           ("%" if m['duty_cycle'] is not None else ""))
+            labels['peak_to_rms'].configure(text=f"{m['peak_to_rms']:.4f}")
+            labels['kurtosis'].configure(text=fmt(m['kurtosis'], ".4f", "---"))
+            labels['skewness'].configure(text=fmt(m['skewness'], ".4f", "---"))
+
+        if 'fundamental' in m:
+            labels = self.freq_analysis_labels
+            labels['fundamental'].configure(text=self._format_freq(m['fundamental']))
+            labels['fund_amp'].configure(text=f"{m['fund_amp']:.4f}")
+            labels['thd'].configure(text=f"{m['thd']:.2f}%")
+            labels['harmonics'].configure(text=f"{m['harmonics']:.4f}")
+            labels['snr'].configure(text=f"{m['snr']:.2f} dB" if np.isfinite(m['snr']) else "inf dB")
+            labels['noise_floor'].configure(text=fmt(m['noise_floor'], ".4f", "---"))
+            labels['sfdr'].configure(text=f"{m['sfdr']:.2f} dB" if np.isfinite(m['sfdr']) else "inf dB")
+            labels['bandwidth'].configure(
+                text="---" if m['bandwidth'] is None else self._format_freq(m['bandwidth']))
+            labels['mod_index'].configure(text=fmt(m['mod_index'], ".1f", "N/A") +
+                                          ("%" if m['mod_index'] is not None else ""))
+            labels['peak_freq'].configure(
+                text="---" if m['peak_freq'] is None else self._format_freq(m['peak_freq']))
 
     def _format_time(self, s):
         if s < 1e-6:
@@ -2137,18 +3794,78 @@ class SignalGeneratorApp(ctk.CTk):
         if not path:
             return
 
-        try:
-            if path.endswith(".json"):
-                with open(path, "w") as f:
-                    json.dump({k: v.tolist() for k, v in self.last_data.items()}, f, indent=2)
-            else:
-                with open(path, "w", newline="") as f:
-                    writer = csv.writer(f)
-                    writer.writerow(self.last_data.keys())
-                    writer.writerows(zip(*self.last_data.values()))
+        if path.endswith(".json"):
+            self._run_export(path, lambda exporter, data: exporter.export_json(path, data))
+        else:
+            self._run_export(path, lambda exporter, data: exporter.export_csv(path, data))
+
+    def export_binary(self, fmt):
+        if not self.last_data:
+            messagebox.showerror("Erro", "Gere um sinal primeiro.")
+            return
 
-            self.set_status(f"📁 Dados exportados para {path}", "lightblue")
+        label, ext = EXPORT_BINARY_FORMATS[fmt]
+        path = filedialog.asksaveasfilename(defaultextension=ext, filetypes=[(label, f"*{ext}")])
+        if not path:
+            return
+        self._run_export(path, lambda exporter, data: exporter.export_binary(path, data, fmt))
+
+    def _run_export(self, path, job):
+        """Executa job(exporter, data) no executor com janela de progresso e cancelamento"""
+        data = dict(self.last_data)  # Snapshot: um novo sinal substitui o dicionário, não os vetores
+        cancel_event = threading.Event()
+        dialog, progress_bar, progress_label = self._build_export_progress(path, cancel_event)
+
+        last_percent = [-1]
+
+        def on_progress(done, total):
+            percent = int(100 * done / total) if total else 100
+            if percent != last_percent[0]:
+                last_percent[0] = percent
+                self.after(0, lambda: (progress_bar.set(percent / 100),
+                                       progress_label.configure(text=f"{percent}%")))
+
+        def task():
+            start_time = time.time()
+            paths = job(ChunkedExporter(on_progress, cancel_event), data)
+            return paths, time.time() - start_time
+
+        def on_done(future):
+            self.after(0, lambda: self._finish_export(future, dialog))
+
+        self.set_status(f"⏳ Exportando dados para {os.path.basename(path)}...", "yellow")
+        self.executor.submit(task).add_done_callback(on_done)
+
+    def _build_export_progress(self, path, cancel_event):
+        """Janela de progresso com botão de cancelamento para a exportação"""
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("Exportando Dados")
+        dialog.geometry("400x150")
+        dialog.resizable(False, False)
+        dialog.transient(self)
+
+        ctk.CTkLabel(dialog, text=os.path.basename(path)).pack(pady=(15, 5))
+        progress_bar = ctk.CTkProgressBar(dialog)
+        progress_bar.set(0)
+        progress_bar.pack(fill="x", padx=20, pady=5)
+        progress_label = ctk.CTkLabel(dialog, text="0%")
+        progress_label.pack()
+        ctk.CTkButton(dialog, text="Cancelar", command=cancel_event.set).pack(pady=10)
+        dialog.protocol("WM_DELETE_WINDOW", cancel_event.set)
+        return dialog, progress_bar, progress_label
+
+    def _finish_export(self, future, dialog):
+        dialog.destroy()
+        try:
+            paths, elapsed = future.result()
+            names = ", ".join(os.path.basename(p) for p in paths)
+            self.set_status(f"📁 Dados exportados para {names} ({elapsed:.1f}s)", "lightblue")
+            self.logger.info(f"Exportação concluída em {elapsed:.3f}s: {paths}")
+        except ExportCancelled:
+            self.set_status("⚠️ Exportação cancelada", "orange")
+            self.logger.info("Exportação cancelada pelo usuário")
         except Exception as e:
+            self.logger.error(f"Erro ao exportar dados: {str(e)}", exc_info=True)
             messagebox.showerror("Erro de Exportação", str(e))
             self.set_status(f"❌ Erro ao exportar: {str(e)}", "red")
 
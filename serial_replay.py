@@ -0,0 +1,234 @@
+"""
+Reprodução de sessões gravadas pelo gerador_funcionando.py ("Gravar sessão", .pbrec).
+
+ReplaySerial imita a parte de serial.Serial que o HardwareCommunicator usa e
+entrega os blocos RX gravados com os mesmos limites e no mesmo ritmo (ou
+acelerado), de modo que parser, telemetria, PyboardClient e GUI rodam
+exatamente o mesmo código que rodam com a placa, sem hardware:
+
+  - speed=1 reproduz os tempos gravados; speed=10 é 10x mais rápido;
+    speed=0 entrega o próximo bloco assim que o anterior foi consumido
+    (mede o custo do host, preservando a fragmentação original);
+  - follow_tx segura cada bloco RX até o host ter escrito tantos bytes quanto
+    tinham sido escritos antes dele na gravação, o que torna a reprodução
+    determinística quando o host reenvia os mesmos comandos (--resend).
+
+Uso:
+    python serial_replay.py sessao.pbrec                  # benchmark do parser, velocidade máxima
+    python serial_replay.py sessao.pbrec --speed 1        # tempo real
+    python serial_replay.py sessao.pbrec --resend         # reenvia os comandos gravados pelo PyboardClient
+    python serial_replay.py sessao.pbrec --gui --speed 1  # GUI alimentada pela gravação
+"""
+import argparse
+import queue
+import threading
+import time
+
+import gerador_funcionando as gf
+from gerador_funcionando import CMD_EOL, READ_TIMEOUT_S, REC_RX, REC_TX, read_session
+
+
+class ReplaySerial:
+    """Porta serial falsa que devolve o RX de uma gravação .pbrec."""
+    def __init__(self, records, speed=1.0, follow_tx=False, timeout=READ_TIMEOUT_S):
+        self.rx = []
+        self.tx_before = []     # bytes TX gravados antes de cada bloco RX
+        tx = 0
+        for t, direction, data in records:
+            if direction == REC_TX:
+                tx += len(data)
+            elif direction == REC_RX:
+                self.rx.append((t, data))
+                self.tx_before.append(tx)
+        self.speed = speed
+        self.follow_tx = follow_tx
+        self.timeout = timeout
+        self.port = "replay"
+        self.is_open = True
+        self.buf = bytearray()
+        self.idx = 0
+        self.t0 = None
+        self.tx_bytes = 0
+        self.tx_log = []
+        self.cond = threading.Condition()
+        self.done = threading.Event()   # todo o RX entregue e o leitor pediu mais
+
+    def _advance(self, now):
+        """Move para o buffer os blocos já devidos; devolve a espera até o próximo (ou None)."""
+        while self.idx < len(self.rx):
+            t, data = self.rx[self.idx]
+            if self.follow_tx and self.tx_before[self.idx] > self.tx_bytes:
+                return None
+            if self.speed > 0:
+                wait = self.t0 + t / self.speed - now
+                if wait > 0:
+                    return wait
+            elif self.buf:
+                return None     # velocidade máxima: um bloco gravado por leitura
+            self.buf += data
+            self.idx += 1
+        return None
+
+    def read(self, size=1):
+        with self.cond:
+            now = time.monotonic()
+            if self.t0 is None:
+                self.t0 = now
+            deadline = now + (self.timeout if self.timeout is not None else 1e9)
+            while self.is_open:
+                wait = self._advance(now)
+                if self.buf:
+                    out = bytes(self.buf[:size])
+                    del self.buf[:size]
+                    return out
+                if self.idx >= len(self.rx):
+                    self.done.set()
+                if now >= deadline:
+                    break
+                self.cond.wait(min(deadline - now, wait) if wait is not None else deadline - now)
+                now = time.monotonic()
+            return b""
+
+    @property
+    def in_waiting(self):
+        with self.cond:
+            if self.t0 is not None:
+                self._advance(time.monotonic())
+            return len(self.buf)
+
+    def write(self, data):
+        with self.cond:
+            self.tx_bytes += len(data)
+            self.tx_log.append((time.monotonic(), bytes(data)))
+            self.cond.notify_all()
+        return len(data)
+
+    def close(self):
+        with self.cond:
+            self.is_open = False
+            self.cond.notify_all()
+
+    # O comunicador mexe nas linhas de controle e limpa buffers ao conectar;
+    # aqui não há nada a fazer (limpar o RX descartaria o início da gravação).
+    def setDTR(self, value=True):
+        pass
+
+    def setRTS(self, value=True):
+        pass
+
+    def reset_input_buffer(self):
+        pass
+
+    def reset_output_buffer(self):
+        pass
+
+
+def recorded_commands(records):
+    """Comandos gravados como (t, texto), na ordem em que foram escritos."""
+    cmds = []
+    for t, direction, data in records:
+        if direction == REC_TX:
+            cmds += [(t, c) for c in data.decode("utf-8", "replace").split(CMD_EOL) if c]
+    return cmds
+
+
+def benchmark(records, speed=0.0, resend=False):
+    """Passa a gravação pelo HardwareCommunicator (e PyboardClient) e mede o host."""
+    data_queue, telemetry_queue = queue.Queue(), queue.Queue()
+    com = gf.HardwareCommunicator(data_queue, telemetry_queue=telemetry_queue)
+    client = gf.PyboardClient(com)
+    ser = ReplaySerial(records, speed=speed, follow_tx=resend)
+    counts = {"lines": 0, "samples": 0}
+    stop = threading.Event()
+
+    def consume():
+        # Faz o papel da GUI: esvazia as filas em lote
+        while not stop.is_set():
+            item = None
+            try:
+                item = data_queue.get(timeout=0.05)
+            except queue.Empty:
+                pass
+            if isinstance(item, list):
+                counts["lines"] += len(item)
+            while True:
+                try:
+                    counts["samples"] += telemetry_queue.get_nowait().size
+                except queue.Empty:
+                    break
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    ok, msg = com.connect("replay", ser=ser)
+    if not ok:
+        raise RuntimeError(msg)
+    t0 = time.perf_counter()
+    futures = []
+    if resend:
+        for t, cmd in recorded_commands(records):
+            if speed > 0:
+                time.sleep(max(0.0, t / speed - (time.perf_counter() - t0)))
+            futures.append(client.submit(cmd))
+    ser.done.wait()
+    wall = time.perf_counter() - t0
+    replies = [f.result() for f in futures]
+    time.sleep(0.1)
+    stop.set()
+    consumer.join()
+    com.disconnect()
+    client.close()
+
+    rx_bytes = sum(len(d) for _, d in ser.rx)
+    duration = records[-1][0] if records else 0.0
+    res = {
+        "gravacao_s": duration, "parede_s": wall, "fator": duration / wall if wall else 0.0,
+        "blocos_rx": len(ser.rx), "bytes_rx": rx_bytes, "MB_s": rx_bytes / wall / 1e6 if wall else 0.0,
+        "linhas": counts["lines"], "amostras": counts["samples"],
+        "quadros": com.demux.frames, "quadros_perdidos": com.demux.lost, "crc_invalido": com.demux.bad_crc,
+    }
+    if resend:
+        res["comandos"] = len(replies)
+        res["respostas_ok"] = sum(r.ok for r in replies)
+    return res
+
+
+def run_gui(path, records, speed):
+    app = gf.App()
+    ser = ReplaySerial(records, speed=speed)
+    app.client.reset()
+    ok, msg = app.communicator.connect(f"replay:{path}", ser=ser)
+    app._log(f"[pc] Reproduzindo {path} ({len(ser.rx)} blocos RX, velocidade {speed:g}x)")
+    app.connect_button.configure(text="Desconectar")
+    t0 = time.perf_counter()
+
+    def watch():
+        if ser.done.is_set():
+            app._log(f"[pc] Reprodução concluída em {time.perf_counter() - t0:.2f} s.")
+        else:
+            app.after(200, watch)
+
+    watch()
+    app.mainloop()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Reproduz uma sessão .pbrec pelo host do Pyboard.")
+    ap.add_argument("path", help="arquivo gravado pelo gerador_funcionando.py")
+    ap.add_argument("--speed", type=float, default=0.0,
+                    help="fator de velocidade (1 = tempo real, 0 = o mais rápido possível)")
+    ap.add_argument("--resend", action="store_true",
+                    help="reenvia os comandos gravados e amarra o RX ao TX do host")
+    ap.add_argument("--gui", action="store_true", help="abre a GUI em vez do benchmark")
+    args = ap.parse_args(argv)
+
+    _, records = read_session(args.path)
+    if args.gui:
+        run_gui(args.path, records, args.speed)
+        return
+    res = benchmark(records, speed=args.speed, resend=args.resend)
+    for k, v in res.items():
+        print(f"{k:>18}: {v:.3f}" if isinstance(v, float) else f"{k:>18}: {v}")
+
+
+if __name__ == "__main__":
+    main()